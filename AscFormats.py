@@ -0,0 +1,122 @@
+import argparse
+import re
+
+from TeboCADProcess import parse_Nails_line, parse_Parts_line
+
+Sniff_bytes = 512         # 只看檔案開頭這麼多 bytes 判斷格式
+Default_dialect = "Tebo"  # 檔頭沒有任何已知簽章時使用
+
+# 資料種類 → 逐行 parser；所有格式共用
+Asc_kinds = {
+    "Nails": parse_Nails_line,
+    "Parts": parse_Parts_line,
+}
+
+# 格式名稱 → 設定；依註冊順序比對簽章
+Asc_dialects = {}
+
+
+def register_dialect(name, signature, version_pattern, prefix_tokens=0):
+    """
+    註冊一種治具廠商的 ASC 格式：
+        signature      : 檔頭 (前 Sniff_bytes) 中可辨識此格式的 regex
+        version_pattern: 由檔頭取出版本名稱的 regex (findall 的最後一個群組為名稱)
+        prefix_tokens  : 每筆記錄行首多出的欄位數 (例如 Bojay 報告行首的版本名稱)
+    去掉行首欄位後的記錄與 Tebo 相同，交給共用的 parse_*_line 解析。
+    """
+    Asc_dialects[name] = {
+        "signature": re.compile(signature),
+        "versions": re.compile(version_pattern, re.M),
+        "prefix_tokens": prefix_tokens,
+    }
+
+
+# Tebo-ICT 匯出檔：" 25W12-SB_1216WYHQ1400_cad        Tebo-ICT,  license #..."
+register_dialect("Tebo", r"Tebo-ICT", r"^[ \t]*(\S+)[ \t]+Tebo-ICT")
+
+# Bojay 差異報告：檔頭為 "Old Version :xxx" / "New Version :yyy"，每筆記錄行首帶版本名稱
+register_dialect("Bojay", r"Bojay", r"^(Old|New) Version :[ \t]*(\S+)", prefix_tokens=1)
+
+
+def read_head(filepath, size=Sniff_bytes):
+    with open(filepath, "rb") as f:
+        return f.read(size).decode("utf-8", "ignore")
+
+
+def sniff_dialect(head):
+    """由檔案開頭的文字判斷格式名稱"""
+    for name, dialect in Asc_dialects.items():
+        if dialect["signature"].search(head):
+            return name
+    return Default_dialect
+
+
+def header_versions(head, dialect_name):
+    """回傳檔頭中的版本名稱 list (Bojay 為 [Old, New])，找不到時回傳空 list"""
+    versions = []
+    for match in Asc_dialects[dialect_name]["versions"].findall(head):
+        label = match[-1] if isinstance(match, tuple) else match
+        if label not in versions:
+            versions.append(label)
+    return versions
+
+
+def parse_asc_versions(filepath, kind):
+    """
+    回傳 dict：版本名稱 → list of dict (欄位同 parse_Nailsasc / parse_Partsasc)。
+    Tebo 匯出檔只有一個版本；Bojay 報告依行首的版本名稱分組，順序同檔頭。
+    """
+    head = read_head(filepath)
+    dialect_name = sniff_dialect(head)
+    versions = header_versions(head, dialect_name)
+    prefix_tokens = Asc_dialects[dialect_name]["prefix_tokens"]
+    parse_line = Asc_kinds[kind]
+
+    grouped = {label: [] for label in versions}
+    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
+        if not prefix_tokens:
+            grouped.setdefault(versions[0] if versions else "", []).extend(
+                record for record in map(parse_line, f) if record is not None
+            )
+            return grouped
+
+        for line in f:
+            tokens = line.split(None, prefix_tokens)
+            if len(tokens) <= prefix_tokens:
+                continue
+            record = parse_line(tokens[-1])
+            if record is not None:
+                grouped.setdefault(tokens[prefix_tokens - 1], []).append(record)
+    return grouped
+
+
+def parse_asc(filepath, kind, version=None):
+    """
+    解析任一已註冊格式的 Nails / Parts 檔，回傳與 parse_Nailsasc / parse_Partsasc 相同的 list of dict。
+    檔案內有多個版本 (Bojay 報告) 時取 version 指定的版本，未指定時取最後一個 (New Version)。
+    """
+    grouped = parse_asc_versions(filepath, kind)
+    if version is None:
+        return list(grouped.values())[-1] if grouped else []
+    if version not in grouped:
+        raise KeyError(f"{filepath} 中沒有版本 {version}，可用版本：{', '.join(grouped)}")
+    return grouped[version]
+
+
+def parse_Nails_file(filepath):
+    return parse_asc(filepath, "Nails")
+
+
+def parse_Parts_file(filepath):
+    return parse_asc(filepath, "Parts")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="自動判斷 Tebo / Bojay 格式並解析 Nails / Parts 記錄")
+    parser.add_argument("file")
+    parser.add_argument("--kind", choices=list(Asc_kinds), default="Nails")
+    args = parser.parse_args()
+
+    print(f"格式：{sniff_dialect(read_head(args.file))}")
+    for label, records in parse_asc_versions(args.file, args.kind).items():
+        print(f"{label or '(no label)'} : {args.kind} = {len(records)}")
@@ -0,0 +1,139 @@
+import os
+import sys
+
+from TeboCADProcess import parse_Pinsasc, parse_Netsasc
+from TeboCADProcess import Nails_asc_name, Parts_asc_name, Pins_asc_name, Nets_asc_name
+from HTMLparser import read_html_by_name, extract_all_component, build_component_index
+from AscFormats import parse_Nails_file, parse_Parts_file
+
+
+def intern_records(records, keys):
+    """
+    將 records 中指定欄位的字串 intern，
+    讓 Parts / Pins / Nets / Nails 中重複的零件名稱與 Net Name 共用同一個物件。
+    """
+    for item in records:
+        for key in keys:
+            value = item.get(key)
+            if isinstance(value, str):
+                item[key] = sys.intern(value)
+    return records
+
+
+class Board:
+    """
+    單一 CAD 版本的板子資料模型，每個版本只建立一次。
+
+    資料表 (沿用各 parse_* 函式的 list of dict 格式)：
+        parts : parse_Partsasc
+        pins  : parse_Pinsasc
+        nets  : parse_Netsasc
+        nails : parse_Nailsasc
+        comps : extract_all_component (VF HTML 元件表，可選)
+
+    交叉索引：
+        part_index    : 零件名稱 → part
+        part_pins     : 零件名稱 → list of pin
+        pin_index     : "零件.pin" (例如 U107.1) → pin
+        net_index     : Net Name → net
+        net_pins      : Net Name → list of pin
+        nail_index    : Nail 編號 ($1) → nail
+        net_nails     : Net Name → list of nail
+        coverage_index: 元件編號 → HTML 元件資料 (build_component_index)
+    """
+
+    def __init__(self, label, parts=None, pins=None, nets=None, nails=None, comps=None):
+        self.label = label
+        self.parts = intern_records(parts or [], ("Part", "T/B", "Device", "Outline"))
+        self.pins = intern_records(pins or [], ("Part", "T/B", "Net Name"))
+        self.nets = intern_records(nets or [], ("Net Name",))
+        self.nails = intern_records(nails or [], ("T/B", "Net Name", "Virtual Pin"))
+        self.comps = comps or []
+
+        self.part_index = {item["Part"]: item for item in self.parts}
+
+        self.part_pins = {}
+        self.pin_index = {}
+        self.net_pins = {}
+        for pin in self.pins:
+            self.part_pins.setdefault(pin["Part"], []).append(pin)
+            self.pin_index[f"{pin['Part']}.{pin['Pin']}"] = pin
+            if pin["Net Name"]:
+                self.net_pins.setdefault(pin["Net Name"], []).append(pin)
+
+        self.net_index = {net["Net Name"]: net for net in self.nets}
+
+        self.nail_index = {}
+        self.net_nails = {}
+        for nail in self.nails:
+            self.nail_index[nail["Nail"]] = nail
+            self.net_nails.setdefault(nail["Net Name"], []).append(nail)
+
+        self.coverage_index = build_component_index(self.comps)
+
+    def __repr__(self):
+        return (f"Board({self.label!r}, parts={len(self.parts)}, pins={len(self.pins)}, "
+                f"nets={len(self.nets)}, nails={len(self.nails)}, comps={len(self.comps)})")
+
+    def get_part(self, part):
+        return self.part_index.get(part)
+
+    def pins_of(self, part):
+        """回傳零件的所有 pin"""
+        return self.part_pins.get(part, [])
+
+    def get_pin(self, pin_ref):
+        """"零件.pin" (例如 U107.1) → pin，找不到回傳 None"""
+        return self.pin_index.get(pin_ref)
+
+    def pins_on_net(self, net_name):
+        """回傳連到該 Net 的所有 pin"""
+        return self.net_pins.get(net_name, [])
+
+    def nails_on_net(self, net_name):
+        """回傳該 Net 上的所有 nail"""
+        return self.net_nails.get(net_name, [])
+
+    def net_of_nail(self, nail):
+        """Nail 編號 ($1) → Net Name，找不到回傳 None"""
+        item = self.nail_index.get(nail)
+        return item["Net Name"] if item else None
+
+    def coverage_of(self, designator):
+        """元件編號 → HTML 元件資料 (extract_all_component 的一列)，找不到回傳 None"""
+        return self.coverage_index.get(designator)
+
+
+def load_board(folder, label=None, html_file=None):
+    """
+    從 CAD 資料夾建立 Board，資料夾中不存在的 .asc 檔視為空表。
+
+    參數:
+        folder   : CAD 資料夾路徑 (內含 Parts.asc / Pins.asc / Nets.asc / Nails.asc)
+        label    : 版本名稱，預設為資料夾名稱
+        html_file: VF HTML 元件報告路徑 (可選)
+    """
+    if label is None:
+        label = os.path.basename(os.path.normpath(folder))
+
+    def parse_if_exists(parse_func, file_name):
+        path = os.path.join(folder, file_name)
+        if os.path.exists(path):
+            return parse_func(path)
+        print(f"找不到檔案：{path}")
+        return []
+
+    # Parts / Nails 依檔頭自動判斷格式 (Tebo / Bojay)
+    parts = parse_if_exists(parse_Parts_file, Parts_asc_name)
+    pins = parse_if_exists(parse_Pinsasc, Pins_asc_name)
+    nets = parse_if_exists(parse_Netsasc, Nets_asc_name)
+    nails = parse_if_exists(parse_Nails_file, Nails_asc_name)
+
+    comps = []
+    if html_file:
+        soup = read_html_by_name(html_file)
+        comps = extract_all_component(soup, start_idx=5, end_idx=10)
+
+    board = Board(label, parts, pins, nets, nails, comps)
+    print(f"已建立 {board}")
+    return board
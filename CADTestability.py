@@ -0,0 +1,91 @@
+import argparse
+import math
+import os
+
+import pandas as pd
+
+from BoardModel import load_board
+from HTMLparser import evaluate_testability, build_component_index
+from Instance import create_or_replace_file, write_list_to_file, extract_location_texts_SFCS
+
+CAD_testability_output = "CAD_testability_output.txt"
+
+
+def compute_CAD_coverage(board):
+    """
+    直接由 Nets.asc / Pins.asc / Nails.asc 計算元件可測度 (不需 VF HTML)。
+    pin 所在的 Net 上至少有一根 nail 即視為可測；沒有接 Net 的 pin 視為不可測。
+    以 pandas 在整張 pin 表上一次計算，不逐顆零件迴圈。
+
+    回傳與 extract_all_component 相同欄位的 list of list：
+        [元件編號, SMD/THD, T/B, 腳數, 不可植針腳數, 測試百分比, 不可植針腳清單]
+    可直接交給 build_component_index / evaluate_testability 使用。
+    """
+    if not board.pins:
+        return []
+
+    pins = pd.DataFrame(board.pins, columns=["Part", "T/B", "Pin", "Layer", "Net Name"])
+    probed_nets = [net_name for net_name, nails in board.net_nails.items() if nails]
+    pins["Probed"] = pins["Net Name"].isin(probed_nets) & (pins["Net Name"] != "")
+    pins["THD"] = pins["Layer"] == "0"  # Layer 0 為貫穿孔
+
+    summary = pins.groupby("Part", sort=False).agg(
+        TB=("T/B", "first"),
+        Pin_count=("Pin", "size"),
+        Probed_count=("Probed", "sum"),
+        THD=("THD", "any"),
+    )
+    summary["Unprobed"] = summary["Pin_count"] - summary["Probed_count"]
+    summary["Percent"] = summary["Probed_count"] / summary["Pin_count"] * 100.0
+
+    unprobed_pins = pins.loc[~pins["Probed"]].groupby("Part", sort=False)["Pin"].agg(", ".join)
+    summary["Unprobed_pins"] = unprobed_pins.reindex(summary.index).fillna("")
+
+    # 無條件捨去到 0.1%：只有全部可測才會顯示 100.0%，與 VF 報告的寫法相同
+    percent_text = summary["Percent"].map(
+        lambda value: "0%" if value == 0 else f"{math.floor(value * 10) / 10:.1f}%")
+    kind = summary["THD"].map({True: "THD", False: "SMD"})
+
+    return [
+        [part, kind[part], tb, str(pin_count), str(unprobed), percent_text[part], unprobed_list]
+        for part, tb, pin_count, unprobed, unprobed_list in zip(
+            summary.index, summary["TB"], summary["Pin_count"], summary["Unprobed"], summary["Unprobed_pins"]
+        )
+    ]
+
+
+def evaluate_CAD_testability(board, BOM_Comp_list_src=None):
+    """
+    以 CAD 計算的可測度評估元件，輸出格式與 comp_testability_output.txt 相同：
+    [元件編號, 腳數, 不可植針腳數, 測試狀態]
+    BOM_Comp_list_src 為 None 時評估 CAD 內所有零件。
+    """
+    Comp_raw_list = compute_CAD_coverage(board)
+    if BOM_Comp_list_src is None:
+        BOM_Comp_list_src = [item[0] for item in Comp_raw_list]
+    return evaluate_testability(Comp_raw_list, BOM_Comp_list_src, build_component_index(Comp_raw_list))
+
+
+def execute_CAD_testability(cad_folder, output_file=CAD_testability_output, BOM_file=None):
+    """讀取 CAD 資料夾 (與可選的 SFCS BOM)，將元件可測度寫到 output_file"""
+    board = load_board(cad_folder)
+    BOM_Comp_list = extract_location_texts_SFCS(BOM_file) if BOM_file else None
+
+    Comp_testability_list = evaluate_CAD_testability(board, BOM_Comp_list)
+
+    create_or_replace_file(output_file)
+    write_list_to_file(Comp_testability_list, output_file)
+    return Comp_testability_list
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="由 Tebo CAD (Nets/Pins/Nails) 直接計算元件可測度")
+    parser.add_argument("cad", help="CAD 資料夾")
+    parser.add_argument("--bom", help="SFCS BOM 檔 (可選，預設評估所有 CAD 零件)")
+    parser.add_argument("--output", default=CAD_testability_output)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.cad):
+        print(f"Error: cad folder '{args.cad}' not found.")
+    else:
+        execute_CAD_testability(args.cad, args.output, args.bom)
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from BoardModel import load_board
+from TeboCADProcess import (
+    Nails_asc_output, Parts_asc_output, Nails_shift_threshold, Parts_shift_threshold,
+    CAD_registration, Registration_tolerance,
+)
+from ReconcileProcess import execute_BOM_CAD_summary, main_reconcile, BOM_CAD_output, BOM_testability_output
+from HTMLparser import main_HTMLparser, HTML_comp_raw_output, comp_testability_output
+from Tebo_instance import run_Tebo_reports
+
+Job_workers = 4  # run_jobs 預設同時執行的工作數
+
+
+class DiffJob:
+    """
+    一次新舊 CAD 版本比對的完整設定：輸入資料夾、輸出檔案與門檻都存在物件上，
+    不讀寫模組層級的變數，也不依賴目前工作目錄 (建立時即轉成絕對路徑)。
+    同一個 process 內可同時執行多個 DiffJob，只要各自的輸出路徑不同。
+
+    除了 Nails / Parts 報告，依提供的檔案另外產生：
+        bom_file                         → BOM / CAD 比對 (bom_output)
+        html_file + SFCS bom_file        → BOM 元件可測度 (raw_output、testability_output，同 main_HTMLparser)
+        html_file + plm_file + SFCS bom  → PLM / SFCS / HTML 三方比對 (reconcile_output，同 main_reconcile)
+    """
+
+    def __init__(self, new_folder, old_folder, output_dir=".",
+                 nails_output=Nails_asc_output, parts_output=Parts_asc_output,
+                 nails_threshold=Nails_shift_threshold, parts_threshold=Parts_shift_threshold,
+                 register=CAD_registration, tolerance_mil=Registration_tolerance,
+                 high_speed_file=None, bom_file=None, bom_type="SFCS", bom_output=BOM_CAD_output,
+                 html_file=None, raw_output=HTML_comp_raw_output, testability_output=comp_testability_output,
+                 plm_file=None, reconcile_output=BOM_testability_output,
+                 label_new=None, label_old=None):
+        self.new_folder = os.path.abspath(new_folder)
+        self.old_folder = os.path.abspath(old_folder)
+        self.output_dir = os.path.abspath(output_dir)
+
+        # 相對的輸出檔名以 output_dir 為基準
+        self.nails_output = os.path.join(self.output_dir, nails_output)
+        self.parts_output = os.path.join(self.output_dir, parts_output)
+        self.bom_output = os.path.join(self.output_dir, bom_output)
+        self.raw_output = os.path.join(self.output_dir, raw_output)
+        self.testability_output = os.path.join(self.output_dir, testability_output)
+        self.reconcile_output = os.path.join(self.output_dir, reconcile_output)
+
+        self.nails_threshold = float(nails_threshold)
+        self.parts_threshold = float(parts_threshold)
+        self.register = bool(register)
+        self.tolerance_mil = float(tolerance_mil)
+        self.high_speed_file = os.path.abspath(high_speed_file) if high_speed_file else None
+        self.bom_file = os.path.abspath(bom_file) if bom_file else None
+        self.bom_type = bom_type
+        self.html_file = os.path.abspath(html_file) if html_file else None
+        self.plm_file = os.path.abspath(plm_file) if plm_file else None
+        self.label_new = label_new
+        self.label_old = label_old
+
+    def outputs(self):
+        """本工作會寫入的報告檔 (絕對路徑)"""
+        paths = [self.nails_output, self.parts_output]
+        if self.bom_file:
+            paths.append(self.bom_output)
+        if self.runs_testability():
+            paths += [self.raw_output, self.testability_output]
+        if self.runs_reconcile():
+            paths.append(self.reconcile_output)
+        return paths
+
+    def runs_testability(self):
+        return bool(self.html_file and self.bom_file and self.bom_type.upper() == "SFCS")
+
+    def runs_reconcile(self):
+        return bool(self.runs_testability() and self.plm_file)
+
+    def run(self, get_board=load_board):
+        """
+        執行比對並寫出報告，回傳結果摘要 dict。
+        get_board 為 folder → Board 的函式，可傳入 DiffServiceState.get_board 等共用快取。
+        """
+        for folder in (self.new_folder, self.old_folder):
+            if not os.path.isdir(folder):
+                raise FileNotFoundError(f"找不到 CAD 資料夾：{folder}")
+        for path, name in ((self.bom_file, "BOM"), (self.html_file, "HTML"), (self.plm_file, "PLM BOM")):
+            if path and not os.path.exists(path):
+                raise FileNotFoundError(f"找不到 {name} 檔案：{path}")
+
+        start = time.perf_counter()
+        board_new = get_board(self.new_folder)
+        board_old = get_board(self.old_folder)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        run_Tebo_reports(board_new, board_old, self.label_new, self.label_old,
+                         self.nails_output, self.parts_output,
+                         self.nails_threshold, self.parts_threshold,
+                         self.register, self.tolerance_mil, self.high_speed_file)
+
+        if self.bom_file:
+            execute_BOM_CAD_summary(self.bom_file, self.label_new or board_new.label, self.bom_output,
+                                    self.bom_type, board=board_new, base_dir=self.output_dir)
+        if self.runs_testability():
+            main_HTMLparser(self.html_file, self.bom_file, self.output_dir, self.raw_output, self.testability_output)
+        if self.runs_reconcile():
+            main_reconcile(self.plm_file, self.bom_file, self.html_file, self.reconcile_output, self.output_dir)
+
+        return {
+            "new": self.new_folder,
+            "old": self.old_folder,
+            "outputs": self.outputs(),
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+
+
+def check_job_outputs(jobs):
+    """同一批工作不可寫入相同的報告檔，否則報告內容會互相覆蓋"""
+    seen = {}
+    for i, job in enumerate(jobs):
+        for path in job.outputs():
+            key = os.path.normcase(path)
+            if key in seen:
+                raise ValueError(f"工作 {seen[key]} 與工作 {i} 的輸出檔相同：{path}")
+            seen[key] = i
+
+
+def run_jobs(jobs, workers=Job_workers, get_board=None):
+    """
+    以執行緒池同時執行多個 DiffJob，回傳與 jobs 同順序的結果 list；
+    失敗的工作回傳 {"error": ...}，不影響其他工作。
+    get_board 未提供時，同一批工作中相同的 CAD 資料夾只解析一次。
+    """
+    check_job_outputs(jobs)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if get_board is None:
+            folders = {folder for job in jobs for folder in (job.new_folder, job.old_folder) if os.path.isdir(folder)}
+            futures = {folder: executor.submit(load_board, folder) for folder in folders}
+
+            def get_board(folder):
+                return futures[folder].result()
+
+        job_futures = [executor.submit(job.run, get_board) for job in jobs]
+
+        results = []
+        for job, future in zip(jobs, job_futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"new": job.new_folder, "old": job.old_folder, "error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+def load_jobs(json_file):
+    """
+    讀取工作清單 JSON：list of dict，欄位同 DiffJob 的參數，例如
+        [{"new_folder": "...", "old_folder": "...", "output_dir": "reports/a", "parts_threshold": 5}]
+    相對路徑以 JSON 檔所在目錄為基準。
+    """
+    base_dir = os.path.dirname(os.path.abspath(json_file))
+    with open(json_file, "r", encoding="utf-8") as f:
+        specs = json.load(f)
+
+    jobs = []
+    for spec in specs:
+        spec = dict(spec)
+        for key in ("new_folder", "old_folder", "output_dir", "high_speed_file", "bom_file", "html_file", "plm_file"):
+            if spec.get(key):
+                spec[key] = os.path.join(base_dir, spec[key])
+        jobs.append(DiffJob(**spec))
+    return jobs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在同一個 process 內同時執行多組 CAD 版本比對")
+    parser.add_argument("jobs", help="工作清單 JSON (list of DiffJob 參數)")
+    parser.add_argument("--workers", type=int, default=Job_workers)
+    args = parser.parse_args()
+
+    for result in run_jobs(load_jobs(args.jobs), args.workers):
+        if "error" in result:
+            print(f"失敗 {result['new']} vs {result['old']}: {result['error']}")
+        else:
+            print(f"完成 {result['new']} vs {result['old']} ({result['seconds']} 秒)")
@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from BoardModel import load_board
+from TeboCADProcess import (
+    Nails_asc_name, Parts_asc_name, Pins_asc_name, Nets_asc_name, Parts_shift_threshold,
+    CAD_registration, Registration_tolerance, estimate_transform, is_identity_transform,
+    find_Nailsasc_shift, find_Nailsasc_Del, find_Nailsasc_Add,
+    find_Partsasc_changes, filter_Parts_shift, filter_Parts_swap, find_Partsasc_Del, find_Partsasc_Add,
+)
+from HTMLparser import read_html_by_name, extract_all_component, evaluate_testability, build_component_index
+from ReconcileProcess import load_BOM_locations, find_BOM_CAD_mismatch
+from DiffJob import DiffJob
+
+service_host = "127.0.0.1"
+service_port = 8765
+cache_size = 16  # 最多保留的解析結果數量
+
+
+class LRUCache:
+    """
+    執行緒安全的 LRU 快取。
+    key 內含檔案的 mtime，檔案被更新後自然視為新的項目。
+    """
+
+    def __init__(self, maxsize=cache_size):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key, loader):
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+
+        # 解析放在鎖外，避免阻塞其他請求
+        value = loader()
+
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+def file_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+class DiffServiceState:
+    """服務共用的快取：CAD 版本 (Board)、BOM 位置清單、VF HTML 元件表"""
+
+    def __init__(self, maxsize=cache_size):
+        self.cache = LRUCache(maxsize)
+
+    def get_board(self, folder):
+        folder = os.path.abspath(folder)
+        if not os.path.isdir(folder):
+            raise FileNotFoundError(f"找不到 CAD 資料夾：{folder}")
+        key = ("board", folder) + tuple(
+            file_mtime(os.path.join(folder, name))
+            for name in (Parts_asc_name, Pins_asc_name, Nets_asc_name, Nails_asc_name)
+        )
+        return self.cache.get_or_load(key, lambda: load_board(folder))
+
+    def get_bom(self, bom_file, bom_type="SFCS"):
+        bom_file = os.path.abspath(bom_file)
+        if not os.path.exists(bom_file):
+            raise FileNotFoundError(f"找不到 BOM 檔案：{bom_file}")
+        key = ("bom", bom_file, bom_type.upper(), file_mtime(bom_file))
+        return self.cache.get_or_load(key, lambda: load_BOM_locations(bom_file, bom_type))
+
+    def get_coverage(self, html_file):
+        """回傳 (Comp_raw_list, comp_index)"""
+        html_file = os.path.abspath(html_file)
+        if not os.path.exists(html_file):
+            raise FileNotFoundError(f"找不到 HTML 檔案：{html_file}")
+        key = ("html", html_file, file_mtime(html_file))
+
+        def loader():
+            comps = extract_all_component(read_html_by_name(html_file), start_idx=5, end_idx=10)
+            return comps, build_component_index(comps)
+
+        return self.cache.get_or_load(key, loader)
+
+
+class RequestError(Exception):
+    """請求參數錯誤 (缺少必要參數或型別不符)，回應 400"""
+
+
+def require(params, *names):
+    """確認必要參數都有帶入，缺少時丟出 RequestError"""
+    missing = [name for name in names if name not in params]
+    if missing:
+        raise RequestError(f"missing parameter {', '.join(missing)}")
+
+
+def request_bool(params, name, default):
+    """讀取 JSON bool 參數；"false"、0 等其他型別一律視為錯誤，避免被當成 True"""
+    value = params.get(name, default)
+    if not isinstance(value, bool):
+        raise RequestError(f"parameter {name} must be a JSON bool (true / false), got {value!r}")
+    return value
+
+
+def pair_nails_shift(shift_list):
+    """find_Nailsasc_shift 的結果是新舊交錯的 list，轉成 [{"new":..., "old":...}]"""
+    return [{"new": shift_list[i], "old": shift_list[i + 1]} for i in range(0, len(shift_list), 2)]
+
+
+def request_transform(params, CAD_new, CAD_old, key):
+    """
+    依請求的 register (預設 CAD_registration) 估計新舊版本的整體平移/旋轉，
+    與 execute_Nails_summary / execute_Parts_summary 相同；不做 registration 時回傳 None。
+    """
+    if not request_bool(params, "register", CAD_registration):
+        return None
+    return estimate_transform(CAD_new, CAD_old, key)
+
+
+def handle_diff_nails(state, params):
+    require(params, "new", "old")
+    board_new = state.get_board(params["new"])
+    board_old = state.get_board(params["old"])
+    tolerance_mil = float(params.get("tolerance_mil", Registration_tolerance))
+    transform = request_transform(params, board_new.nails, board_old.nails, "Net Name")
+    return {
+        "registered": transform is not None and not is_identity_transform(transform, tolerance_mil),
+        "shift": pair_nails_shift(find_Nailsasc_shift(board_new.nails, board_old.nails, transform, tolerance_mil)),
+        "del": find_Nailsasc_Del(board_new.nails, board_old.nails),
+        "add": find_Nailsasc_Add(board_new.nails, board_old.nails),
+    }
+
+
+def handle_diff_parts(state, params):
+    require(params, "new", "old")
+    board_new = state.get_board(params["new"])
+    board_old = state.get_board(params["old"])
+    threshold_mil = float(params.get("threshold_mil", Parts_shift_threshold))
+    transform = request_transform(params, board_new.parts, board_old.parts, "Part")
+    changes = find_Partsasc_changes(board_new.parts, board_old.parts, threshold_mil, transform)
+    return {
+        "registered": transform is not None and not is_identity_transform(transform),
+        "shift": filter_Parts_shift(changes),
+        "swap": filter_Parts_swap(changes),
+        "del": find_Partsasc_Del(board_new.parts, board_old.parts),
+        "add": find_Partsasc_Add(board_new.parts, board_old.parts),
+    }
+
+
+def handle_testability(state, params):
+    require(params, "html", "bom")
+    comps, comp_index = state.get_coverage(params["html"])
+    locations = state.get_bom(params["bom"], params.get("bom_type", "SFCS"))
+    return {"testability": evaluate_testability(comps, locations, comp_index)}
+
+
+def handle_bom(state, params):
+    require(params, "bom")
+    return {"locations": state.get_bom(params["bom"], params.get("bom_type", "SFCS"))}
+
+
+def handle_bom_cad(state, params):
+    require(params, "cad", "bom")
+    board = state.get_board(params["cad"])
+    locations = state.get_bom(params["bom"], params.get("bom_type", "SFCS"))
+    return find_BOM_CAD_mismatch(locations, board.parts, board.part_index)
+
+
+def handle_reports(state, params):
+    """以 DiffJob 產生完整報告檔，門檻與輸出目錄由請求帶入，解析結果共用服務的快取"""
+    require(params, "new", "old", "output_dir")
+    if "register" in params:
+        request_bool(params, "register", CAD_registration)
+    options = {key: params[key] for key in (
+        "nails_output", "parts_output", "nails_threshold", "parts_threshold",
+        "register", "tolerance_mil", "high_speed_file", "bom_file", "bom_type", "html_file", "plm_file"
+    ) if key in params}
+    job = DiffJob(params["new"], params["old"], params["output_dir"], **options)
+    return job.run(state.get_board)
+
+
+def handle_stats(state, params):
+    return state.cache.stats()
+
+
+ROUTES = {
+    "/diff/nails": handle_diff_nails,
+    "/diff/parts": handle_diff_parts,
+    "/testability": handle_testability,
+    "/bom": handle_bom,
+    "/reconcile/bom-cad": handle_bom_cad,
+    "/reports": handle_reports,
+    "/stats": handle_stats,
+}
+
+
+class DiffRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API：
+        POST /diff/nails         {"new": 資料夾, "old": 資料夾, "register": true, "tolerance_mil": 0.05}
+        POST /diff/parts         {"new": 資料夾, "old": 資料夾, "threshold_mil": 3, "register": true}
+        POST /testability        {"html": VF/1.htm, "bom": BOM 檔, "bom_type": "SFCS"}
+        POST /bom                {"bom": BOM 檔, "bom_type": "SFCS" | "PLM"}
+        POST /reconcile/bom-cad  {"bom": BOM 檔, "cad": 資料夾}
+        POST /reports            {"new": 資料夾, "old": 資料夾, "output_dir": 報告目錄, "parts_threshold": 3, ...}
+        GET  /stats
+    """
+
+    state = None  # 由 serve() 設定
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def dispatch(self, params):
+        handler = ROUTES.get(self.path.split("?", 1)[0])
+        if handler is None:
+            self.send_json(404, {"error": f"unknown endpoint {self.path}"})
+            return
+
+        start = time.perf_counter()
+        try:
+            result = handler(self.state, params)
+        except RequestError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except FileNotFoundError as e:
+            self.send_json(404, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+        self.send_json(200, result)
+
+    def do_GET(self):
+        self.dispatch({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_json(400, {"error": "invalid JSON body"})
+            return
+        if not isinstance(params, dict):
+            self.send_json(400, {"error": "JSON body must be an object"})
+            return
+        self.dispatch(params)
+
+
+def serve(host=service_host, port=service_port, maxsize=cache_size):
+    """啟動本機常駐比對服務 (每個請求一個執行緒)"""
+    DiffRequestHandler.state = DiffServiceState(maxsize)
+    server = ThreadingHTTPServer((host, port), DiffRequestHandler)
+    server.daemon_threads = True
+    print(f"Diff service 啟動於 http://{host}:{port} (cache = {maxsize})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本機常駐 CAD / BOM 比對服務")
+    parser.add_argument("--host", default=service_host)
+    parser.add_argument("--port", type=int, default=service_port)
+    parser.add_argument("--cache", type=int, default=cache_size, help="LRU 快取項目數")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.cache)
@@ -0,0 +1,199 @@
+import argparse
+import math
+import os
+import time
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+from BoardModel import load_board
+from CADTestability import evaluate_CAD_testability
+from Instance import extract_location_texts_SFCS
+from TeboCADProcess import (
+    Nails_shift_threshold, Parts_shift_threshold, CAD_registration, Registration_tolerance,
+    estimate_transform, is_identity_transform,
+    find_Nailsasc_shift, find_Nailsasc_Del, find_Nailsasc_Add,
+    find_Partsasc_changes, filter_Parts_shift, filter_Parts_swap, find_Partsasc_Del, find_Partsasc_Add,
+)
+
+Excel_output = "Diff_report.xlsx"
+Excel_min_width = 8    # 欄寬 (字元)
+Excel_max_width = 40
+
+Nails_header = ["Nail", "X", "Y", "T/B", "Net", "Net Name", "Virtual Pin"]
+Parts_header = ["Part", "X", "Y", "Rot", "Grid", "T/B", "Device", "Outline"]
+Testability_header = ["Part", "Pins", "Unprobed Pins", "Status", "Not Testable"]
+
+
+def write_sheet(wb, title, header, rows):
+    """
+    在 write-only 活頁簿新增一張表：凍結表頭、開啟自動篩選，rows 可為 generator (逐列寫出，不保留在記憶體)。
+    回傳寫入的資料列數。
+    """
+    ws = wb.create_sheet(title)
+    for i, name in enumerate(header, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = min(max(len(name) + 4, Excel_min_width), Excel_max_width)
+    ws.freeze_panes = "A2"
+
+    ws.append(header)
+    count = 0
+    for row in rows:
+        ws.append(row)
+        count += 1
+
+    # auto_filter 在存檔時才寫出，因此可在串流完成、列數確定後設定
+    ws.auto_filter.ref = f"A1:{get_column_letter(len(header))}{count + 1}"
+    return count
+
+
+def flag(value):
+    return "Y" if value else ""
+
+
+def Nails_shift_rows(shift_list, threshold_mil):
+    """find_Nailsasc_shift 的 (新, 舊) 成對結果 → 每組一列；距離計算同 save_Nails_shift_notebook"""
+    for i in range(0, len(shift_list), 2):
+        new, old = shift_list[i], shift_list[i + 1]
+        old_x, old_y = old.get("Reg X", old["X"]), old.get("Reg Y", old["Y"])
+        distance_mil = math.hypot(new["X"] - old_x, new["Y"] - old_y) * 1000.0
+        yield [new["Net Name"], new["Nail"], old["Nail"], new["X"], new["Y"], new["T/B"],
+               old["X"], old["Y"], old["T/B"], round(distance_mil, 3),
+               flag("Reg X" in old), flag(distance_mil > threshold_mil)]
+
+
+def Parts_shift_rows(shift_list, threshold_mil):
+    """filter_Parts_shift 的結果 → 每個 Part 一列；Over Threshold 區分真正位移與只有旋轉的項目"""
+    for item in shift_list:
+        new, old = item["New"], item["Old"]
+        yield [item["Part"], new["X"], new["Y"], new["Rot"], new["T/B"], old["X"], old["Y"], old["Rot"], old["T/B"],
+               round(item["Distance_mil"], 3), round(item["Rot_diff"], 3),
+               round(item["Raw_distance_mil"], 3) if "Raw_distance_mil" in item else None,
+               ", ".join(item["Changes"]), flag(item["Distance_mil"] >= threshold_mil)]
+
+
+def Parts_swap_rows(swap_list):
+    for item in swap_list:
+        new, old = item["New"], item["Old"]
+        yield [item["Part"], new["T/B"], old["T/B"], new.get("Device", ""), old.get("Device", ""),
+               new.get("Outline", ""), old.get("Outline", ""), ", ".join(item["Changes"])]
+
+
+def record_rows(records, header):
+    for item in records:
+        yield [item.get(name, "") for name in header]
+
+
+def Testability_rows(testability_list):
+    """evaluate_testability 的 [元件編號, 腳數, 不可植針腳數, 測試狀態] → 一列，腳數轉成數值以便篩選"""
+    for part, pin_count, unprobed, status in testability_list:
+        yield [part, int(pin_count) if str(pin_count).isdigit() else pin_count,
+               int(str(unprobed).strip()) if str(unprobed).strip().isdigit() else unprobed,
+               status, flag(status != "testable")]
+
+
+def export_diff_xlsx(filepath, board_new, board_old, label_new=None, label_old=None,
+                     nails_threshold=Nails_shift_threshold, parts_threshold=Parts_shift_threshold,
+                     register=CAD_registration, tolerance_mil=Registration_tolerance, testability_list=None):
+    """
+    將 Diff_Nails_report / Diff_Parts_report 的各段落 (與可選的元件可測度) 匯出成一個 xlsx，每段一張表。
+    比對邏輯與 execute_Nails_summary / execute_Parts_summary 相同；以 write-only 模式逐列寫出，
+    記憶體只需容納比對結果本身。回傳 dict：表名 → 列數。
+    """
+    label_new = label_new or board_new.label
+    label_old = label_old or board_old.label
+
+    nails_transform = estimate_transform(board_new.nails, board_old.nails, "Net Name") if register else None
+    parts_transform = estimate_transform(board_new.parts, board_old.parts, "Part") if register else None
+    parts_changes = find_Partsasc_changes(board_new.parts, board_old.parts, parts_threshold, parts_transform)
+
+    wb = Workbook(write_only=True)
+    counts = {}
+
+    summary = wb.create_sheet("Summary")
+    for row in (["New Version", label_new], ["Old Version", label_old],
+                ["Nails threshold (mil)", nails_threshold], ["Parts threshold (mil)", parts_threshold],
+                ["Registration", flag(register)],
+                ["Nails registered", flag(nails_transform is not None and not is_identity_transform(nails_transform))],
+                ["Parts registered", flag(parts_transform is not None and not is_identity_transform(parts_transform))]):
+        summary.append(row)
+
+    counts["Nails Shift"] = write_sheet(
+        wb, "Nails Shift",
+        ["Net Name", "Nail New", "Nail Old", "X New", "Y New", "T/B New", "X Old", "Y Old", "T/B Old",
+         "Distance (mil)", "Registered", "Over Threshold"],
+        Nails_shift_rows(find_Nailsasc_shift(board_new.nails, board_old.nails, nails_transform, tolerance_mil),
+                         nails_threshold))
+    counts["Nails Del"] = write_sheet(wb, "Nails Del", Nails_header,
+                                      record_rows(find_Nailsasc_Del(board_new.nails, board_old.nails), Nails_header))
+    counts["Nails Add"] = write_sheet(wb, "Nails Add", Nails_header,
+                                      record_rows(find_Nailsasc_Add(board_new.nails, board_old.nails), Nails_header))
+
+    counts["Parts Shift"] = write_sheet(
+        wb, "Parts Shift",
+        ["Part", "X New", "Y New", "Rot New", "T/B New", "X Old", "Y Old", "Rot Old", "T/B Old",
+         "Distance (mil)", "Rot Diff", "Raw Distance (mil)", "Changes", "Over Threshold"],
+        Parts_shift_rows(filter_Parts_shift(parts_changes), parts_threshold))
+    counts["Parts Del"] = write_sheet(wb, "Parts Del", Parts_header,
+                                      record_rows(find_Partsasc_Del(board_new.parts, board_old.parts), Parts_header))
+    counts["Parts Add"] = write_sheet(wb, "Parts Add", Parts_header,
+                                      record_rows(find_Partsasc_Add(board_new.parts, board_old.parts), Parts_header))
+    counts["Parts Changed"] = write_sheet(
+        wb, "Parts Changed",
+        ["Part", "T/B New", "T/B Old", "Device New", "Device Old", "Outline New", "Outline Old", "Changes"],
+        Parts_swap_rows(filter_Parts_swap(parts_changes)))
+
+    if testability_list is not None:
+        counts["Testability"] = write_sheet(wb, "Testability", Testability_header, Testability_rows(testability_list))
+
+    for name, count in counts.items():
+        summary.append([name, count])
+
+    wb.save(filepath)
+    print(f"Excel 報告已寫到 {filepath}")
+    return counts
+
+
+def execute_Excel_export(new_folder, old_folder, output_file=Excel_output,
+                         nails_threshold=Nails_shift_threshold, parts_threshold=Parts_shift_threshold,
+                         register=CAD_registration, tolerance_mil=Registration_tolerance,
+                         testability=False, BOM_file=None):
+    """
+    讀取新舊 CAD 資料夾並匯出 xlsx。
+    testability = True 時另外加上新版的元件可測度表 (evaluate_CAD_testability；有 BOM_file 時只評估 BOM 元件)。
+    """
+    board_new = load_board(new_folder)
+    board_old = load_board(old_folder)
+
+    testability_list = None
+    if testability:
+        BOM_Comp_list = extract_location_texts_SFCS(BOM_file) if BOM_file else None
+        testability_list = evaluate_CAD_testability(board_new, BOM_Comp_list)
+
+    return export_diff_xlsx(output_file, board_new, board_old, nails_threshold=nails_threshold,
+                            parts_threshold=parts_threshold, register=register, tolerance_mil=tolerance_mil,
+                            testability_list=testability_list)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="將新舊 CAD 的 Nails / Parts 差異 (與元件可測度) 匯出成 xlsx")
+    parser.add_argument("new", help="新版 CAD 資料夾")
+    parser.add_argument("old", help="舊版 CAD 資料夾")
+    parser.add_argument("--output", default=Excel_output)
+    parser.add_argument("--nails-threshold", type=float, default=Nails_shift_threshold, help="Nails 位移門檻 (mil)")
+    parser.add_argument("--parts-threshold", type=float, default=Parts_shift_threshold, help="Parts 位移門檻 (mil)")
+    parser.add_argument("--no-register", action="store_true", help="不做整體平移/旋轉 registration")
+    parser.add_argument("--testability", action="store_true", help="加上新版元件可測度表")
+    parser.add_argument("--bom", help="SFCS BOM 檔 (可測度只評估 BOM 元件)")
+    args = parser.parse_args()
+
+    for folder in (args.new, args.old):
+        if not os.path.isdir(folder):
+            raise SystemExit(f"Error: cad folder '{folder}' not found.")
+
+    start = time.perf_counter()
+    counts = execute_Excel_export(args.new, args.old, args.output, args.nails_threshold, args.parts_threshold,
+                                  not args.no_register, testability=args.testability or bool(args.bom),
+                                  BOM_file=args.bom)
+    for name, count in counts.items():
+        print(f"{name:<14} {count:>8}")
+    print(f"完成 ({time.perf_counter() - start:.2f} 秒)")
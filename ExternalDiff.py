@@ -0,0 +1,290 @@
+import argparse
+import heapq
+import itertools
+import os
+import pickle
+import shutil
+import tempfile
+from collections import Counter
+
+from Instance import get_executable_path, create_or_replace_file
+from TeboCADProcess import (
+    Nails_asc_name, Parts_asc_name, Nails_asc_output, Parts_asc_output,
+    Nails_shift_threshold, Parts_shift_threshold,
+    parse_Nails_line, parse_Parts_line, compare_Nails_pair, compare_Parts_pair,
+    is_identity_transform, separator, save_Nails_summary_notebook, save_Parts_summary_notebook,
+    format_Nails_line, format_Nails_shift_lines, format_Parts_line, format_Parts_shift_lines, format_Parts_swap_lines,
+)
+
+External_run_size = 200000  # 每個排序 run 在記憶體中的最大筆數
+
+
+def iter_asc_records(filepath, parse_line):
+    """逐行讀取 .asc 檔，以 parse_line 解析，略過回傳 None 的行"""
+    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            record = parse_line(line)
+            if record is not None:
+                yield record
+
+
+def write_run(run, tmpdir):
+    """將已排序的 (key, seq, record) 依序 pickle 到暫存檔，回傳檔名"""
+    fd, path = tempfile.mkstemp(suffix=".run", dir=tmpdir)
+    with os.fdopen(fd, "wb") as f:
+        for entry in run:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def iter_run(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def spill_sorted_runs(records, key, tmpdir, run_size=External_run_size):
+    """
+    將 records 切成最多 run_size 筆的區段，各自依 (key, 原始順序) 排序後寫到暫存檔。
+    記憶體中同時最多只有一個區段。
+    """
+    paths = []
+    run = []
+    for seq, record in enumerate(records):
+        run.append((record[key], seq, record))
+        if len(run) >= run_size:
+            run.sort(key=lambda entry: entry[:2])
+            paths.append(write_run(run, tmpdir))
+            run = []
+    if run:
+        run.sort(key=lambda entry: entry[:2])
+        paths.append(write_run(run, tmpdir))
+    return paths
+
+
+def merge_runs(paths):
+    """以 heapq.merge 合併所有已排序的 run，回傳依 (key, 原始順序) 排序的串流"""
+    return heapq.merge(*(iter_run(path) for path in paths), key=lambda entry: entry[:2])
+
+
+def external_sort(filepath, parse_line, key, tmpdir, run_size=External_run_size):
+    """串流解析 filepath 並做外部排序，回傳 (key, seq, record) 的有序串流"""
+    return merge_runs(spill_sorted_runs(iter_asc_records(filepath, parse_line), key, tmpdir, run_size))
+
+
+def merge_join(sorted_new, sorted_old):
+    """
+    合併兩個依 key 排序的串流，逐一產生 (key, new_group, old_group)；
+    group 為同一 key 的 record list (依原始順序)，任一邊不存在時為空 list。
+    一次只在記憶體中保留一個 key 的資料。
+    """
+    groups_new = itertools.groupby(sorted_new, key=lambda entry: entry[0])
+    groups_old = itertools.groupby(sorted_old, key=lambda entry: entry[0])
+    sentinel = (None, None)
+
+    key_new, group_new = next(groups_new, sentinel)
+    key_old, group_old = next(groups_old, sentinel)
+
+    while group_new is not None or group_old is not None:
+        if group_old is None or (group_new is not None and key_new < key_old):
+            yield key_new, [entry[2] for entry in group_new], []
+            key_new, group_new = next(groups_new, sentinel)
+        elif group_new is None or key_old < key_new:
+            yield key_old, [], [entry[2] for entry in group_old]
+            key_old, group_old = next(groups_old, sentinel)
+        else:
+            yield key_new, [entry[2] for entry in group_new], [entry[2] for entry in group_old]
+            key_new, group_new = next(groups_new, sentinel)
+            key_old, group_old = next(groups_old, sentinel)
+
+
+def iter_Nails_diff(new_file, old_file, tmpdir, run_size=External_run_size, transform=None):
+    """
+    以外部排序 + merge join 比對兩版 Nails.asc，逐筆產生 ("shift", (新, 舊)) / ("del", nail) / ("add", nail)，
+    記憶體用量與檔案大小無關。
+    判斷規則與 find_Nailsasc_shift / Del / Add 相同 (同一 Net Name 以最後一筆比較位置)，但依 Net Name 排序。
+    """
+    if is_identity_transform(transform):
+        transform = None
+
+    sorted_new = external_sort(new_file, parse_Nails_line, "Net Name", tmpdir, run_size)
+    sorted_old = external_sort(old_file, parse_Nails_line, "Net Name", tmpdir, run_size)
+    for _, group_new, group_old in merge_join(sorted_new, sorted_old):
+        if group_new and group_old:
+            pair = compare_Nails_pair(group_new[-1], group_old[-1], transform)
+            if pair is not None:
+                yield "shift", pair
+        elif group_new:
+            for item in group_new:
+                yield "add", item
+        else:
+            for item in group_old:
+                yield "del", item
+
+
+def iter_Parts_diff(new_file, old_file, tmpdir, threshold_mil=Parts_shift_threshold, run_size=External_run_size,
+                    transform=None):
+    """
+    以外部排序 + merge join 比對兩版 Parts.asc，逐筆產生 ("change", change) / ("del", part) / ("add", part)。
+    判斷規則與 find_Partsasc_changes / Del / Add 相同，但依 Part 排序。
+    """
+    if is_identity_transform(transform):
+        transform = None
+
+    sorted_new = external_sort(new_file, parse_Parts_line, "Part", tmpdir, run_size)
+    sorted_old = external_sort(old_file, parse_Parts_line, "Part", tmpdir, run_size)
+    for _, group_new, group_old in merge_join(sorted_new, sorted_old):
+        if group_new and group_old:
+            change = compare_Parts_pair(group_new[-1], group_old[-1], threshold_mil, transform)
+            if change is not None:
+                yield "change", change
+        elif group_new:
+            for item in group_new:
+                yield "add", item
+        else:
+            for item in group_old:
+                yield "del", item
+
+
+class SectionSpool:
+    """
+    報告段落的暫存檔：比對結果逐筆格式化後寫到暫存檔，同時累計表頭的數量；
+    表頭的數量要看完全部資料才知道，因此比對完才把表頭與暫存內容依序續寫到報告。
+    """
+
+    def __init__(self, tmpdir):
+        self.file = tempfile.TemporaryFile("w+", encoding="utf-8", dir=tmpdir)
+        self.counts = Counter()
+
+    def add(self, lines, *keys):
+        """續寫一組內容 (每行一個換行，組與組之間空一行)，並將 keys 各計數一次"""
+        self.file.write("".join(line + "\n" for line in lines) + "\n")
+        self.counts.update(keys)
+
+    def add_line(self, line, *keys):
+        self.file.write(line + "\n")
+        self.counts.update(keys)
+
+    def copy_to(self, f):
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, f)
+        self.file.close()
+
+
+def side_lines(spool):
+    return [f"TOP Side  = {spool.counts['T']}", f"Bottom Side  = {spool.counts['B']}", ""]
+
+
+def stream_Nails_report(new_file, old_file, filepath, label_new, label_old, run_size=External_run_size):
+    """
+    逐筆比對兩版 Nails.asc，直接寫到 Shift / Del / Add 三個段落的暫存檔，
+    最後依序續寫到報告；格式與 save_Nails_shift_notebook / del / add 相同。
+    """
+    with tempfile.TemporaryDirectory(prefix="nails_diff_") as tmpdir:
+        shift, deleted, added = SectionSpool(tmpdir), SectionSpool(tmpdir), SectionSpool(tmpdir)
+        for kind, item in iter_Nails_diff(new_file, old_file, tmpdir, run_size):
+            if kind == "shift":
+                new_item, old_item = item
+                # save_Nails_shift_notebook 的空行在每組之前、結尾不換行
+                lines = format_Nails_shift_lines(new_item, old_item, Nails_shift_threshold, label_new, label_old)
+                shift.add_line("\n" + "\n".join(lines), new_item["T/B"].upper())
+            elif kind == "del":
+                deleted.add_line(format_Nails_line(item, label_old), item["T/B"].upper())
+            else:
+                added.add_line(format_Nails_line(item, label_new), item["T/B"].upper())
+
+        with open(filepath, "a", encoding="utf-8") as f:
+            f.write("\n".join(["[Part 1] Shift Nails"] + side_lines(shift) +
+                              ["Following xy location of test point be shifted between two version"]))
+            shift.copy_to(f)
+            for title, spool, intro in (
+                ("[Part 2] Del Nails", deleted, f"Following are in {label_old} Version, but not found in {label_new} Version"),
+                ("[Part 3] Add Nails", added, f"Following are in {label_new} Version, but not found in {label_old} Version"),
+            ):
+                f.write("\n".join([separator(), title] + side_lines(spool) + [intro]) + "\n")
+                spool.copy_to(f)
+                f.write("\n")
+    print(f"Shift / Del / Add 結果已續寫到 {filepath} (閾值 = {Nails_shift_threshold} mil)")
+
+
+def stream_Parts_report(new_file, old_file, filepath, label_new, label_old,
+                        threshold_mil=Parts_shift_threshold, run_size=External_run_size):
+    """
+    逐筆比對兩版 Parts.asc，直接寫到 Shift / Del / Add / Side-Device-Outline 四個段落的暫存檔，
+    最後依序續寫到報告；格式與 save_Parts_shift_notebook / del / add / swap 相同。
+    """
+    with tempfile.TemporaryDirectory(prefix="parts_diff_") as tmpdir:
+        shift, deleted, added, swap = (SectionSpool(tmpdir) for _ in range(4))
+        for kind, item in iter_Parts_diff(new_file, old_file, tmpdir, threshold_mil, run_size):
+            if kind == "change":
+                changes = item["Changes"]
+                if "Shift" in changes or "Rot" in changes:
+                    shift.add(format_Parts_shift_lines(item, label_new, label_old), item["New"]["T/B"].upper())
+                if "Side" in changes or "Device" in changes or "Outline" in changes:
+                    swap.add(format_Parts_swap_lines(item, label_new, label_old), *changes)
+            elif kind == "del":
+                deleted.add_line(format_Parts_line(item, label_old), item["T/B"].upper())
+            else:
+                added.add_line(format_Parts_line(item, label_new), item["T/B"].upper())
+
+        with open(filepath, "a", encoding="utf-8") as f:
+            f.write("\n".join(["[Part 1] Shift Parts"] + side_lines(shift) +
+                              ["Following xy location of parts be shifted between two version"]) + "\n")
+            shift.copy_to(f)
+            f.write("\n")
+            for title, spool, intro in (
+                ("[Part 2] Del Parts", deleted, f"Following are in {label_old} Version, but not found in {label_new} Version"),
+                ("[Part 3] Add Parts", added, f"Following are in {label_new} Version, but not found in {label_old} Version"),
+            ):
+                f.write("\n".join([separator(), title] + side_lines(spool) + [intro]) + "\n")
+                spool.copy_to(f)
+                f.write("\n")
+            f.write("\n".join([separator(), "[Part 4] Side / Device / Outline Changed Parts",
+                               f"Side = {swap.counts['Side']}, Device = {swap.counts['Device']}, "
+                               f"Outline = {swap.counts['Outline']}", ""]) + "\n")
+            swap.copy_to(f)
+            f.write("\n")
+    print(f"Shift / Del / Add / Side-Device-Outline 結果已續寫到 {filepath}")
+
+
+def execute_external_diff(label_new, label_old, nails_output=Nails_asc_output, parts_output=Parts_asc_output,
+                          run_size=External_run_size, base_dir=None):
+    """
+    大檔模式：以外部排序比對兩個 CAD 資料夾，輸出與 execute_Nails_summary / execute_Parts_summary
+    相同格式的報告 (不做 registration，各段落依 Net Name / Part 排序)。
+    比對結果逐筆寫到各段落的暫存檔，記憶體中不保留結果 list。
+    base_dir 為相對路徑 (CAD 資料夾與報告檔) 的基準目錄，預設為執行檔所在目錄。
+    """
+    executable_dir = base_dir or get_executable_path()
+    nails_output = os.path.join(executable_dir, nails_output)
+    parts_output = os.path.join(executable_dir, parts_output)
+
+    new_nails = os.path.join(executable_dir, label_new, Nails_asc_name)
+    old_nails = os.path.join(executable_dir, label_old, Nails_asc_name)
+    if os.path.exists(new_nails) and os.path.exists(old_nails):
+        create_or_replace_file(nails_output)
+        save_Nails_summary_notebook(nails_output, label_new, label_old)
+        stream_Nails_report(new_nails, old_nails, nails_output, label_new, label_old, run_size)
+
+    new_parts = os.path.join(executable_dir, label_new, Parts_asc_name)
+    old_parts = os.path.join(executable_dir, label_old, Parts_asc_name)
+    if os.path.exists(new_parts) and os.path.exists(old_parts):
+        create_or_replace_file(parts_output)
+        save_Parts_summary_notebook(parts_output, label_new, label_old)
+        stream_Parts_report(new_parts, old_parts, parts_output, label_new, label_old, Parts_shift_threshold, run_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="大檔模式：外部排序 + merge join 比對兩版 Tebo CAD")
+    parser.add_argument("new", help="新版 CAD 資料夾")
+    parser.add_argument("old", help="舊版 CAD 資料夾")
+    parser.add_argument("--run-size", type=int, default=External_run_size, help="每個排序 run 的筆數")
+    parser.add_argument("--nails-output", default=Nails_asc_output)
+    parser.add_argument("--parts-output", default=Parts_asc_output)
+    parser.add_argument("--base-dir", default=None, help="CAD 資料夾與報告檔相對路徑的基準目錄 (預設為執行檔所在目錄)")
+    args = parser.parse_args()
+
+    execute_external_diff(args.new, args.old, args.nails_output, args.parts_output, args.run_size, args.base_dir)
@@ -0,0 +1,275 @@
+import math
+
+from TeboCADProcess import separator, Nails_asc_output
+from SpatialIndex import GridIndex, box_distance, find_close_pairs
+
+# 參考 ICT Net Coverage Report「工作表1」的間距規則
+Probe_min_pitch = 50        # mil，nail 與 nail 的最小間距
+Probe_body_clearance = 25   # mil，nail 與零件本體 (高度 < 2.5mm) 的最小間距
+Probe_on_pin_tolerance = 1  # mil，nail 落在零件 pin 上時不視為撞件
+Nail_pin_tolerance = 1      # mil，nail 與 Virtual Pin 目標 pin 的容許偏移
+
+
+def find_Nails_spacing_violation(CAD_nails, min_pitch_mil=Probe_min_pitch):
+    """
+    找出同一面上距離小於 min_pitch_mil 的 nail 對 (格網索引，平均 O(n))。
+
+    回傳 list of dict:
+        {"T/B", "Nail A", "Nail B", "Distance_mil"}，Nail A / B 為 parse_Nailsasc 的項目
+    """
+    violations = []
+    radius = min_pitch_mil / 1000.0
+
+    for side in ("T", "B"):
+        side_nails = [item for item in CAD_nails if item["T/B"].upper() == side]
+        points = [(item["X"], item["Y"]) for item in side_nails]
+        for i, j, distance in find_close_pairs(points, radius):
+            violations.append({
+                "T/B": side,
+                "Nail A": side_nails[i],
+                "Nail B": side_nails[j],
+                "Distance_mil": distance * 1000.0
+            })
+
+    return violations
+
+
+def build_part_bodies(CAD_parts, part_pins):
+    """
+    以 Pins.asc 的 pin 座標 (加上 Parts.asc 的中心點) 建立零件本體的外框。
+
+    參數:
+        CAD_parts: list of dict (parse_Partsasc)
+        part_pins: dict，零件名稱 → list of pin (Board.part_pins)
+
+    回傳 list of dict:
+        {"Part", "T/B", "Box": (xmin, ymin, xmax, ymax), "Pins": [(x, y), ...]}
+    """
+    bodies = []
+    for part in CAD_parts:
+        pins = [(pin["X"], pin["Y"]) for pin in part_pins.get(part["Part"], [])]
+        xs = [part["X"]] + [x for x, _ in pins]
+        ys = [part["Y"]] + [y for _, y in pins]
+        bodies.append({
+            "Part": part["Part"],
+            "T/B": part["T/B"].upper(),
+            "Box": (min(xs), min(ys), max(xs), max(ys)),
+            "Pins": pins
+        })
+    return bodies
+
+
+def find_Nails_body_violation(CAD_nails, bodies, clearance_mil=Probe_body_clearance):
+    """
+    找出與同面零件本體距離小於 clearance_mil 的 nail。
+    nail 直接落在該零件的 pin 上 (Probe_on_pin_tolerance 內) 時不列入。
+
+    回傳 list of dict:
+        {"T/B", "Nail", "Part", "Distance_mil"}
+    """
+    clearance = clearance_mil / 1000.0
+    on_pin = Probe_on_pin_tolerance / 1000.0
+    violations = []
+
+    for side in ("T", "B"):
+        side_bodies = [body for body in bodies if body["T/B"] == side]
+        index = GridIndex(max(clearance * 4, 0.05))
+        for i, body in enumerate(side_bodies):
+            index.insert(i, *body["Box"])
+
+        for nail in CAD_nails:
+            if nail["T/B"].upper() != side:
+                continue
+            x, y = nail["X"], nail["Y"]
+            for i in index.candidates(x - clearance, y - clearance, x + clearance, y + clearance):
+                body = side_bodies[i]
+                distance = box_distance(body["Box"], x, y)
+                if distance >= clearance:
+                    continue
+                if any(math.hypot(px - x, py - y) <= on_pin for px, py in body["Pins"]):
+                    continue
+                violations.append({
+                    "T/B": side,
+                    "Nail": nail,
+                    "Part": body["Part"],
+                    "Distance_mil": distance * 1000.0
+                })
+
+    violations.sort(key=lambda item: (item["T/B"], item["Distance_mil"]))
+    return violations
+
+
+def save_Nails_clearance_notebook(spacing_list, body_list, filepath=Nails_asc_output, label="CAD_new",
+                                  min_pitch_mil=Probe_min_pitch, clearance_mil=Probe_body_clearance):
+    """
+    將探針間距/撞件檢查結果續寫到 Nails 報告
+    格式：
+    [Part 6] Probe Clearance
+    Nail Pitch < min_pitch mil : TOP Side = N, Bottom Side = M
+    <label>   $a   X   Y   (T/B)   Net Name   <->   $b   X   Y   Net Name   Distance = d mil
+
+    Nail to Part Body < clearance mil : TOP Side = N, Bottom Side = M
+    <label>   $a   X   Y   (T/B)   Net Name   <->   Part   Distance = d mil
+    """
+    lines = []
+    lines.append(separator())
+    lines.append("[Part 6] Probe Clearance")
+
+    top_count = sum(1 for item in spacing_list if item["T/B"] == "T")
+    bottom_count = sum(1 for item in spacing_list if item["T/B"] == "B")
+    lines.append(f"Nail Pitch < {min_pitch_mil} mil : TOP Side  = {top_count}, Bottom Side  = {bottom_count}")
+    for item in spacing_list:
+        a = item["Nail A"]
+        b = item["Nail B"]
+        lines.append(
+            f"{label}     {a.get('Nail', '')}    {a['X']:.4f}    {a['Y']:.4f}   ({a['T/B']})   {a['Net Name']}"
+            f"   <->   {b.get('Nail', '')}    {b['X']:.4f}    {b['Y']:.4f}   {b['Net Name']}"
+            f"   Distance = {item['Distance_mil']:.1f} mil"
+        )
+    lines.append("")
+
+    top_count = sum(1 for item in body_list if item["T/B"] == "T")
+    bottom_count = sum(1 for item in body_list if item["T/B"] == "B")
+    lines.append(f"Nail to Part Body < {clearance_mil} mil : TOP Side  = {top_count}, Bottom Side  = {bottom_count}")
+    for item in body_list:
+        nail = item["Nail"]
+        lines.append(
+            f"{label}     {nail.get('Nail', '')}    {nail['X']:.4f}    {nail['Y']:.4f}   ({nail['T/B']})   {nail['Net Name']}"
+            f"   <->   {item['Part']}   Distance = {item['Distance_mil']:.1f} mil"
+        )
+    lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"探針間距檢查結果已續寫到 {filepath}")
+
+
+def find_Nails_pin_mismatch(CAD_nails, pin_index, tolerance_mil=Nail_pin_tolerance, CAD_nets=None, net_pins=None):
+    """
+    以 Virtual Pin 欄位 (例如 TP47.1) 對 Pins.asc 的 "零件.pin" 索引做一次 join，
+    檢查 nail 與目標 pin 的距離及 Net 是否一致。
+    TB_ 開頭等 Pins.asc 中不存在的目標 (Tebo 自行產生的虛擬測點) 改以 nail 的 Net 編號 (#n)
+    對 Nets.asc 查出 Net，檢查 Net Name 是否一致、該 Net 在 net_pins 中是否有 pin；
+    Net 編號也查不到 (或未提供 CAD_nets / net_pins) 的 nail 才列為 Unresolved。
+
+    參數:
+        CAD_nails: list of dict (parse_Nailsasc)
+        pin_index: dict，"零件.pin" → pin (Board.pin_index)
+        CAD_nets : list of dict (parse_Netsasc，Board.nets)
+        net_pins : dict，Net Name → list of pin (Board.net_pins)
+
+    回傳 dict:
+        {
+            "resolved"   : 成功對應到 pin 的 nail 數,
+            "net_checked": 對應不到 pin、改以 Net 編號檢查的 nail 數,
+            "unresolved" : list of nail,
+            "mismatch"   : list of {"Nail", "Pin", "Net", "Distance_mil", "Issue"}
+        }
+        對應到 pin 時 Issue 為 "Distance"、"Net" 或 "Distance+Net" (Net 為 None)；
+        以 Net 編號檢查時 Issue 為 "Net"、"No Pins" 或 "Net+No Pins" (Pin 與 Distance_mil 為 None)
+    """
+    net_ids = {net["Net"]: net for net in CAD_nets} if CAD_nets is not None and net_pins is not None else {}
+    resolved = 0
+    net_checked = 0
+    unresolved = []
+    mismatch = []
+
+    for nail in CAD_nails:
+        pin = pin_index.get(nail.get("Virtual Pin", ""))
+        if pin is None:
+            net = net_ids.get(nail["Net"])
+            if net is None:
+                unresolved.append(nail)
+                continue
+            net_checked += 1
+
+            issues = []
+            if nail["Net Name"] != net["Net Name"]:
+                issues.append("Net")
+            if not net_pins.get(net["Net Name"]):
+                issues.append("No Pins")
+            if issues:
+                mismatch.append({"Nail": nail, "Pin": None, "Net": net, "Distance_mil": None, "Issue": "+".join(issues)})
+            continue
+        resolved += 1
+
+        distance_mil = math.hypot(nail["X"] - pin["X"], nail["Y"] - pin["Y"]) * 1000.0
+        issues = []
+        if distance_mil > tolerance_mil:
+            issues.append("Distance")
+        if nail["Net Name"] != pin["Net Name"]:
+            issues.append("Net")
+        if issues:
+            mismatch.append({
+                "Nail": nail,
+                "Pin": pin,
+                "Net": None,
+                "Distance_mil": distance_mil,
+                "Issue": "+".join(issues)
+            })
+
+    return {"resolved": resolved, "net_checked": net_checked, "unresolved": unresolved, "mismatch": mismatch}
+
+
+def save_Nails_pin_notebook(result, filepath=Nails_asc_output, label="CAD_new", tolerance_mil=Nail_pin_tolerance):
+    """
+    將 nail ↔ Virtual Pin 檢查結果續寫到 Nails 報告
+    格式：
+    [Part 7] Nail to Pin Validation
+    Resolved = N, Net checked (virtual) = V, Unresolved = M, Mismatch = K
+    <label>   $a   X   Y   (T/B)   Net Name   ->   Part.Pin   X   Y   Net Name   Distance = d mil   [Issue]
+    <label>   $a   X   Y   (T/B)   Net Name   ->   TB_xxx   #n   Net Name   Pins = p   [Issue]
+
+    Following nails have no pin and no net in <label>
+    <label>   $a   X   Y   (T/B)   #n   Net Name   Virtual Pin
+    """
+    lines = []
+    lines.append(separator())
+    lines.append("[Part 7] Nail to Pin Validation")
+    lines.append(f"Resolved = {result['resolved']}, Net checked (virtual) = {result['net_checked']}, "
+                 f"Unresolved = {len(result['unresolved'])}, "
+                 f"Mismatch = {len(result['mismatch'])}  (tolerance = {tolerance_mil} mil)")
+
+    for item in result["mismatch"]:
+        nail = item["Nail"]
+        pin = item["Pin"]
+        head = f"{label}     {nail['Nail']}    {nail['X']:.4f}    {nail['Y']:.4f}   ({nail['T/B']})   {nail['Net Name']}"
+        if pin is None:
+            net = item["Net"]
+            lines.append(f"{head}   ->   {nail['Virtual Pin']}    {net['Net']}   {net['Net Name']}"
+                         f"   Pins = {len(net['Pins'])}   [{item['Issue']}]")
+            continue
+        lines.append(
+            f"{head}   ->   {nail['Virtual Pin']}    {pin['X']:.4f}    {pin['Y']:.4f}   {pin['Net Name']}"
+            f"   Distance = {item['Distance_mil']:.1f} mil   [{item['Issue']}]"
+        )
+
+    if result["unresolved"]:
+        lines.append("")
+        lines.append(f"Following nails have no pin and no net in {label}")
+        for nail in result["unresolved"]:
+            lines.append(f"{label}     {nail['Nail']}    {nail['X']:.4f}    {nail['Y']:.4f}   ({nail['T/B']})"
+                         f"   {nail['Net']}   {nail['Net Name']}   {nail.get('Virtual Pin', '')}")
+    lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"Nail / Pin 檢查結果已續寫到 {filepath}")
+
+
+def execute_Nails_pin_check(filepath, board, tolerance_mil=Nail_pin_tolerance):
+    """以單一版本的 Board 檢查 nail 與 Virtual Pin 目標 (虛擬測點改查 Net)，續寫到 Nails 報告"""
+    result = find_Nails_pin_mismatch(board.nails, board.pin_index, tolerance_mil, board.nets, board.net_pins)
+    save_Nails_pin_notebook(result, filepath, board.label, tolerance_mil)
+    return result
+
+
+def execute_Nails_clearance(filepath, board, min_pitch_mil=Probe_min_pitch, clearance_mil=Probe_body_clearance):
+    """以單一版本的 Board 做探針間距與零件撞件檢查，續寫到 Nails 報告"""
+    spacing_list = find_Nails_spacing_violation(board.nails, min_pitch_mil)
+    bodies = build_part_bodies(board.parts, board.part_pins)
+    body_list = find_Nails_body_violation(board.nails, bodies, clearance_mil)
+    save_Nails_clearance_notebook(spacing_list, body_list, filepath, board.label, min_pitch_mil, clearance_mil)
+    return spacing_list, body_list
@@ -11,7 +11,7 @@ HTML_comp_raw_output = "HTML_comp_raw_output.txt"
 comp_testability_output = "comp_testability_output.txt"
 
 
-# 人工確認
+# 人工確認 (只作為命令列的預設值)
 html_1_file_name = "1.htm"  # 替換成你的 HTML 檔案名稱
 html_path_name = "VF"
 
@@ -115,9 +115,9 @@ def extract_all_component(soup, start_idx=5, end_idx=10, output_path=None, write
 
 
 
-def Get_comp_raw_list(soup_raw, dir_src):
+def Get_comp_raw_list(soup_raw, dir_src, output_name=HTML_comp_raw_output):
 
-    output_file = os.path.join(dir_src, HTML_comp_raw_output)
+    output_file = os.path.join(dir_src, output_name)
                                
     Comp_list = []
     Comp_list = extract_all_component(
@@ -130,7 +130,45 @@ def Get_comp_raw_list(soup_raw, dir_src):
 
     return Comp_list
 
-def evaluate_testability(Comp_raw_list_src, BOM_Comp_list_src):
+def build_component_index(Comp_raw_list_src):
+    """
+    以元件編號 (item[0]) 建立 HTML 元件資料的查詢表。
+    同一元件出現多次時保留第一筆，與逐筆搜尋的結果一致。
+    """
+    comp_index = {}
+    for item in Comp_raw_list_src:
+        if item:
+            comp_index.setdefault(item[0], item)
+    return comp_index
+
+
+def classify_testability(percent, pin_count=None, unprobed=None):
+    """
+    將測試百分比字串轉成測試狀態。
+    有腳數與不可植針腳數時以數量判斷 (不可植針 0 腳才是 testable)，
+    避免 99.95% 這類百分比被四捨五入成 "100.0%" 而誤判。
+    """
+    try:
+        pin_count = int(str(pin_count).strip())
+        unprobed = int(str(unprobed).strip())
+    except ValueError:
+        pin_count = None
+    if pin_count is not None:
+        if unprobed == 0:
+            return "testable"
+        if unprobed >= pin_count:
+            return "untestable"
+        return "limit testable"
+
+    percent = percent.strip()
+    if percent == "100.0%":
+        return "testable"
+    elif percent == "0%":
+        return "untestable"
+    return "limit testable"
+
+
+def evaluate_testability(Comp_raw_list_src, BOM_Comp_list_src, comp_index=None):
     """
     根據 BOM 清單比對 HTML 元件資料，判斷每個元件是否可測試，
     並回傳格式為 [元件編號, 腳數, 不可植針腳數, 測試狀態]
@@ -140,20 +178,19 @@ def evaluate_testability(Comp_raw_list_src, BOM_Comp_list_src):
         item[3] = 腳數 (Pin Count)
         item[4] = 不可植針腳數 (Unpluggable Pin Count)
         item[5] = 測試百分比 (Test Coverage)
+
+    comp_index 可傳入 build_component_index 的結果，避免重複建立查詢表。
     """
+    if comp_index is None:
+        comp_index = build_component_index(Comp_raw_list_src)
+
     results = []
 
     for bom_part in BOM_Comp_list_src:
-        match = next((item for item in Comp_raw_list_src if item[0] == bom_part), None)
+        match = comp_index.get(bom_part)
 
         if match:
-            percent = match[5].strip()
-            if percent == "100.0%":
-                status = "testable"
-            elif percent == "0%":
-                status = "untestable"
-            else:
-                status = "limit testable"
+            status = classify_testability(match[5], match[3], match[4])
             pin_count = match[3]
             unpluggable_pins = match[4]
         else:
@@ -166,40 +203,44 @@ def evaluate_testability(Comp_raw_list_src, BOM_Comp_list_src):
     return results
 
 
-def main_HTMLparser():
+def main_HTMLparser(html_file, BOM_file, base_dir=None,
+                    raw_output=HTML_comp_raw_output, testability_output=comp_testability_output):
+    """
+    以 VF HTML 元件表判斷 SFCS BOM 元件的可測度，輸出 raw_output 與 testability_output。
+    輸入與輸出檔都由參數傳入，相對路徑以 base_dir (預設為執行檔所在目錄) 為基準，
+    不讀取模組層級的檔名，可在多個執行緒同時呼叫 (輸出路徑需不同)。
+    回傳 evaluate_testability 的結果。
+    """
 
-    executable_dir = get_executable_path()
+    executable_dir = base_dir or get_executable_path()
     print(f"執行檔所在目錄: {executable_dir}")
-    create_or_replace_file(os.path.join(executable_dir, HTML_comp_raw_output))
-    create_or_replace_file(os.path.join(executable_dir, comp_testability_output))
-    # Output_list =[]
+    raw_output = os.path.join(executable_dir, raw_output)
+    testability_output = os.path.join(executable_dir, testability_output)
+    create_or_replace_file(raw_output)
+    create_or_replace_file(testability_output)
 
     # html1 get 元件清單, HTML_comp_raw_output.txt
-    soup = read_html_by_name(os.path.join(executable_dir, html_path_name, html_1_file_name))
-    Comp_raw_list = []
-    Comp_raw_list = Get_comp_raw_list(soup, executable_dir)
+    soup = read_html_by_name(os.path.join(executable_dir, html_file))
+    Comp_raw_list = Get_comp_raw_list(soup, os.path.dirname(raw_output), os.path.basename(raw_output))
 
     # get BOM 元件清單
-    BOM_Comp_list = []
-    BOM_Comp_list = extract_location_texts_SFCS(BOM_file_name)
-
+    BOM_Comp_list = extract_location_texts_SFCS(os.path.join(executable_dir, BOM_file))
 
     # 判斷 BOM 元件可測度 , comp_testability_output.txt
-    Comp_testability_list = []
     Comp_testability_list = evaluate_testability(Comp_raw_list, BOM_Comp_list)
 
-    write_list_to_file(Comp_testability_list, comp_testability_output) 
-
+    write_list_to_file(Comp_testability_list, testability_output)
 
-    # write_list_to_file(Output_list)    
+    return Comp_testability_list
 
 
 if __name__ == "__main__":
-    main_HTMLparser()
-
-
-
-
-
-
-
+    parser = argparse.ArgumentParser(description="以 VF HTML 元件表判斷 SFCS BOM 元件的可測度")
+    parser.add_argument("--html", default=os.path.join(html_path_name, html_1_file_name), help="VF HTML 元件報告")
+    parser.add_argument("--bom", default=os.path.join(html_path_name, BOM_file_name), help="SFCS BOM (.txt)")
+    parser.add_argument("--base-dir", default=None, help="相對路徑的基準目錄 (預設為執行檔所在目錄)")
+    parser.add_argument("--raw-output", default=HTML_comp_raw_output)
+    parser.add_argument("--output", default=comp_testability_output, help="可測度輸出檔")
+    args = parser.parse_args()
+
+    main_HTMLparser(args.html, args.bom, args.base_dir, args.raw_output, args.output)
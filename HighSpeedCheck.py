@@ -0,0 +1,155 @@
+import os
+
+import pandas as pd
+
+from Instance import get_executable_path
+from TeboCADProcess import separator, Nails_asc_output
+
+High_speed_file_name = "High speed net list.xlsx"
+High_speed_path_name = "VF"
+High_speed_net_column = "Net Name"
+High_speed_ball_column = "Ball"
+# 只讀這些工作表；其他工作表 (例如 工作表2 的 IRQ_*_FLT_N 故障訊號與 ball) 不是 high speed net
+High_speed_sheets = ("netname",)
+
+
+def default_High_speed_file():
+    return os.path.join(get_executable_path(), High_speed_path_name, High_speed_file_name)
+
+
+def load_High_speed_nets(xlsx_file, sheet_names=High_speed_sheets):
+    """
+    讀取 High speed net list.xlsx，回傳 dict：Net Name (大寫) → {"Net Name", "Ball"}
+    - 只讀 sheet_names 中的工作表，第一列須有 "Net Name" 表頭 (可選 "Ball" 欄)
+    - 未列出的工作表一律忽略；列出的工作表不存在或沒有表頭時印出提示並略過
+    """
+    sheets = pd.read_excel(xlsx_file, sheet_name=None, header=None, dtype=str)
+
+    hs_nets = {}
+    for sheet_name in sheet_names:
+        if sheet_name not in sheets:
+            print(f"找不到工作表 {sheet_name}：{xlsx_file}")
+            continue
+        df = sheets[sheet_name].dropna(how="all")
+        if df.empty:
+            continue
+
+        header = [str(value).strip() for value in df.iloc[0]]
+        if High_speed_net_column not in header:
+            print(f"工作表 {sheet_name} 沒有 {High_speed_net_column} 表頭，略過")
+            continue
+        net_column = header.index(High_speed_net_column)
+        ball_column = header.index(High_speed_ball_column) if High_speed_ball_column in header else None
+
+        for row in df.iloc[1:].itertuples(index=False):
+            net_name = row[net_column]
+            if not isinstance(net_name, str) or not net_name.strip():
+                continue
+            net_name = net_name.strip()
+            entry = hs_nets.setdefault(net_name.upper(), {"Net Name": net_name, "Ball": None})
+            ball = row[ball_column] if ball_column is not None else None
+            if isinstance(ball, str) and ball.strip():
+                entry["Ball"] = ball.strip()
+
+    print(f"High speed net 共 {len(hs_nets)} 條：{xlsx_file}")
+    return hs_nets
+
+
+def find_Nails_high_speed(CAD_nails, hs_nets):
+    """回傳落在 high speed net 上的 nail (以 Net Name hash join)"""
+    return [nail for nail in CAD_nails if nail["Net Name"].upper() in hs_nets]
+
+
+def find_Nets_high_speed_change(Nets_new, Nets_old, hs_nets):
+    """
+    比較新舊版本的 high speed net，回傳 list of dict：
+        {"Net Name", "Status": "Add" | "Del" | "Changed", "Added Pins", "Removed Pins"}
+    """
+    new_map = {net["Net Name"].upper(): net for net in Nets_new if net["Net Name"].upper() in hs_nets}
+    old_map = {net["Net Name"].upper(): net for net in Nets_old if net["Net Name"].upper() in hs_nets}
+
+    change_list = []
+    for key in sorted(new_map.keys() | old_map.keys()):
+        new_net = new_map.get(key)
+        old_net = old_map.get(key)
+        new_pins = set(new_net["Pins"]) if new_net else set()
+        old_pins = set(old_net["Pins"]) if old_net else set()
+
+        if old_net is None:
+            status = "Add"
+        elif new_net is None:
+            status = "Del"
+        elif new_pins != old_pins:
+            status = "Changed"
+        else:
+            continue
+
+        change_list.append({
+            "Net Name": (new_net or old_net)["Net Name"],
+            "Status": status,
+            "Added Pins": sorted(new_pins - old_pins),
+            "Removed Pins": sorted(old_pins - new_pins)
+        })
+    return change_list
+
+
+def save_High_speed_notebook(hs_nets, nail_list, change_list, found_count, filepath=Nails_asc_output,
+                             label_new="CAD_new", label_old="CAD_old"):
+    """
+    將 high speed net 檢查結果續寫到 Nails 報告
+    格式：
+    [Part 8] High Speed Nets
+    High speed nets = N (found in <label_new> = M)
+    Nails on high speed nets : TOP Side = a, Bottom Side = b
+    <label_new>   $n   X   Y   (T/B)   Net Name   Ball ***
+
+    High speed nets changed = K
+    Changed   Net Name   +[U1.1, ...]   -[U2.3, ...]
+    """
+    lines = []
+    lines.append(separator())
+    lines.append("[Part 8] High Speed Nets")
+    lines.append(f"High speed nets = {len(hs_nets)} (found in {label_new} = {found_count})")
+
+    top_count = sum(1 for item in nail_list if item["T/B"].upper() == "T")
+    bottom_count = sum(1 for item in nail_list if item["T/B"].upper() == "B")
+    lines.append(f"Nails on high speed nets : TOP Side  = {top_count}, Bottom Side  = {bottom_count}")
+    for nail in nail_list:
+        ball = hs_nets[nail["Net Name"].upper()]["Ball"] or ""
+        lines.append(f"{label_new}     {nail['Nail']}    {nail['X']:.4f}    {nail['Y']:.4f}   ({nail['T/B']})"
+                     f"   {nail['Net Name']}   {ball} ***")
+    lines.append("")
+
+    lines.append(f"High speed nets changed ({label_old} -> {label_new}) = {len(change_list)}")
+    for item in change_list:
+        line = f"{item['Status']:<8}  {item['Net Name']}"
+        if item["Added Pins"]:
+            line += f"   +[{', '.join(item['Added Pins'])}]"
+        if item["Removed Pins"]:
+            line += f"   -[{', '.join(item['Removed Pins'])}]"
+        lines.append(line)
+    lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"High speed net 檢查結果已續寫到 {filepath}")
+
+
+def execute_High_speed_check(filepath, board_new, board_old, xlsx_file=None, sheet_names=High_speed_sheets):
+    """
+    以 high speed net list 檢查新版 nail 與新舊版本的 high speed net 變動，檔案不存在時略過。
+    sheet_names 為列出 high speed net 的工作表 (見 load_High_speed_nets)。
+    """
+    xlsx_file = xlsx_file or default_High_speed_file()
+    if not os.path.exists(xlsx_file):
+        print(f"找不到 high speed net list：{xlsx_file}，略過檢查")
+        return None
+
+    hs_nets = load_High_speed_nets(xlsx_file, sheet_names)
+    nail_list = find_Nails_high_speed(board_new.nails, hs_nets)
+    change_list = find_Nets_high_speed_change(board_new.nets, board_old.nets, hs_nets)
+    found_count = sum(1 for net in board_new.nets if net["Net Name"].upper() in hs_nets)
+
+    save_High_speed_notebook(hs_nets, nail_list, change_list, found_count, filepath, board_new.label, board_old.label)
+    return nail_list, change_list
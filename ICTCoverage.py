@@ -0,0 +1,249 @@
+import argparse
+import os
+
+from openpyxl import load_workbook
+
+from Instance import create_or_replace_file
+from TeboCADProcess import separator, parse_Nailsasc, Nails_asc_name
+
+Coverage_output = "Diff_Coverage_report.txt"
+
+# 工作表 → (覆蓋狀態, 欄位位置)；欄位位置為 None 代表有表頭，由表頭找欄位
+# 依序讀取，同一 Net 出現在多個工作表時以先讀到的狀態為準：
+# Dont need DFT 的 Net 在 Testable 清單中也會出現 (不在 Untestable)，必須最先讀，否則豁免的 Net 會被算成 Testable
+Coverage_sheets = {
+    "Dont need DFT net list": ("No DFT", None),
+    "Testable nets list": ("Testable", None),
+    "Untestable nets list": ("Untestable", None),
+    # 沒有表頭的工作表：[Net Name, Pins, PAD size, Probe size] / [Net Name, Pins, Remark]
+    "NC testable": ("NC Testable", {"net": 0, "pins": 1, "side": None, "pad": 2, "remark": None}),
+    "NC untestable": ("NC Untestable", {"net": 0, "pins": 1, "side": None, "pad": None, "remark": 2}),
+}
+Coverage_statuses = ("Testable", "No DFT", "Untestable", "NC Testable", "NC Untestable")  # 報告顯示順序
+Coverage_testable = ("Testable", "NC Testable")
+
+
+def cell_text(value):
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def iter_coverage_rows(ws, columns=None):
+    """
+    逐列讀取一個工作表，產生 (Net Name, Pins, Side, Pad, Remark)。
+    columns 為 None 時先找出含 "Net Name" 的表頭列 (表頭前可能有標題列或空白欄)。
+    """
+    for row in ws.iter_rows(values_only=True):
+        if columns is None:
+            header = [cell_text(value) for value in row]
+            if "Net Name" not in header:
+                continue
+            columns = {
+                "net": header.index("Net Name"),
+                "pins": header.index("Connected Component List") if "Connected Component List" in header else None,
+                "side": header.index("Top/Bottom") if "Top/Bottom" in header else None,
+                "pad": header.index("PAD size") if "PAD size" in header else None,
+                "remark": header.index("Remark") if "Remark" in header else None,
+            }
+            continue
+
+        def get(name):
+            index = columns[name]
+            return cell_text(row[index]) if index is not None and index < len(row) else ""
+
+        net_name = get("net")
+        if not net_name:
+            continue
+        pins = [pin.strip() for pin in get("pins").split(",") if pin.strip()]
+        yield net_name, pins, get("side"), get("pad"), get("remark")
+
+
+def read_ICT_coverage(xlsx_file):
+    """
+    以 openpyxl read_only 串流讀取 ICT Net Coverage Report，回傳 net → coverage 的 dict：
+        {"Net Name", "Status", "Side", "Pins", "Pad", "Remark"}
+    Status 為 Coverage_sheets 中的狀態；同一 Net 出現在多個工作表時保留先讀到的工作表 (No DFT 優先)。
+    """
+    wb = load_workbook(xlsx_file, read_only=True, data_only=True)
+    coverage = {}
+    try:
+        for sheet_name, (status, columns) in Coverage_sheets.items():
+            if sheet_name not in wb.sheetnames:
+                continue
+            for net_name, pins, side, pad, remark in iter_coverage_rows(wb[sheet_name], columns):
+                coverage.setdefault(net_name, {
+                    "Net Name": net_name,
+                    "Status": status,
+                    "Side": side,
+                    "Pins": len(pins),
+                    "Pad": pad,
+                    "Remark": remark
+                })
+    finally:
+        wb.close()
+
+    print(f"ICT coverage 共 {len(coverage)} 條 net：{xlsx_file}")
+    return coverage
+
+
+def count_status(coverage):
+    counts = {}
+    for item in coverage.values():
+        counts[item["Status"]] = counts.get(item["Status"], 0) + 1
+    return counts
+
+
+def find_Coverage_diff(coverage_new, coverage_old):
+    """
+    比較兩份 coverage，回傳 list of dict：
+        {"Net Name", "Old Status", "New Status", "Regression"}
+    Old / New Status 為 "" 代表該版本沒有此 Net；可測 → 不可測 (或消失) 標記為 Regression。
+    """
+    diff_list = []
+    for net_name in sorted(coverage_new.keys() | coverage_old.keys()):
+        new_item = coverage_new.get(net_name)
+        old_item = coverage_old.get(net_name)
+        new_status = new_item["Status"] if new_item else ""
+        old_status = old_item["Status"] if old_item else ""
+        if new_status == old_status:
+            continue
+        diff_list.append({
+            "Net Name": net_name,
+            "Old Status": old_status,
+            "New Status": new_status,
+            "Regression": old_status in Coverage_testable and new_status not in Coverage_testable
+        })
+    diff_list.sort(key=lambda item: not item["Regression"])
+    return diff_list
+
+
+def find_Coverage_Nails_mismatch(coverage, CAD_nails):
+    """
+    以 Net Name 將 coverage 與 Nails.asc join，回傳 (missing_list, extra_list)：
+        missing_list: 報告為可測但 Nails.asc 沒有 nail 的 coverage 項目
+        extra_list  : Nails.asc 有 nail，但報告中不是可測 (或不在報告中) 的 nail
+    """
+    nail_nets = {}
+    for nail in CAD_nails:
+        nail_nets.setdefault(nail["Net Name"], []).append(nail)
+
+    missing_list = [item for item in coverage.values()
+                    if item["Status"] in Coverage_testable and item["Net Name"] not in nail_nets]
+    extra_list = [nail for net_name, nails in nail_nets.items()
+                  if coverage.get(net_name, {}).get("Status") not in Coverage_testable
+                  for nail in nails]
+    return missing_list, extra_list
+
+
+def save_Coverage_summary_notebook(coverage_list, filepath=Coverage_output):
+    """
+    格式：
+    WYMTN Difference Report For ICT Coverage
+    <label> : Testable = a, Untestable = b, ...
+    """
+    lines = []
+    lines.append("WYMTN Difference Report For ICT Coverage")
+    lines.append(separator("="))
+    for label, coverage in coverage_list:
+        counts = count_status(coverage)
+        lines.append(f"{label} : " + ", ".join(f"{status} = {counts.get(status, 0)}"
+                                              for status in Coverage_statuses))
+    lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"Coverage Summary 已續寫到 {filepath}")
+
+
+def save_Coverage_diff_notebook(diff_list, filepath=Coverage_output, label_new="Coverage_new", label_old="Coverage_old"):
+    """
+    格式：
+    [Part 1] Coverage Changes
+    Regression = N, Other changes = M
+    Net Name   <label_old> Status -> <label_new> Status ***
+    """
+    regression_count = sum(1 for item in diff_list if item["Regression"])
+    lines = []
+    lines.append(separator())
+    lines.append("[Part 1] Coverage Changes")
+    lines.append(f"{label_old} -> {label_new}")
+    lines.append(f"Regression = {regression_count}, Other changes = {len(diff_list) - regression_count}")
+    lines.append("")
+    for item in diff_list:
+        mark = " ***" if item["Regression"] else ""
+        lines.append(f"{item['Net Name']}   {item['Old Status'] or '(none)'} -> {item['New Status'] or '(none)'}{mark}")
+    lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"Coverage 差異已續寫到 {filepath}")
+
+
+def save_Coverage_Nails_notebook(missing_list, extra_list, filepath=Coverage_output, label_coverage="Coverage",
+                                 label_cad="CAD"):
+    """
+    格式：
+    [Part 2] Coverage vs Nails
+    Testable in <label_coverage> but no nail in <label_cad> = N
+    Net Name   Status   (Side)   Pins = n
+    Nail in <label_cad> but not testable in <label_coverage> = M
+    $n   X   Y   (T/B)   Net Name   Status
+    """
+    lines = []
+    lines.append(separator())
+    lines.append("[Part 2] Coverage vs Nails")
+    lines.append(f"Testable in {label_coverage} but no nail in {label_cad} = {len(missing_list)}")
+    for item in missing_list:
+        lines.append(f"{item['Net Name']}   {item['Status']}   ({item['Side']})   Pins = {item['Pins']}")
+    lines.append("")
+    lines.append(f"Nail in {label_cad} but not testable in {label_coverage} = {len(extra_list)}")
+    for nail in extra_list:
+        lines.append(f"{nail['Nail']}    {nail['X']:.4f}    {nail['Y']:.4f}   ({nail['T/B']})   {nail['Net Name']}")
+    lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"Coverage / Nails 比對已續寫到 {filepath}")
+
+
+def execute_Coverage_diff(new_xlsx, old_xlsx=None, cad_folder=None, filepath=Coverage_output):
+    """
+    讀取新版 coverage 報告，可選擇與舊版報告比較，及與 CAD 資料夾的 Nails.asc 比較。
+    """
+    create_or_replace_file(filepath)
+
+    label_new = os.path.basename(new_xlsx)
+    coverage_new = read_ICT_coverage(new_xlsx)
+    coverage_list = [(label_new, coverage_new)]
+
+    coverage_old = None
+    if old_xlsx:
+        coverage_old = read_ICT_coverage(old_xlsx)
+        coverage_list.append((os.path.basename(old_xlsx), coverage_old))
+
+    save_Coverage_summary_notebook(coverage_list, filepath)
+
+    if coverage_old is not None:
+        save_Coverage_diff_notebook(find_Coverage_diff(coverage_new, coverage_old), filepath,
+                                    label_new, os.path.basename(old_xlsx))
+
+    if cad_folder:
+        CAD_nails = parse_Nailsasc(os.path.join(cad_folder, Nails_asc_name))
+        missing_list, extra_list = find_Coverage_Nails_mismatch(coverage_new, CAD_nails)
+        save_Coverage_Nails_notebook(missing_list, extra_list, filepath, label_new,
+                                     os.path.basename(os.path.normpath(cad_folder)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ICT Net Coverage Report 讀取與比對")
+    parser.add_argument("new", help="新版 ICT Net Coverage Report (.xlsx)")
+    parser.add_argument("--old", help="舊版 ICT Net Coverage Report (.xlsx)")
+    parser.add_argument("--cad", help="CAD 資料夾，與其 Nails.asc 比對")
+    parser.add_argument("--output", default=Coverage_output)
+    args = parser.parse_args()
+
+    execute_Coverage_diff(args.new, args.old, args.cad, args.output)
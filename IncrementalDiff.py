@@ -0,0 +1,386 @@
+import argparse
+import hashlib
+import os
+import pickle
+import time
+
+from Instance import get_executable_path, create_or_replace_file
+from TeboCADProcess import (
+    Nails_asc_name, Parts_asc_name, Nets_asc_name, Nails_asc_output, Parts_asc_output,
+    Nails_shift_threshold, Parts_shift_threshold,
+    parse_Nails_line, parse_Parts_line, parse_Nets_lines,
+    compare_Nails_pair, compare_Parts_pair, filter_Parts_shift, filter_Parts_swap,
+    save_Nails_summary_notebook, save_Nails_shift_notebook, save_Nails_del_notebook, save_Nails_add_notebook,
+    save_Parts_summary_notebook, save_Parts_shift_notebook, save_Parts_del_notebook, save_Parts_add_notebook,
+    save_Parts_swap_notebook,
+)
+from NetAnalysis import (
+    find_Nets_rename, find_Nailsasc_rename, save_Nets_rename_notebook,
+    find_Nets_merge_split, save_Nets_merge_split_notebook,
+)
+
+incremental_cache_name = "Diff_incremental_cache.pkl"
+incremental_cache_format = 2
+
+
+def block_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def new_cache():
+    """
+    files    : 檔案路徑 → ((大小, mtime_ns), 內容簽章)
+    sections : 報告段落 → (輸入檔案的簽章, 結果)
+    store    : 各檔案的 (hash, record) list 與各 key 的比對結果，pickle 成 bytes，
+               只在有檔案或段落需要重新計算時才 unpickle (open_store)
+    """
+    return {"format": incremental_cache_format, "options": None, "files": {}, "sections": {}, "store": None}
+
+
+def load_cache(cache_file):
+    """讀取上次的快取；不存在或格式不符時回傳空快取"""
+    if not os.path.exists(cache_file):
+        return new_cache()
+    try:
+        with open(cache_file, "rb") as f:
+            cache = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        print(f"快取 {cache_file} 無法讀取，改為完整比對: {e}")
+        return new_cache()
+    if not isinstance(cache, dict) or cache.get("format") != incremental_cache_format:
+        return new_cache()
+    return cache
+
+
+def open_store(cache):
+    if "store_data" not in cache:
+        cache["store_data"] = pickle.loads(cache["store"]) if cache["store"] else {"loaded": {}, "nails": {}, "parts": {}}
+    return cache["store_data"]
+
+
+def save_cache(cache, cache_file):
+    """store 有被打開時才重新 pickle，否則沿用讀進來的 bytes"""
+    store = cache.pop("store_data", None)
+    if store is not None:
+        store.pop("records", None)  # 由 loaded 重建即可，不另存
+        store["loaded"] = {path: store["loaded"][path] for path in cache["files"] if path in store["loaded"]}
+        cache["store"] = pickle.dumps(store, protocol=pickle.HIGHEST_PROTOCOL)
+
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+
+
+def file_stamp(filepath):
+    """(大小, mtime_ns)；檔案不存在回傳 None"""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def split_line_blocks(filepath):
+    """Parts.asc / Nails.asc：每一行為一個區塊"""
+    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
+        return [line for line in f if line.strip()]
+
+
+def split_header_blocks(filepath, is_header):
+    """Nets.asc：從 is_header 為真的行開始，到下一個標題行之前為一個區塊 (檔頭略過)"""
+    blocks = []
+    current = None
+    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if is_header(line):
+                current = [line]
+                blocks.append(current)
+            elif current is not None:
+                current.append(line)
+    return ["".join(block) for block in blocks]
+
+
+def is_Nets_header(line):
+    tokens = line.split()
+    return len(tokens) >= 3 and tokens[0].startswith("#")
+
+
+def load_blocks(blocks, parse_block, records, stats):
+    """
+    逐區塊計算 hash；hash 已在 records 中的區塊直接沿用上次的解析結果，其餘才解析。
+    回傳 list of (hash, parsed)，parsed 為 parse_block 的結果。
+    """
+    loaded = []
+    for text in blocks:
+        h = block_hash(text)
+        if h in records:
+            parsed = records[h]
+        else:
+            parsed = parse_block(text)
+            records[h] = parsed
+            stats["parsed"] += 1
+        stats["blocks"] += 1
+        loaded.append((h, parsed))
+    return loaded
+
+
+def load_file(cache, files, filepath, split_blocks, parse_block, stats):
+    """
+    讀取一個 .asc 檔並記錄到 files (本次的 檔案路徑 → (stamp, 簽章))，回傳內容簽章。
+    大小與 mtime 和上次相同時直接沿用，不讀檔也不計算 hash；
+    否則逐區塊計算 hash，只解析上次各檔案中都沒有的區塊。
+    """
+    stamp = file_stamp(filepath)
+    stats["files"] += 1
+    cached = cache["files"].get(filepath)
+    if cached is not None and cached[0] == stamp:
+        files[filepath] = cached
+        return cached[1]
+
+    store = open_store(cache)
+    loaded = []
+    if stamp is not None:
+        if "records" not in store:
+            store["records"] = {h: parsed for items in store["loaded"].values() for h, parsed in items}
+        loaded = load_blocks(split_blocks(filepath), parse_block, store["records"], stats)
+    signature = hashlib.blake2b(b"".join(h for h, _ in loaded), digest_size=16).digest()
+    store["loaded"][filepath] = loaded
+    files[filepath] = (stamp, signature)
+    stats["read"] += 1
+    return signature
+
+
+def cached_section(cache, sections, name, signature, compute, stats):
+    """輸入檔案的簽章與上次相同時沿用上次的段落結果，否則呼叫 compute() 重新計算"""
+    previous = cache["sections"].get(name)
+    if previous is not None and previous[0] == signature:
+        result = previous[1]
+    else:
+        result = compute()
+        stats["sections"] += 1
+    sections[name] = (signature, result)
+    return result
+
+
+def group_by_key(loaded, key):
+    """將 (hash, record) 依 key 分組：key → (group 簽章, record list)，保持檔案順序"""
+    groups = {}
+    for h, record in loaded:
+        if record is None:
+            continue
+        entry = groups.setdefault(record[key], ([], []))
+        entry[0].append(h)
+        entry[1].append(record)
+    return {name: (b"".join(hashes), items) for name, (hashes, items) in groups.items()}
+
+
+def incremental_compare(groups_new, groups_old, previous, compare, stats):
+    """
+    依 key 比較新舊 group；(新簽章, 舊簽章) 與上次相同的 key 直接沿用上次結果。
+    compare(group_new, group_old) 回傳該 key 的比較結果 (可為 None)。
+    回傳本次的 key → (新簽章, 舊簽章, 結果)。
+    """
+    current = {}
+    for name in groups_new.keys() | groups_old.keys():
+        sig_new, group_new = groups_new.get(name, (None, []))
+        sig_old, group_old = groups_old.get(name, (None, []))
+        cached = previous.get(name)
+        if cached is not None and cached[0] == sig_new and cached[1] == sig_old:
+            result = cached[2]
+        else:
+            result = compare(group_new, group_old)
+            stats["compared"] += 1
+        stats["keys"] += 1
+        current[name] = (sig_new, sig_old, result)
+    return current
+
+
+def compare_Nails_group(group_new, group_old):
+    """與 find_Nailsasc_shift / Del / Add 相同：同一 Net Name 以最後一筆比較"""
+    if group_new and group_old:
+        pair = compare_Nails_pair(group_new[-1], group_old[-1])
+        return ("shift", pair) if pair is not None else None
+    return ("add", None) if group_new else ("del", None)
+
+
+def make_Parts_compare(threshold_mil):
+    def compare_Parts_group(group_new, group_old):
+        if group_new and group_old:
+            change = compare_Parts_pair(group_new[-1], group_old[-1], threshold_mil)
+            return ("change", change) if change is not None else None
+        return ("add", None) if group_new else ("del", None)
+    return compare_Parts_group
+
+
+def collect_results(loaded_new, loaded_old, results, key):
+    """
+    由各 key 的結果組出 (比較結果 list, del_list, add_list)；
+    比較結果依新版檔案順序，Add / Del 依各自檔案順序 (與 find_* 相同)。
+    """
+    matched = []
+    seen = set()
+    for _, record in loaded_new:
+        if record is None or record[key] in seen:
+            continue
+        seen.add(record[key])
+        result = results[record[key]][2]
+        if result is not None and result[0] in ("shift", "change"):
+            matched.append(result[1])
+
+    add_list = [record for _, record in loaded_new
+                if record is not None and (results[record[key]][2] or ("",))[0] == "add"]
+    del_list = [record for _, record in loaded_old
+                if record is not None and (results[record[key]][2] or ("",))[0] == "del"]
+    return matched, del_list, add_list
+
+
+def revision_paths(folder):
+    """CAD 資料夾 → 各檔案的絕對路徑 (Pins.asc 不影響 Nails / Parts 報告，不讀取)"""
+    folder = os.path.abspath(folder)
+    return {"parts": os.path.join(folder, Parts_asc_name), "nails": os.path.join(folder, Nails_asc_name),
+            "nets": os.path.join(folder, Nets_asc_name)}
+
+
+def load_revision(cache, files, folder, stats):
+    """以檔案 stamp 與區塊快取讀取一個 CAD 資料夾，回傳 {"parts", "nails", "nets"} → (檔案路徑, 內容簽章)"""
+    paths = revision_paths(folder)
+    return {
+        "parts": (paths["parts"], load_file(cache, files, paths["parts"], split_line_blocks, parse_Parts_line, stats)),
+        "nails": (paths["nails"], load_file(cache, files, paths["nails"], split_line_blocks, parse_Nails_line, stats)),
+        "nets": (paths["nets"], load_file(cache, files, paths["nets"],
+                                          lambda path: split_header_blocks(path, is_Nets_header),
+                                          lambda text: parse_Nets_lines(text.splitlines()), stats)),
+    }
+
+
+def loaded_of(cache, revision, kind):
+    return open_store(cache)["loaded"][revision[kind][0]]
+
+
+def records_of(cache, revision, kind):
+    """(hash, record) list → record list；Nets.asc 每個區塊解析出的是 list，需展開"""
+    loaded = loaded_of(cache, revision, kind)
+    if kind == "nets":
+        return [net for _, nets in loaded for net in nets]
+    return [record for _, record in loaded if record is not None]
+
+
+def changed_nets(nets_a, nets_b):
+    """回傳 nets_a 中，名稱與 pin 組合在 nets_b 找不到完全相同者的 Net (改名 / 合併 / 分割只可能出現在這些 Net)"""
+    signatures = {(net["Net Name"], tuple(net["Pins"])) for net in nets_b}
+    return [net for net in nets_a if (net["Net Name"], tuple(net["Pins"])) not in signatures]
+
+
+def execute_incremental_diff(new_folder, old_folder, nails_output=Nails_asc_output, parts_output=Parts_asc_output,
+                             cache_file=None, threshold_mil=Parts_shift_threshold):
+    """
+    增量比對：Parts / Nails 以行、Nets 以 Net 區塊計算 hash，
+    只重新解析 hash 改變的區塊，只重新比對 (新, 舊) 簽章改變的 key，
+    其餘沿用上次快取的結果，輸出與 Tebo_instance 相同格式的 Nails / Parts 報告 (不做 registration)。
+
+    大小與 mtime 都沒變的檔案不讀取；輸入檔案的內容簽章都沒變的段落直接沿用上次的結果，
+    因此沒有任何變動時只需 stat 檔案與寫出報告，快取檔也不會重寫。
+    回傳 stats。
+    """
+    if cache_file is None:
+        cache_file = os.path.join(get_executable_path(), incremental_cache_name)
+
+    start = time.perf_counter()
+    cache = load_cache(cache_file)
+    options = (threshold_mil,)
+    changed = False
+    if cache["options"] != options:
+        store = open_store(cache)
+        store["nails"], store["parts"], cache["sections"], cache["options"] = {}, {}, {}, options
+        changed = True
+
+    stats = {"files": 0, "read": 0, "blocks": 0, "parsed": 0, "sections": 0, "keys": 0, "compared": 0}
+    files = {}
+    new = load_revision(cache, files, new_folder, stats)
+    old = load_revision(cache, files, old_folder, stats)
+    label_new = os.path.basename(os.path.normpath(new_folder))
+    label_old = os.path.basename(os.path.normpath(old_folder))
+    sections = {}
+
+    # Nails
+    def compute_Nails():
+        store = open_store(cache)
+        loaded_new, loaded_old = loaded_of(cache, new, "nails"), loaded_of(cache, old, "nails")
+        store["nails"] = incremental_compare(
+            group_by_key(loaded_new, "Net Name"), group_by_key(loaded_old, "Net Name"),
+            store["nails"], compare_Nails_group, stats
+        )
+        shift_pairs, del_list, add_list = collect_results(loaded_new, loaded_old, store["nails"], "Net Name")
+        return [item for pair in shift_pairs for item in pair], del_list, add_list
+
+    shift_list, del_list, add_list = cached_section(
+        cache, sections, "nails", (new["nails"][1], old["nails"][1]), compute_Nails, stats)
+
+    create_or_replace_file(nails_output)
+    save_Nails_summary_notebook(nails_output, label_new, label_old)
+    save_Nails_shift_notebook(shift_list, nails_output, Nails_shift_threshold, label_new, label_old)
+    save_Nails_del_notebook(del_list, nails_output, label_new, label_old)
+    save_Nails_add_notebook(add_list, nails_output, label_new, label_old)
+
+    # Net 改名 / 合併 / 分割只需看兩版本不完全相同的 Net
+    def compute_Nets():
+        all_nets_new, all_nets_old = records_of(cache, new, "nets"), records_of(cache, old, "nets")
+        nails_new, nails_old = records_of(cache, new, "nails"), records_of(cache, old, "nails")
+        nets_new = changed_nets(all_nets_new, all_nets_old)
+        nets_old = changed_nets(all_nets_old, all_nets_new)
+        renames = find_Nets_rename(nets_new, nets_old)
+        return (renames, find_Nailsasc_rename(nails_new, nails_old, renames),
+                find_Nets_merge_split(nets_new, nets_old, nails_new, nails_old))
+
+    renames, nail_renames, merge_split = cached_section(
+        cache, sections, "nets", (new["nets"][1], old["nets"][1], new["nails"][1], old["nails"][1]),
+        compute_Nets, stats)
+    save_Nets_rename_notebook(renames, nail_renames, nails_output, label_new, label_old)
+    save_Nets_merge_split_notebook(merge_split, nails_output, label_new, label_old)
+
+    # Parts
+    def compute_Parts():
+        store = open_store(cache)
+        loaded_new, loaded_old = loaded_of(cache, new, "parts"), loaded_of(cache, old, "parts")
+        store["parts"] = incremental_compare(
+            group_by_key(loaded_new, "Part"), group_by_key(loaded_old, "Part"),
+            store["parts"], make_Parts_compare(threshold_mil), stats
+        )
+        return collect_results(loaded_new, loaded_old, store["parts"], "Part")
+
+    change_list, del_list, add_list = cached_section(
+        cache, sections, "parts", (new["parts"][1], old["parts"][1]), compute_Parts, stats)
+
+    create_or_replace_file(parts_output)
+    save_Parts_summary_notebook(parts_output, label_new, label_old)
+    save_Parts_shift_notebook(filter_Parts_shift(change_list), parts_output, label_new, label_old)
+    save_Parts_del_notebook(del_list, parts_output, label_new, label_old)
+    save_Parts_add_notebook(add_list, parts_output, label_new, label_old)
+    save_Parts_swap_notebook(filter_Parts_swap(change_list), parts_output, label_new, label_old)
+
+    # 只保留本次用到的檔案與段落；沒有任何變動時不重寫快取
+    changed = changed or stats["read"] > 0 or stats["sections"] > 0 or files.keys() != cache["files"].keys() \
+        or sections.keys() != cache["sections"].keys()
+    if changed:
+        if files.keys() != cache["files"].keys():
+            open_store(cache)
+        cache["files"], cache["sections"] = files, sections
+        save_cache(cache, cache_file)
+
+    elapsed = time.perf_counter() - start
+    print(f"增量比對完成：重新讀取 {stats['read']}/{stats['files']} 個檔案、解析 {stats['parsed']}/{stats['blocks']} 個區塊，"
+          f"重新比對 {stats['compared']}/{stats['keys']} 個 key，耗時 {elapsed:.3f} 秒")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="增量比對兩版 Tebo CAD (沿用上次的區塊 hash 與比對結果)")
+    parser.add_argument("new", help="新版 CAD 資料夾")
+    parser.add_argument("old", help="舊版 CAD 資料夾")
+    parser.add_argument("--cache", default=None, help=f"快取檔 (預設 {incremental_cache_name})")
+    parser.add_argument("--nails-output", default=Nails_asc_output)
+    parser.add_argument("--parts-output", default=Parts_asc_output)
+    args = parser.parse_args()
+
+    execute_incremental_diff(args.new, args.old, args.nails_output, args.parts_output, args.cache)
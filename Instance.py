@@ -113,34 +113,40 @@ def create_or_replace_file(file_name):
             pass  
         print(f"檔案 {file_name} 不存在，已建立。")
 
-def write_list_to_file(data_list, filename="parser_result.txt"):
+def write_list_to_file(data_list, filename="parser_result.txt", mode="a", verbose=True):
     """
-    將列表的內容逐行寫入指定的檔案。如果檔案已存在，則會覆蓋原有內容。
+    將列表的內容逐行寫入指定的檔案。
 
     Args:
         data_list: 要寫入的列表。
         filename: 要寫入的檔案名稱，預設為 "parser_result.txt"。
+        mode: "a" 續寫 (預設)，"w" 覆蓋原有內容。
+        verbose: 是否印出寫入訊息。
     """
     try:
-        with open(filename, "a", encoding="utf-8") as f:  # 使用 utf-8 編碼開啟檔案
+        with open(filename, mode, encoding="utf-8") as f:  # 使用 utf-8 編碼開啟檔案
             for item in data_list:
                 f.write(str(item) + "\n")  # 將每個列表元素轉換為字串，並加上換行符號
-        print(f"已將列表內容寫入檔案: {filename}")
+        if verbose:
+            print(f"已將列表內容寫入檔案: {filename}")
     except Exception as e:
         print(f"寫入檔案時發生錯誤: {e}")
 
-def write_string_to_file(text, filename="parser_result.txt"):
+def write_string_to_file(text, filename="parser_result.txt", mode="a", verbose=True):
     """
-    將字串寫入指定的檔案。如果檔案已存在，則會覆蓋原有內容。
+    將字串寫入指定的檔案。
 
     Args:
         text: 要寫入的字串。
         filename: 要寫入的檔案名稱，預設為 "parser_result.txt"。
+        mode: "a" 續寫 (預設)，"w" 覆蓋原有內容。
+        verbose: 是否印出寫入訊息。
     """
     try:
-        with open(filename, "a", encoding="utf-8") as f:  # 使用 utf-8 編碼開啟檔案
+        with open(filename, mode, encoding="utf-8") as f:  # 使用 utf-8 編碼開啟檔案
             f.write(text + "\n")  # 將字串寫入檔案
-        print(f"已將字串寫入檔案: {filename}")
+        if verbose:
+            print(f"已將字串寫入檔案: {filename}")
     except Exception as e:
         print(f"寫入檔案時發生錯誤: {e}")
 
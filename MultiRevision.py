@@ -0,0 +1,212 @@
+import argparse
+import os
+
+from Instance import create_or_replace_file
+from BoardModel import load_board
+from TeboCADProcess import (
+    separator, compare_Nails_pair, compare_Parts_pair, Parts_shift_threshold,
+    CAD_registration, Registration_tolerance, estimate_transform, is_identity_transform, format_transform_lines,
+)
+from NetAnalysis import match_Nets, is_auto_net
+
+Revisions_output = "Diff_Revisions_report.txt"
+
+
+def align_Nets(boards):
+    """
+    依 pin-set (NetAnalysis.match_Nets) 將各版本的 Net 串成同一列，改名或重新編號的 Net 不會拆成 Del + Add。
+    回傳 {列名: [(Net Name, frozenset(pins)) 或 None, ...]}，列名為該 Net 第一次出現時的名稱
+    (與其他列重複時加上版本名稱)。
+    """
+    count = len(boards)
+    rows = {}
+    previous_row = {}  # 前一版 Net Name → 列名
+    for i, board in enumerate(boards):
+        mapping = match_Nets(board.nets, boards[i - 1].nets) if i > 0 else {}
+        current_row = {}
+        for net in board.nets:
+            name = net["Net Name"]
+            key = previous_row.get(mapping.get(name))
+            if key is None:
+                key = name if name not in rows else f"{name} ({board.label})"
+                rows[key] = [None] * count
+            rows[key][i] = (name, frozenset(net["Pins"]))
+            current_row[name] = key
+        previous_row = current_row
+    return rows
+
+
+def align_revisions(boards):
+    """
+    將 N 個版本依 key 對齊成一張寬表 (每個版本只掃描一次)：
+        {"Parts": {Part: [part 或 None, ...]},
+         "Nails": {Net Name: [該 Net 最後一根 nail 或 None, ...]},
+         "Nets" : align_Nets(boards)}
+    list 的第 i 格對應 boards[i]；Nails 與 find_Nailsasc_* 相同，同一 Net 以最後一筆為代表。
+    """
+    count = len(boards)
+    table = {"Parts": {}, "Nails": {}, "Nets": align_Nets(boards)}
+    for i, board in enumerate(boards):
+        for part in board.parts:
+            table["Parts"].setdefault(part["Part"], [None] * count)[i] = part
+        for nail in board.nails:
+            table["Nails"].setdefault(nail["Net Name"], [None] * count)[i] = nail
+    return table
+
+
+def estimate_revision_transforms(boards, register=CAD_registration, tolerance_mil=Registration_tolerance):
+    """
+    與 execute_Nails_summary / execute_Parts_summary 相同，對每一對相鄰版本估計整體平移/旋轉。
+    回傳 list，第 i 格為 boards[i-1] → boards[i] 的 {"Nails": transform, "Parts": transform}，
+    不做 registration 或轉換可忽略時為 None；第 0 格固定為 None。
+    """
+    transforms = [None]
+    for i in range(1, len(boards)):
+        new, old = boards[i], boards[i - 1]
+        pair = {}
+        for kind, key, CAD_new, CAD_old in (("Nails", "Net Name", new.nails, old.nails),
+                                             ("Parts", "Part", new.parts, old.parts)):
+            transform = estimate_transform(CAD_new, CAD_old, key) if register else None
+            pair[kind] = None if is_identity_transform(transform, tolerance_mil) else transform
+        transforms.append(pair)
+    return transforms
+
+
+def compare_cell(kind, new, old, threshold_mil, transform=None, tolerance_mil=Registration_tolerance):
+    """比較寬表中相鄰兩格，回傳變更描述字串，沒有變更回傳 None；transform 為該對版本的 registration"""
+    if new is None and old is None:
+        return None
+    if old is None:
+        return "Add"
+    if new is None:
+        return "Del"
+    if kind == "Parts":
+        change = compare_Parts_pair(new, old, threshold_mil, transform)
+        return "/".join(change["Changes"]) if change else None
+    if kind == "Nails":
+        return "Shift" if compare_Nails_pair(new, old, transform, tolerance_mil) else None
+
+    (new_name, new_pins), (old_name, old_pins) = new, old
+    changes = []
+    if new_name != old_name and not (is_auto_net(new_name) and is_auto_net(old_name)):
+        changes.append(f"Rename {old_name} -> {new_name}")
+    if new_pins != old_pins:
+        changes.append(f"Pins +{len(new_pins - old_pins)} -{len(old_pins - new_pins)}")
+    return "/".join(changes) if changes else None
+
+
+def find_revision_changes(table, threshold_mil=Parts_shift_threshold, transforms=None,
+                          tolerance_mil=Registration_tolerance):
+    """
+    對寬表的每個 key 依序比較相鄰版本，總比較次數與版本數成線性。
+    transforms 為 estimate_revision_transforms 的結果，未傳入時不做 registration。
+    回傳 dict：kind → {key: [(版本索引 i, 變更描述), ...]}，i 表示 boards[i-1] → boards[i]
+    """
+    history = {}
+    for kind, rows in table.items():
+        kind_history = {}
+        for key, cells in rows.items():
+            changes = []
+            for i in range(1, len(cells)):
+                transform = transforms[i].get(kind) if transforms and transforms[i] else None
+                change = compare_cell(kind, cells[i], cells[i - 1], threshold_mil, transform, tolerance_mil)
+                if change is not None:
+                    changes.append((i, change))
+            if changes:
+                kind_history[key] = changes
+        history[kind] = kind_history
+    return history
+
+
+def count_pair_changes(history, revision_count):
+    """統計每一對相鄰版本各類別的 Add / Del / Changed 數量：counts[i][kind] = {"Add", "Del", "Changed"}"""
+    counts = [{kind: {"Add": 0, "Del": 0, "Changed": 0} for kind in history} for _ in range(revision_count)]
+    for kind, kind_history in history.items():
+        for changes in kind_history.values():
+            for i, change in changes:
+                bucket = change if change in ("Add", "Del") else "Changed"
+                counts[i][kind][bucket] += 1
+    return counts
+
+
+def save_Revisions_notebook(labels, history, filepath=Revisions_output, transforms=None):
+    """
+    格式：
+    WYMTN Difference Report For Revisions
+    Revision 1 : <label>
+    ...
+    [Part 1] Consecutive Revision Changes
+    <old> -> <new>   Parts +a -d ~c   Nails +a -d ~c   Nets +a -d ~c
+    (有 registration 時) Nails / Parts Registration (<old> -> <new>): ...
+
+    [Part 2] Change History (Parts / Nails / Nets)
+    Part   <label_2>: Shift/Rot   <label_5>: Device
+    """
+    counts = count_pair_changes(history, len(labels))
+
+    lines = []
+    lines.append("WYMTN Difference Report For Revisions")
+    lines.append(separator("="))
+    for i, label in enumerate(labels, start=1):
+        lines.append(f"Revision {i} : {label}")
+    lines.append("")
+
+    lines.append(separator())
+    lines.append("[Part 1] Consecutive Revision Changes   (+ Add, - Del, ~ Changed)")
+    for i in range(1, len(labels)):
+        line = f"{labels[i - 1]} -> {labels[i]}"
+        for kind in history:
+            c = counts[i][kind]
+            line += f"   {kind} +{c['Add']} -{c['Del']} ~{c['Changed']}"
+        lines.append(line)
+        if transforms and transforms[i]:
+            for kind, transform in transforms[i].items():
+                if transform is not None:
+                    lines.extend(f"    {kind} {text}" for text in format_transform_lines(transform, labels[i], labels[i - 1]))
+    lines.append("")
+
+    lines.append(separator())
+    lines.append("[Part 2] Change History")
+    for kind, kind_history in history.items():
+        lines.append("")
+        lines.append(f"{kind} changed = {len(kind_history)}")
+        for key in sorted(kind_history):
+            steps = "   ".join(f"{labels[i]}: {change}" for i, change in kind_history[key])
+            lines.append(f"{key}   {steps}")
+    lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"多版本比對結果已續寫到 {filepath}")
+
+
+def execute_Revisions_summary(folders, filepath=Revisions_output, threshold_mil=Parts_shift_threshold,
+                              register=CAD_registration, tolerance_mil=Registration_tolerance):
+    """
+    依序 (舊 → 新) 讀取多個 CAD 資料夾，每個版本只解析一次，輸出相鄰版本差異與各項目的變更歷程。
+    register = True 時每一對相鄰版本各自估計整體平移/旋轉，Shift 以轉換後的座標判斷。
+    """
+    boards = [load_board(folder) for folder in folders]
+    table = align_revisions(boards)
+    transforms = estimate_revision_transforms(boards, register, tolerance_mil)
+    history = find_revision_changes(table, threshold_mil, transforms, tolerance_mil)
+
+    create_or_replace_file(filepath)
+    save_Revisions_notebook([board.label for board in boards], history, filepath, transforms)
+    return table, history
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多版本 CAD 一次比對 (相鄰版本差異 + 變更歷程)")
+    parser.add_argument("folders", nargs="+", help="CAD 資料夾，依舊 → 新排列")
+    parser.add_argument("--output", default=Revisions_output)
+    parser.add_argument("--threshold", type=float, default=Parts_shift_threshold, help="Parts 位移門檻 (mil)")
+    parser.add_argument("--no-register", action="store_true", help="不做整體平移/旋轉 registration")
+    args = parser.parse_args()
+
+    missing = [folder for folder in args.folders if not os.path.isdir(folder)]
+    if missing:
+        print(f"Error: cad folder not found: {', '.join(missing)}")
+    else:
+        execute_Revisions_summary(args.folders, args.output, args.threshold, not args.no_register)
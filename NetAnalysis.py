@@ -0,0 +1,371 @@
+import math
+from collections import Counter
+
+from TeboCADProcess import separator, Nails_asc_output
+
+Nets_rename_similarity = 0.5  # pin-set Jaccard 相似度下限
+Auto_net_prefix = "NC_"       # 自動命名的 Net (未連接 pin)，每次出圖會重新編號
+
+
+def find_Nets_rename(Nets_new, Nets_old, min_similarity=Nets_rename_similarity):
+    """
+    以 pin-set 特徵找出改名的 Net (舊版有、新版沒有的名稱 ↔ 新版有、舊版沒有的名稱)。
+
+    1. 完全相同：以 frozenset(pins) 為 key 建 hash 索引，一次查表配對 (Similarity = 1.0)
+    2. 部分變動：以 pin → 舊 Net 的索引累計共同 pin 數，計算 Jaccard 相似度，
+       >= min_similarity 者依相似度由高到低一對一配對
+
+    整體為 pin 數的線性時間，不做 Net 兩兩比較。
+
+    參數:
+        Nets_new, Nets_old: list of dict (parse_Netsasc)
+
+    回傳:
+        list of dict:
+            {"Old Net Name", "New Net Name", "Similarity", "Common Pins", "Old Pins", "New Pins"}
+    """
+    new_names = {net["Net Name"] for net in Nets_new}
+    old_names = {net["Net Name"] for net in Nets_old}
+
+    old_only = [net for net in Nets_old if net["Net Name"] not in new_names and net["Pins"]]
+    new_only = [net for net in Nets_new if net["Net Name"] not in old_names and net["Pins"]]
+
+    renames = []
+
+    # 1. 完全相同的 pin-set
+    signature_index = {}
+    for net in old_only:
+        signature_index.setdefault(frozenset(net["Pins"]), []).append(net)
+
+    matched_old = set()
+    unmatched_new = []
+    for net in new_only:
+        pin_set = frozenset(net["Pins"])
+        candidates = signature_index.get(pin_set)
+        if candidates:
+            old_net = candidates.pop(0)
+            matched_old.add(old_net["Net Name"])
+            renames.append({
+                "Old Net Name": old_net["Net Name"],
+                "New Net Name": net["Net Name"],
+                "Similarity": 1.0,
+                "Common Pins": len(pin_set),
+                "Old Pins": len(pin_set),
+                "New Pins": len(pin_set)
+            })
+        else:
+            unmatched_new.append(net)
+
+    # 2. 部分變動：pin → 舊 Net 索引
+    pin_owner = {}
+    old_size = {}
+    for net in old_only:
+        if net["Net Name"] in matched_old:
+            continue
+        pins = set(net["Pins"])
+        old_size[net["Net Name"]] = len(pins)
+        for pin in pins:
+            pin_owner[pin] = net["Net Name"]
+
+    candidates = []
+    for net in unmatched_new:
+        pins = set(net["Pins"])
+        common_counts = Counter(pin_owner[pin] for pin in pins if pin in pin_owner)
+        for old_name, common in common_counts.items():
+            similarity = common / (len(pins) + old_size[old_name] - common)
+            if similarity >= min_similarity:
+                candidates.append((similarity, common, old_name, net["Net Name"], len(pins)))
+
+    candidates.sort(key=lambda item: item[0], reverse=True)
+    used_new = set()
+    for similarity, common, old_name, new_name, new_count in candidates:
+        if old_name in matched_old or new_name in used_new:
+            continue
+        matched_old.add(old_name)
+        used_new.add(new_name)
+        renames.append({
+            "Old Net Name": old_name,
+            "New Net Name": new_name,
+            "Similarity": similarity,
+            "Common Pins": common,
+            "Old Pins": old_size[old_name],
+            "New Pins": new_count
+        })
+
+    return renames
+
+
+def is_auto_net(name):
+    """Net Name 是否為自動命名 (NC_1765 等)，這類名稱只是流水號，不代表 Net 本身有變動"""
+    return name.upper().startswith(Auto_net_prefix)
+
+
+def match_Nets(Nets_new, Nets_old, min_similarity=Nets_rename_similarity):
+    """
+    依 pin-set 對應新舊版本中的同一條 Net，回傳 {新版 Net Name: 舊版 Net Name}。
+
+    1. pin-set 完全相同 (有 pin 的 Net)：視為同一條 Net，不論名稱；多個候選時優先同名
+    2. 其餘依相同名稱配對
+    3. 仍未配對的交給 find_Nets_rename，以 Jaccard 相似度找出改名且 pin 有變動的 Net
+
+    沒有出現在回傳結果中的新版 Net 為新增，舊版 Net 為刪除。
+    """
+    signature_index = {}
+    for net in Nets_old:
+        if net["Pins"]:
+            signature_index.setdefault(frozenset(net["Pins"]), []).append(net["Net Name"])
+
+    mapping = {}
+    used_old = set()
+    for net in Nets_new:
+        if not net["Pins"]:
+            continue
+        candidates = [name for name in signature_index.get(frozenset(net["Pins"]), ()) if name not in used_old]
+        if not candidates:
+            continue
+        old_name = net["Net Name"] if net["Net Name"] in candidates else candidates[0]
+        mapping[net["Net Name"]] = old_name
+        used_old.add(old_name)
+
+    old_names = {net["Net Name"] for net in Nets_old} - used_old
+    for net in Nets_new:
+        name = net["Net Name"]
+        if name not in mapping and name in old_names:
+            mapping[name] = name
+            used_old.add(name)
+
+    rest_new = [net for net in Nets_new if net["Net Name"] not in mapping]
+    rest_old = [net for net in Nets_old if net["Net Name"] not in used_old]
+    for rename in find_Nets_rename(rest_new, rest_old, min_similarity):
+        mapping[rename["New Net Name"]] = rename["Old Net Name"]
+
+    return mapping
+
+
+def find_Nailsasc_rename(CAD_new, CAD_old, renames):
+    """
+    找出 find_Nailsasc_Del / find_Nailsasc_Add 中其實是 Net 改名的 nail。
+    同一 Net 上有多支 nail 時依檔案順序配對。
+
+    回傳 list of dict:
+        {"Old Net Name", "New Net Name", "Similarity", "New": nail, "Old": nail}
+        New 或 Old 可能為 None (改名後 nail 數量不同)
+    """
+    new_names = {item["Net Name"] for item in CAD_new}
+    old_names = {item["Net Name"] for item in CAD_old}
+
+    new_by_net = {}
+    for item in CAD_new:
+        if item["Net Name"] not in old_names:
+            new_by_net.setdefault(item["Net Name"], []).append(item)
+    old_by_net = {}
+    for item in CAD_old:
+        if item["Net Name"] not in new_names:
+            old_by_net.setdefault(item["Net Name"], []).append(item)
+
+    rename_list = []
+    for rename in renames:
+        old_nails = old_by_net.get(rename["Old Net Name"], [])
+        new_nails = new_by_net.get(rename["New Net Name"], [])
+        for i in range(max(len(old_nails), len(new_nails))):
+            rename_list.append({
+                "Old Net Name": rename["Old Net Name"],
+                "New Net Name": rename["New Net Name"],
+                "Similarity": rename["Similarity"],
+                "New": new_nails[i] if i < len(new_nails) else None,
+                "Old": old_nails[i] if i < len(old_nails) else None
+            })
+    return rename_list
+
+
+def save_Nets_rename_notebook(renames, rename_list, filepath=Nails_asc_output, label_new="CAD_new", label_old="CAD_old"):
+    """
+    將 Net 改名結果續寫到 Nails 報告
+    格式：
+    [Part 4] Renamed Nets
+    Renamed Nets = N   (Exact = a, Partial = b)
+
+    <label_old> Net Name  ->  <label_new> Net Name   Similarity = s (common/old/new pins)
+
+    Following nails are reported in Del/Add, but the net is renamed
+    <label_new>   X   Y   (T/B)   Net Name
+    <label_old>   X   Y   (T/B)   Net Name
+    Distance = d inch (d_mil mil)
+    """
+    lines = []
+    lines.append(separator())
+    lines.append("[Part 4] Renamed Nets")
+
+    exact_count = sum(1 for item in renames if item["Similarity"] >= 1.0)
+    lines.append(f"Renamed Nets  = {len(renames)}   (Exact = {exact_count}, Partial = {len(renames) - exact_count})")
+    lines.append("")
+
+    for item in renames:
+        lines.append(
+            f"{item['Old Net Name']}  ->  {item['New Net Name']}   Similarity = {item['Similarity']:.2f} "
+            f"({item['Common Pins']}/{item['Old Pins']}/{item['New Pins']} pins)"
+        )
+    lines.append("")
+
+    lines.append("Following nails are reported in Del/Add, but the net is renamed")
+    for item in rename_list:
+        new = item["New"]
+        old = item["Old"]
+        if new is not None:
+            lines.append(f"{label_new}     {new['X']:.4f}    {new['Y']:.4f}   ({new['T/B']})   {new['Net Name']}")
+        else:
+            lines.append(f"{label_new}     --None--   {item['New Net Name']}")
+        if old is not None:
+            lines.append(f"{label_old}     {old['X']:.4f}    {old['Y']:.4f}   ({old['T/B']})   {old['Net Name']}")
+        else:
+            lines.append(f"{label_old}     --None--   {item['Old Net Name']}")
+        if new is not None and old is not None:
+            distance_inch = math.hypot(new["X"] - old["X"], new["Y"] - old["Y"])
+            lines.append(f"Distance = {distance_inch:.4f} inch ({distance_inch * 1000:.1f} mil)")
+        lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"Net 改名結果已續寫到 {filepath}")
+
+
+class UnionFind:
+    """並查集 (path halving + union by size)，元素為 0..n-1 的整數"""
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        ra = self.find(a)
+        rb = self.find(b)
+        if ra == rb:
+            return ra
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+        return ra
+
+
+def find_Nets_merge_split(Nets_new, Nets_old, CAD_new=None, CAD_old=None):
+    """
+    以 pin → Net 對應建立新舊版本的連通關係，用 union-find 找出 Net 合併與分割。
+
+    新舊每個 Net 各為一個節點；同一個 pin 在兩版本所屬的 Net 彼此 union。
+    每個連通群組：
+        舊 Net >= 2、新 Net == 1 → Merge
+        舊 Net == 1、新 Net >= 2 → Split
+        舊 Net >= 2、新 Net >= 2 → Merge+Split
+    只有一對一的群組 (未變動或單純改名) 不列出。
+
+    參數:
+        Nets_new, Nets_old: list of dict (parse_Netsasc)
+        CAD_new, CAD_old  : list of dict (parse_Nailsasc)，可選；提供時列出受影響的 nail
+
+    回傳:
+        list of dict:
+            {"Type", "Old Nets", "New Nets", "New Nails", "Old Nails"}
+    """
+    old_count = len(Nets_old)
+    uf = UnionFind(old_count + len(Nets_new))
+
+    # pin → 舊 Net 節點
+    pin_old = {}
+    for i, net in enumerate(Nets_old):
+        for pin in net["Pins"]:
+            pin_old[pin] = i
+
+    for j, net in enumerate(Nets_new):
+        node = old_count + j
+        for pin in net["Pins"]:
+            i = pin_old.get(pin)
+            if i is not None:
+                uf.union(i, node)
+
+    groups = {}
+    for i in range(old_count):
+        groups.setdefault(uf.find(i), ([], []))[0].append(Nets_old[i]["Net Name"])
+    for j in range(len(Nets_new)):
+        groups.setdefault(uf.find(old_count + j), ([], []))[1].append(Nets_new[j]["Net Name"])
+
+    new_nails_by_net = {}
+    for item in CAD_new or []:
+        new_nails_by_net.setdefault(item["Net Name"], []).append(item)
+    old_nails_by_net = {}
+    for item in CAD_old or []:
+        old_nails_by_net.setdefault(item["Net Name"], []).append(item)
+
+    results = []
+    for old_names, new_names in groups.values():
+        if len(old_names) >= 2 and len(new_names) == 1:
+            change_type = "Merge"
+        elif len(old_names) == 1 and len(new_names) >= 2:
+            change_type = "Split"
+        elif len(old_names) >= 2 and len(new_names) >= 2:
+            change_type = "Merge+Split"
+        else:
+            continue
+
+        results.append({
+            "Type": change_type,
+            "Old Nets": old_names,
+            "New Nets": new_names,
+            "New Nails": [nail for name in new_names for nail in new_nails_by_net.get(name, [])],
+            "Old Nails": [nail for name in old_names for nail in old_nails_by_net.get(name, [])]
+        })
+
+    return results
+
+
+def save_Nets_merge_split_notebook(merge_split_list, filepath=Nails_asc_output, label_new="CAD_new", label_old="CAD_old"):
+    """
+    將 find_Nets_merge_split 的結果續寫到 Nails 報告
+    格式：
+    [Part 5] Merged / Split Nets
+    Merge = a, Split = b, Merge+Split = c
+    Affected Nails : TOP Side = N, Bottom Side = M
+
+    <Type>
+    <label_old> Nets : A, B
+    <label_new> Nets : C
+    <label_new>   $n   X   Y   (T/B)   Net Name
+    <label_old>   $n   X   Y   (T/B)   Net Name
+    """
+    lines = []
+    lines.append(separator())
+    lines.append("[Part 5] Merged / Split Nets")
+
+    type_count = Counter(item["Type"] for item in merge_split_list)
+    lines.append(
+        f"Merge = {type_count['Merge']}, Split = {type_count['Split']}, Merge+Split = {type_count['Merge+Split']}"
+    )
+
+    affected = [nail for item in merge_split_list for nail in item["New Nails"]]
+    top_count = sum(1 for nail in affected if nail["T/B"].upper() == "T")
+    bottom_count = sum(1 for nail in affected if nail["T/B"].upper() == "B")
+    lines.append(f"Affected Nails ({label_new}) : TOP Side  = {top_count}, Bottom Side  = {bottom_count}")
+    lines.append("")
+
+    for item in merge_split_list:
+        lines.append(f"{item['Type']}")
+        lines.append(f"{label_old} Nets : {', '.join(item['Old Nets'])}")
+        lines.append(f"{label_new} Nets : {', '.join(item['New Nets'])}")
+        for nail in item["New Nails"]:
+            lines.append(f"{label_new}     {nail['Nail']}    {nail['X']:.4f}    {nail['Y']:.4f}   ({nail['T/B']})   {nail['Net Name']}")
+        for nail in item["Old Nails"]:
+            lines.append(f"{label_old}     {nail['Nail']}    {nail['X']:.4f}    {nail['Y']:.4f}   ({nail['T/B']})   {nail['Net Name']}")
+        lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"Net 合併/分割結果已續寫到 {filepath}")
@@ -1,4 +1,5 @@
 import subprocess
+import sys
 import importlib
 import math
 import pandas as pd
@@ -0,0 +1,172 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from HTMLparser import read_html_by_name, extract_all_component
+from Instance import extract_location_texts_SFCS
+from PLMBOMProcess import extract_location_texts_PLM
+from SyntheticData import generate_all, Synthetic_seed
+
+Benchmark_sizes = (10000, 100000)
+# VF HTML (BeautifulSoup) 約 1 ms / 位置、30 KB / 位置：超過此位置數需加 --allow-large-html，否則略過
+Benchmark_html_limit = 100000
+# Agile .xls 每個工作表最多 65536 列 (平均約 5.7 個位置一列)：超過此位置數時略過 xls
+Benchmark_xls_limit = 300000
+Benchmark_baseline = "Benchmark_baseline.json"  # 各 parser 輸出的 digest，用來確認改寫後結果不變
+
+
+def parse_VF_html(filepath):
+    return extract_all_component(read_html_by_name(filepath))
+
+
+# 名稱 → (SyntheticData 檔案種類, 端到端的解析函式, 輸出 → 位置 list)
+Benchmark_parsers = {
+    "VF HTML": ("html", parse_VF_html, lambda rows: [row[0] for row in rows]),
+    "SFCS BOM": ("sfcs", extract_location_texts_SFCS, list),
+    "Agile BOM": ("agile", extract_location_texts_PLM, list),
+    "Agile XLS": ("agile_xls", extract_location_texts_PLM, list),  # read_excel_auto_safe 的 xlrd 分支
+}
+
+
+def skip_reason(name, count, allow_large_html=False):
+    """回傳此位置數下略過 parser 的原因，不略過時回傳 None"""
+    kind = Benchmark_parsers[name][0]
+    if kind == "html" and count > Benchmark_html_limit and not allow_large_html:
+        return f"超過 {Benchmark_html_limit} 位置，需 --allow-large-html"
+    if kind == "agile_xls" and count > Benchmark_xls_limit:
+        return f"超過 {Benchmark_xls_limit} 位置，xls 列數不足"
+    return None
+
+
+def output_digest(result):
+    """輸出內容的 sha1 (json 序列化)，只要任何一筆資料或順序改變，digest 就不同"""
+    return hashlib.sha1(json.dumps(result, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def measure(func, filepath, memory=True):
+    """
+    執行 func(filepath)，回傳 (結果, 秒數, 記憶體峰值 MB)。
+    計時與記憶體分兩次執行：tracemalloc 會讓程式變慢，不能混在計時裡；memory=False 時峰值為 None。
+    parser 本身會大量 print，執行期間的 stdout 導到 devnull。
+    """
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        result = func(filepath)
+        seconds = time.perf_counter() - start
+
+        peak_mb = None
+        if memory:
+            tracemalloc.start()
+            try:
+                func(filepath)
+                peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            finally:
+                tracemalloc.stop()
+    return result, seconds, peak_mb
+
+
+def load_baseline(filepath):
+    if not os.path.exists(filepath):
+        return {}
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_benchmark(sizes=Benchmark_sizes, work_dir=None, seed=Synthetic_seed, parsers=None,
+                  baseline=None, memory=True, allow_large_html=False):
+    """
+    依 sizes 產生測試資料並逐一執行 parser，回傳 list of dict：
+        parser, locations, seconds, peak_mb, rows, digest,
+        expected : 輸出的位置是否正好是產生的位置 (不論順序)
+        baseline : 與 baseline digest 相同為 True、不同為 False、沒有紀錄為 None
+    位置數超過 Benchmark_html_limit 時，除非 allow_large_html，否則略過 VF HTML (1M 位置需數小時、數十 GB)；
+    超過 Benchmark_xls_limit 時略過 Agile XLS (xls 列數上限)。
+    """
+    baseline = baseline or {}
+    names = parsers or list(Benchmark_parsers)
+    results = []
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for count in sizes:
+            run_names = []
+            for name in names:
+                reason = skip_reason(name, count, allow_large_html)
+                if reason is None:
+                    run_names.append(name)
+                else:
+                    print(f"{name:<10} {count:>8}  略過 ({reason})")
+            if not run_names:
+                continue
+
+            # 只產生要執行的種類：略過的 VF HTML 在 1M 位置時單是檔案就接近 1 GB
+            kinds = tuple(dict.fromkeys(Benchmark_parsers[name][0] for name in run_names))
+            locations, paths = generate_all(count, work_dir or temp_dir, seed, kinds)
+            expected = sorted(name for name, _ in locations)
+
+            for name in run_names:
+                kind, func, to_locations = Benchmark_parsers[name]
+                result, seconds, peak_mb = measure(func, paths[kind], memory)
+                digest = output_digest(result)
+                key = f"{name}|{count}|{seed}"
+                results.append({
+                    "parser": name,
+                    "locations": count,
+                    "seconds": round(seconds, 3),
+                    "peak_mb": round(peak_mb, 1) if peak_mb is not None else None,
+                    "rows": len(result),
+                    "digest": digest,
+                    "expected": sorted(to_locations(result)) == expected,
+                    "baseline": baseline[key] == digest if key in baseline else None,
+                })
+                print(format_result(results[-1]))
+    return results
+
+
+def format_result(item):
+    peak = f"{item['peak_mb']:9.1f}" if item["peak_mb"] is not None else f"{'-':>9}"
+    baseline = {True: "相同", False: "不同", None: "無紀錄"}[item["baseline"]]
+    return (f"{item['parser']:<10} {item['locations']:>8} {item['seconds']:>9.3f} {peak} {item['rows']:>8} "
+            f"{'OK' if item['expected'] else 'MISMATCH':>8}  {baseline}")
+
+
+def save_baseline(results, filepath, seed):
+    baseline = load_baseline(filepath)
+    for item in results:
+        baseline[f"{item['parser']}|{item['locations']}|{seed}"] = item["digest"]
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+    print(f"已更新 baseline：{filepath}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="以合成資料量測 VF HTML / SFCS BOM / Agile BOM (xlsx、xls) parser 的時間與記憶體")
+    parser.add_argument("--locations", type=int, nargs="+", default=list(Benchmark_sizes))
+    parser.add_argument("--parsers", nargs="+", choices=list(Benchmark_parsers), default=None)
+    parser.add_argument("--seed", type=int, default=Synthetic_seed)
+    parser.add_argument("--work-dir", default=None, help="保留產生的測試檔 (預設用暫存資料夾，結束後刪除)")
+    parser.add_argument("--baseline", default=Benchmark_baseline, help="輸出 digest 的比對檔")
+    parser.add_argument("--save-baseline", action="store_true", help="把這次的輸出 digest 存成 baseline")
+    parser.add_argument("--no-memory", action="store_true", help="不量測記憶體峰值 (省下第二次執行)")
+    parser.add_argument("--allow-large-html", action="store_true",
+                        help=f"位置數超過 {Benchmark_html_limit} 時仍執行 VF HTML (非常慢且耗記憶體)")
+    parser.add_argument("--json", default=None, help="另存完整結果 JSON")
+    args = parser.parse_args()
+
+    print(f"{'parser':<10} {'位置數':>8} {'秒':>9} {'峰值MB':>9} {'筆數':>8} {'位置':>8}  baseline")
+    results = run_benchmark(args.locations, args.work_dir, args.seed, args.parsers,
+                            load_baseline(args.baseline), not args.no_memory, args.allow_large_html)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline, args.seed)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    failed = [item for item in results if not item["expected"] or item["baseline"] is False]
+    if failed:
+        raise SystemExit(f"{len(failed)} 項輸出與預期不符")
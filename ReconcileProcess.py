@@ -0,0 +1,259 @@
+import argparse
+import os
+from datetime import datetime
+
+from Instance import get_executable_path
+from Instance import create_or_replace_file
+from Instance import extract_location_texts_SFCS
+from PLMBOMProcess import extract_location_texts_PLM
+from TeboCADProcess import parse_Partsasc, separator, Parts_asc_name
+from HTMLparser import read_html_by_name, extract_all_component, write_list_to_csv
+from HTMLparser import build_component_index, classify_testability
+
+BOM_CAD_output = "Diff_BOM_CAD_report.txt"
+BOM_testability_output = "BOM_testability_reconcile.csv"
+
+
+def find_BOM_CAD_mismatch(BOM_locations, CAD_parts, cad_index=None):
+    """
+    比對 BOM 位置清單與 Parts.asc 零件，單次線性掃描完成。
+
+    參數:
+        BOM_locations: list of str
+            extract_location_texts_SFCS / extract_location_texts_PLM 的結果
+        CAD_parts: list of dict
+            parse_Partsasc 的結果
+        cad_index: dict, 可選
+            以零件名稱為 key 的查詢表 (例如 Board.part_index)，未傳入時自動建立
+
+    回傳:
+        dict:
+            "missing_in_cad": BOM 有但 Parts.asc 沒有的位置 (list of str)
+            "missing_in_bom": Parts.asc 有但 BOM 沒有的零件 (list of dict)
+            "matched": 兩邊都有的零件 (list of dict)
+            "duplicated": BOM 內重複出現的位置 (list of str)
+    """
+    # 以零件名稱建立 designator 索引
+    if cad_index is None:
+        cad_index = {item["Part"]: item for item in CAD_parts}
+
+    bom_set = set()
+    missing_in_cad = []
+    matched = []
+    duplicated = []
+
+    for location in BOM_locations:
+        if location in bom_set:
+            duplicated.append(location)
+            continue
+        bom_set.add(location)
+
+        item = cad_index.get(location)
+        if item is None:
+            missing_in_cad.append(location)
+        else:
+            matched.append(item)
+
+    missing_in_bom = [item for item in CAD_parts if item["Part"] not in bom_set]
+
+    return {
+        "missing_in_cad": missing_in_cad,
+        "missing_in_bom": missing_in_bom,
+        "matched": matched,
+        "duplicated": duplicated
+    }
+
+
+def count_side(item_list):
+    """回傳 (TOP 數量, Bottom 數量)"""
+    top_count = sum(1 for item in item_list if item["T/B"].upper() == "T")
+    bottom_count = sum(1 for item in item_list if item["T/B"].upper() == "B")
+    return top_count, bottom_count
+
+
+def save_BOM_CAD_notebook(result, filepath=BOM_CAD_output, label_bom="BOM", label_cad="CAD"):
+    """
+    將 find_BOM_CAD_mismatch 的結果存成筆記本文字檔
+    格式：
+    Summary (BOM 位置數 / Parts.asc 零件數 / 兩邊皆有，含 TOP/Bottom 統計)
+    [Part 1] Locations in <label_bom>, but not found in <label_cad> Parts.asc
+    [Part 2] Parts in <label_cad> Parts.asc, but not found in <label_bom>
+    [Part 3] Duplicated locations in <label_bom>
+    """
+    now = datetime.now()
+    time_str = now.strftime("%Y/%m/%d %H:%M")
+
+    matched = result["matched"]
+    missing_in_cad = result["missing_in_cad"]
+    missing_in_bom = result["missing_in_bom"]
+    duplicated = result["duplicated"]
+
+    bom_total = len(matched) + len(missing_in_cad)
+    cad_total = len(matched) + len(missing_in_bom)
+    matched_top, matched_bottom = count_side(matched)
+
+    lines = []
+    lines.append(f"       WYMTN Reconciliation Report For BOM/CAD       Time {time_str}")
+    lines.append(separator("="))
+    lines.append(f"BOM  :{label_bom}")
+    lines.append(f"CAD  :{label_cad}")
+    lines.append(f"BOM Locations  = {bom_total}")
+    lines.append(f"CAD Parts  = {cad_total}")
+    lines.append(f"Matched  = {len(matched)}   (TOP Side  = {matched_top}, Bottom Side  = {matched_bottom})")
+    lines.append(separator())
+    lines.append("")
+
+    lines.append("[Part 1] BOM Locations not placed")
+    lines.append(f"Count  = {len(missing_in_cad)}")
+    lines.append("")
+    lines.append(f"Following are in {label_bom}, but not found in {label_cad} {Parts_asc_name}")
+    for location in missing_in_cad:
+        lines.append(f"{label_bom}   {location}")
+    lines.append("")
+
+    top_count, bottom_count = count_side(missing_in_bom)
+    lines.append(separator())
+    lines.append("[Part 2] Placed Parts not in BOM")
+    lines.append(f"TOP Side  = {top_count}")
+    lines.append(f"Bottom Side  = {bottom_count}")
+    lines.append("")
+    lines.append(f"Following are in {label_cad} {Parts_asc_name}, but not found in {label_bom}")
+    for item in missing_in_bom:
+        lines.append(
+            f"{label_cad}   {item['Part']}   {item['X']:.4f}   {item['Y']:.4f}   {item['Rot']:.1f}   {item['Grid']}   ({item['T/B']})"
+        )
+    lines.append("")
+
+    if duplicated:
+        lines.append(separator())
+        lines.append("[Part 3] Duplicated BOM Locations")
+        lines.append(f"Count  = {len(duplicated)}")
+        for location in duplicated:
+            lines.append(f"{label_bom}   {location}")
+        lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"BOM/CAD 比對結果已續寫到 {filepath}")
+
+
+def load_BOM_locations(BOM_file, bom_type="SFCS"):
+    """
+    依 BOM 來源讀取位置清單
+        bom_type = "SFCS" → extract_location_texts_SFCS (.txt)
+        bom_type = "PLM"  → extract_location_texts_PLM (.xls / .xlsx)
+    """
+    if bom_type.upper() == "PLM":
+        return extract_location_texts_PLM(BOM_file)
+    return extract_location_texts_SFCS(BOM_file)
+
+
+def execute_BOM_CAD_summary(BOM_file, label_cad="CAD_new", filepath=BOM_CAD_output, bom_type="SFCS", board=None,
+                            base_dir=None):
+    """
+    board 可傳入 BoardModel.Board，直接使用其零件表與索引，不再解析 Parts.asc。
+    base_dir 為相對路徑 (BOM_file、label_cad、filepath) 的基準目錄，預設為執行檔所在目錄。
+    """
+
+    executable_dir = base_dir or get_executable_path()
+    print(f"執行檔所在目錄: {executable_dir}")
+
+    create_or_replace_file(os.path.join(executable_dir, filepath))
+
+    BOM_locations = load_BOM_locations(os.path.join(executable_dir, BOM_file), bom_type)
+    print("BOM 位置數 =", len(BOM_locations))
+
+    if board is None:
+        CAD_parts = parse_Partsasc(os.path.join(executable_dir, label_cad, Parts_asc_name))
+        cad_index = None
+    else:
+        CAD_parts = board.parts
+        cad_index = board.part_index
+    print("總筆數 =", len(CAD_parts))
+
+    result = find_BOM_CAD_mismatch(BOM_locations, CAD_parts, cad_index)
+    save_BOM_CAD_notebook(result, os.path.join(executable_dir, filepath), os.path.basename(BOM_file), label_cad)
+
+    return result
+
+
+def find_three_way_testability(PLM_locations, SFCS_locations, Comp_raw_list):
+    """
+    以元件編號為 key，合併 PLM BOM、SFCS BOM 與 VF HTML 元件表。
+
+    參數:
+        PLM_locations : list of str (extract_location_texts_PLM)
+        SFCS_locations: list of str (extract_location_texts_SFCS)
+        Comp_raw_list : list of list (extract_all_component)
+
+    回傳:
+        list of list，每筆格式為
+        [元件編號, PLM, SFCS, HTML, 腳數, 不可植針腳數, 測試狀態]
+        PLM / SFCS / HTML 欄位為 "Y" 或 "N"；
+        順序為 PLM 出現順序，其後接只存在於 SFCS 的元件。
+    """
+    plm_set = set(PLM_locations)
+    sfcs_set = set(SFCS_locations)
+    comp_index = build_component_index(Comp_raw_list)
+
+    # 保留順序去重
+    designators = list(dict.fromkeys(list(PLM_locations) + list(SFCS_locations)))
+
+    results = []
+    for designator in designators:
+        match = comp_index.get(designator)
+        if match:
+            status = classify_testability(match[5], match[3], match[4])
+            pin_count = match[3]
+            unpluggable_pins = match[4]
+        else:
+            status = "not found"
+            pin_count = "-"
+            unpluggable_pins = "-"
+
+        results.append([
+            designator,
+            "Y" if designator in plm_set else "N",
+            "Y" if designator in sfcs_set else "N",
+            "Y" if match else "N",
+            pin_count,
+            unpluggable_pins,
+            status
+        ])
+
+    return results
+
+
+def main_reconcile(PLM_file, SFCS_file, html_file, output_file=BOM_testability_output, base_dir=None):
+    """
+    一次讀入 PLM BOM、SFCS BOM 與 VF HTML，輸出三方比對及可測度 CSV。
+    base_dir 為相對路徑的基準目錄，預設為執行檔所在目錄。
+    """
+    executable_dir = base_dir or get_executable_path()
+    print(f"執行檔所在目錄: {executable_dir}")
+
+    PLM_locations = extract_location_texts_PLM(os.path.join(executable_dir, PLM_file))
+    SFCS_locations = extract_location_texts_SFCS(os.path.join(executable_dir, SFCS_file))
+
+    soup = read_html_by_name(os.path.join(executable_dir, html_file))
+    Comp_raw_list = extract_all_component(soup, start_idx=5, end_idx=10)
+
+    results = find_three_way_testability(PLM_locations, SFCS_locations, Comp_raw_list)
+
+    header = ["Location", "PLM", "SFCS", "HTML", "Pin Count", "Unpluggable Pins", "Status"]
+    write_list_to_csv([header] + results, os.path.join(executable_dir, output_file))
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PLM / SFCS BOM 與 VF HTML 可測度三方比對")
+    parser.add_argument("--plm", required=True, help="PLM BOM (.xls / .xlsx)")
+    parser.add_argument("--sfcs", required=True, help="SFCS BOM (.txt)")
+    parser.add_argument("--html", required=True, help="VF HTML 元件報告，例如 VF/1.htm")
+    parser.add_argument("--output", default=BOM_testability_output, help="輸出 CSV 檔名")
+    parser.add_argument("--base-dir", default=None, help="相對路徑的基準目錄 (預設為執行檔所在目錄)")
+    args = parser.parse_args()
+
+    main_reconcile(args.plm, args.sfcs, args.html, args.output, args.base_dir)
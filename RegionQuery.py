@@ -0,0 +1,323 @@
+import argparse
+import math
+import os
+import time
+
+from BoardModel import load_board
+from SpatialIndex import GridIndex
+from Instance import write_string_to_file
+from NetAnalysis import match_Nets
+from TeboCADProcess import (
+    Nails_shift_threshold, Parts_shift_threshold, CAD_registration, Registration_tolerance,
+    estimate_transform, is_identity_transform, apply_transform_xy, find_Nailsasc_shift, find_Nailsasc_Del, find_Nailsasc_Add,
+    find_Partsasc_changes, find_Partsasc_Del, find_Partsasc_Add,
+)
+
+Region_cell_size = 0.1  # inch，格網邊長；1 inch 見方的查詢約檢查 100 格
+Region_layers = ("parts", "pins", "nails")
+Region_output = "Region_query_report.txt"
+Pins_shift_threshold = 3  # mil
+
+
+def record_name(layer, item):
+    """各資料表的顯示名稱：Part / 零件.pin / Nail 編號"""
+    if layer == "parts":
+        return item["Part"]
+    if layer == "pins":
+        return f"{item['Part']}.{item['Pin']}"
+    return item["Nail"]
+
+
+class RegionIndex:
+    """
+    單一版本的區域查詢索引：Parts / Pins / Nails 依面別 (T/B) 各建一個 GridIndex，
+    以座標點登記 record 在 board 資料表中的位置。建立一次後可重複查詢。
+    """
+
+    def __init__(self, board, cell_size=Region_cell_size, layers=Region_layers):
+        self.board = board
+        self.indexes = {}
+        for layer in layers:
+            for i, item in enumerate(getattr(board, layer)):
+                key = (layer, item["T/B"].upper())
+                if key not in self.indexes:
+                    self.indexes[key] = GridIndex(cell_size)
+                self.indexes[key].insert(i, item["X"], item["Y"])
+
+    def selected(self, layers, side):
+        for (layer, index_side), index in self.indexes.items():
+            if layer in layers and (side is None or index_side == side.upper()):
+                yield layer, index
+
+    def query_rect(self, xmin, ymin, xmax, ymax, layers=Region_layers, side=None):
+        """回傳 dict：資料表名稱 → 落在矩形內的 record list (依名稱排序)"""
+        result = {layer: [] for layer in layers}
+        for layer, index in self.selected(layers, side):
+            records = getattr(self.board, layer)
+            result[layer].extend(records[i] for i in index.query_rect(xmin, ymin, xmax, ymax))
+        for layer, records in result.items():
+            records.sort(key=lambda item: record_name(layer, item))
+        return result
+
+    def query_radius(self, x, y, radius, layers=Region_layers, side=None):
+        """回傳 dict：資料表名稱 → 距離 (x, y) 不超過 radius 的 record list (依距離排序)"""
+        result = {layer: [] for layer in layers}
+        for layer, index in self.selected(layers, side):
+            records = getattr(self.board, layer)
+            result[layer].extend(records[i] for i in index.query_radius(x, y, radius))
+        for records in result.values():
+            records.sort(key=lambda item: math.hypot(item["X"] - x, item["Y"] - y))
+        return result
+
+
+def locate(board, name):
+    """零件名稱 (U35)、pin (U35.1) 或 nail ($12) → (X, Y, T/B)，找不到回傳 None"""
+    item = board.get_part(name) or board.get_pin(name) or board.nail_index.get(name)
+    if item is None:
+        return None
+    return item["X"], item["Y"], item["T/B"].upper()
+
+
+def find_Pins_changes(pins_new, pins_old, threshold_mil=Pins_shift_threshold, transform=None, net_map=None):
+    """
+    以 "零件.pin" 對齊新舊 pin，找出位移 (>= threshold_mil)、翻面或改接 Net 的 pin。
+    transform (由 Parts 估計的 estimate_transform) 不是 identity 時，距離以轉換後的舊座標計算，
+    舊版項目另外帶 "Reg X" / "Reg Y" (與 find_Nailsasc_shift 相同)。
+    net_map 為 NetAnalysis.match_Nets 的 {新版 Net Name: 舊版 Net Name}；提供時改名或重新編號 (NC_*)
+    的 Net 視為同一條，只有 pin 真的改接到另一條 Net 才列為 "Net"。未提供時直接比較名稱。
+    回傳 list of dict：{"Pin", "New", "Old", "Distance_mil", "Changes"}
+    """
+    if is_identity_transform(transform):
+        transform = None
+
+    old_map = {f"{pin['Part']}.{pin['Pin']}": pin for pin in pins_old}
+    change_list = []
+    for pin in pins_new:
+        key = f"{pin['Part']}.{pin['Pin']}"
+        old = old_map.get(key)
+        if old is None:
+            continue
+        if transform is not None:
+            reg_x, reg_y = apply_transform_xy(old["X"], old["Y"], transform.get(old["T/B"].upper()))
+            old = dict(old, **{"Reg X": reg_x, "Reg Y": reg_y})
+        else:
+            reg_x, reg_y = old["X"], old["Y"]
+        distance_mil = math.hypot(pin["X"] - reg_x, pin["Y"] - reg_y) * 1000.0
+        changes = []
+        if distance_mil >= threshold_mil:
+            changes.append("Shift")
+        if pin["T/B"].upper() != old["T/B"].upper():
+            changes.append("Side")
+        net_name = net_map.get(pin["Net Name"], pin["Net Name"]) if net_map is not None else pin["Net Name"]
+        if net_name != old["Net Name"]:
+            changes.append("Net")
+        if changes:
+            change_list.append({"Pin": key, "New": pin, "Old": old, "Distance_mil": distance_mil, "Changes": changes})
+    return change_list
+
+
+def diff_records(board_new, board_old, layers=Region_layers, nails_threshold=Nails_shift_threshold,
+                 parts_threshold=Parts_shift_threshold, pins_threshold=Pins_shift_threshold,
+                 register=CAD_registration, tolerance_mil=Registration_tolerance):
+    """
+    新舊版本的差異整理成統一格式的 list of dict：
+        {"Layer", "Name", "Changes", "New", "Old", "Distance_mil"}
+    Del 的 New 為 None、Add 的 Old 為 None；Parts / Nails 的判斷與 Diff_*_report 相同。
+    Pins 沒有自己的 registration，沿用由 Parts 估計的 transform；pin 的 Net 以 match_Nets 對應後再比較。
+    """
+    records = []
+
+    parts_transform = None
+    if register and ("parts" in layers or "pins" in layers):
+        parts_transform = estimate_transform(board_new.parts, board_old.parts, "Part")
+
+    if "parts" in layers:
+        for item in find_Partsasc_changes(board_new.parts, board_old.parts, parts_threshold, parts_transform):
+            records.append({"Layer": "parts", "Name": item["Part"], "Changes": item["Changes"],
+                            "New": item["New"], "Old": item["Old"], "Distance_mil": item["Distance_mil"]})
+        for item in find_Partsasc_Del(board_new.parts, board_old.parts):
+            records.append({"Layer": "parts", "Name": item["Part"], "Changes": ["Del"], "New": None, "Old": item,
+                            "Distance_mil": None})
+        for item in find_Partsasc_Add(board_new.parts, board_old.parts):
+            records.append({"Layer": "parts", "Name": item["Part"], "Changes": ["Add"], "New": item, "Old": None,
+                            "Distance_mil": None})
+
+    if "pins" in layers:
+        new_keys = set(board_new.pin_index)
+        old_keys = set(board_old.pin_index)
+        net_map = match_Nets(board_new.nets, board_old.nets)
+        for item in find_Pins_changes(board_new.pins, board_old.pins, pins_threshold, parts_transform, net_map):
+            records.append({"Layer": "pins", "Name": item["Pin"], "Changes": item["Changes"],
+                            "New": item["New"], "Old": item["Old"], "Distance_mil": item["Distance_mil"]})
+        for key in sorted(old_keys - new_keys):
+            records.append({"Layer": "pins", "Name": key, "Changes": ["Del"], "New": None,
+                            "Old": board_old.pin_index[key], "Distance_mil": None})
+        for key in sorted(new_keys - old_keys):
+            records.append({"Layer": "pins", "Name": key, "Changes": ["Add"], "New": board_new.pin_index[key],
+                            "Old": None, "Distance_mil": None})
+
+    if "nails" in layers:
+        transform = estimate_transform(board_new.nails, board_old.nails, "Net Name") if register else None
+        shift_list = find_Nailsasc_shift(board_new.nails, board_old.nails, transform, tolerance_mil)
+        for i in range(0, len(shift_list), 2):
+            new, old = shift_list[i], shift_list[i + 1]
+            old_x, old_y = old.get("Reg X", old["X"]), old.get("Reg Y", old["Y"])
+            distance_mil = math.hypot(new["X"] - old_x, new["Y"] - old_y) * 1000.0
+            changes = ["Shift"] if distance_mil > nails_threshold else []
+            if new["T/B"] != old["T/B"]:
+                changes.append("Side")
+            records.append({"Layer": "nails", "Name": new["Nail"], "Changes": changes or ["Moved"],
+                            "New": new, "Old": old, "Distance_mil": distance_mil})
+        for item in find_Nailsasc_Del(board_new.nails, board_old.nails):
+            records.append({"Layer": "nails", "Name": item["Nail"], "Changes": ["Del"], "New": None, "Old": item,
+                            "Distance_mil": None})
+        for item in find_Nailsasc_Add(board_new.nails, board_old.nails):
+            records.append({"Layer": "nails", "Name": item["Nail"], "Changes": ["Add"], "New": item, "Old": None,
+                            "Distance_mil": None})
+
+    return records
+
+
+class RegionDiff:
+    """
+    新舊版本差異的區域查詢索引：每筆差異以新、舊兩個位置各登記一次 (id 為 2k / 2k+1)，
+    移入或移出查詢區域的項目都會被找到。差異在建立時計算一次。
+    """
+
+    def __init__(self, board_new, board_old, cell_size=Region_cell_size, layers=Region_layers, **diff_options):
+        self.records = diff_records(board_new, board_old, layers, **diff_options)
+        self.layers = layers
+        self.indexes = {}
+        for k, record in enumerate(self.records):
+            for offset, item in ((0, record["New"]), (1, record["Old"])):
+                if item is None:
+                    continue
+                key = (record["Layer"], item["T/B"].upper())
+                if key not in self.indexes:
+                    self.indexes[key] = GridIndex(cell_size)
+                self.indexes[key].insert(2 * k + offset, item["X"], item["Y"])
+
+    def collect(self, ids, layers):
+        found = sorted({item_id // 2 for item_id in ids})
+        result = {layer: [] for layer in layers}
+        for k in found:
+            record = self.records[k]
+            if record["Layer"] in result:
+                result[record["Layer"]].append(record)
+        return result
+
+    def selected(self, layers, side):
+        for (layer, index_side), index in self.indexes.items():
+            if layer in layers and (side is None or index_side == side.upper()):
+                yield index
+
+    def query_rect(self, xmin, ymin, xmax, ymax, layers=Region_layers, side=None):
+        """回傳 dict：資料表名稱 → 新或舊位置落在矩形內的差異 list"""
+        ids = []
+        for index in self.selected(layers, side):
+            ids.extend(index.query_rect(xmin, ymin, xmax, ymax))
+        return self.collect(ids, layers)
+
+    def query_radius(self, x, y, radius, layers=Region_layers, side=None):
+        """回傳 dict：資料表名稱 → 新或舊位置距離 (x, y) 不超過 radius 的差異 list"""
+        ids = []
+        for index in self.selected(layers, side):
+            ids.extend(index.query_radius(x, y, radius))
+        return self.collect(ids, layers)
+
+
+def format_position(item):
+    if item is None:
+        return "-"
+    return f"{item['X']:.4f}   {item['Y']:.4f}   ({item['T/B']})"
+
+
+def format_region_lines(result, label, region_text, diff=False):
+    """
+    查詢結果的文字格式：
+    Region : <區域>   (<label>)
+    [parts] = N
+    <名稱>   X   Y   (T/B)                                  (單一版本)
+    <名稱>   Changes   New: X Y (T/B)   Old: X Y (T/B)   Distance = d mil   (差異)
+    """
+    lines = [f"Region : {region_text}   ({label})"]
+    for layer, records in result.items():
+        lines.append(f"[{layer}] = {len(records)}")
+        for item in records:
+            if not diff:
+                lines.append(f"{record_name(layer, item)}   {format_position(item)}")
+                continue
+            line = (f"{item['Name']}   {', '.join(item['Changes'])}   New: {format_position(item['New'])}"
+                    f"   Old: {format_position(item['Old'])}")
+            if item["Distance_mil"] is not None:
+                line += f"   Distance = {item['Distance_mil']:.1f} mil"
+            lines.append(line)
+        lines.append("")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="以矩形或半徑查詢單一版本 (或新舊版本差異) 在板上某區域的 Parts / Pins / Nails")
+    parser.add_argument("new", help="CAD 資料夾 (指定 --old 時為新版)")
+    parser.add_argument("--old", help="舊版 CAD 資料夾；指定時查詢兩版本的差異")
+    parser.add_argument("--rect", type=float, nargs=4, metavar=("XMIN", "YMIN", "XMAX", "YMAX"), help="矩形 (inch)")
+    parser.add_argument("--radius", type=float, help="半徑 (inch)，搭配 --center 或 --near")
+    parser.add_argument("--center", type=float, nargs=2, metavar=("X", "Y"), help="圓心 (inch)")
+    parser.add_argument("--near", help="以零件 / pin / nail 的位置為圓心，例如 U35、U35.1、$12 (預設只查該面)")
+    parser.add_argument("--side", choices=["T", "B"], help="只查詢 Top / Bottom 面")
+    parser.add_argument("--layers", nargs="+", choices=list(Region_layers), default=list(Region_layers))
+    parser.add_argument("--cell", type=float, default=Region_cell_size, help="格網邊長 (inch)")
+    parser.add_argument("--threshold", type=float, default=Parts_shift_threshold, help="Parts / Pins 位移門檻 (mil)")
+    parser.add_argument("--nails-threshold", type=float, default=Nails_shift_threshold, help="Nails 位移門檻 (mil)")
+    parser.add_argument("--no-register", action="store_true", help="差異比對時不做 registration")
+    parser.add_argument("--output", nargs="?", const=Region_output, help=f"另將結果寫到文字檔 (未給檔名時為 {Region_output})")
+    args = parser.parse_args()
+
+    if args.rect is None and args.radius is None:
+        parser.error("需指定 --rect 或 --radius")
+    if args.radius is not None and args.center is None and args.near is None:
+        parser.error("--radius 需搭配 --center 或 --near")
+    for folder in (args.new, args.old):
+        if folder and not os.path.isdir(folder):
+            raise SystemExit(f"Error: cad folder '{folder}' not found.")
+
+    board_new = load_board(args.new)
+    board_old = load_board(args.old) if args.old else None
+
+    side = args.side
+    center = args.center
+    if args.near:
+        found = locate(board_new, args.near) or (locate(board_old, args.near) if board_old else None)
+        if found is None:
+            raise SystemExit(f"Error: '{args.near}' not found.")
+        center = found[:2]
+        side = side or found[2]
+
+    start = time.perf_counter()
+    if board_old is None:
+        index = RegionIndex(board_new, args.cell, args.layers)
+        label = board_new.label
+    else:
+        index = RegionDiff(board_new, board_old, args.cell, args.layers, nails_threshold=args.nails_threshold,
+                           parts_threshold=args.threshold, pins_threshold=args.threshold,
+                           register=not args.no_register)
+        label = f"{board_new.label} vs {board_old.label}"
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if args.rect:
+        result = index.query_rect(*args.rect, layers=args.layers, side=side)
+        region_text = "rect ({:.4f}, {:.4f}) - ({:.4f}, {:.4f})".format(*args.rect)
+    else:
+        result = index.query_radius(center[0], center[1], args.radius, layers=args.layers, side=side)
+        region_text = f"radius {args.radius:.4f} inch around ({center[0]:.4f}, {center[1]:.4f})"
+    query_us = (time.perf_counter() - start) * 1e6
+    if side:
+        region_text += f"   Side = {side}"
+
+    lines = format_region_lines(result, label, region_text, diff=board_old is not None)
+    print("\n".join(lines))
+    print(f"索引建立 {build_seconds:.3f} 秒，查詢 {query_us:.0f} µs")
+
+    if args.output:
+        write_string_to_file("\n".join(lines), args.output, mode="w")
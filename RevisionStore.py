@@ -0,0 +1,460 @@
+import argparse
+import math
+import os
+import sqlite3
+from datetime import datetime
+
+from Instance import get_executable_path
+from Instance import create_or_replace_file
+from Instance import extract_location_texts_SFCS
+from BoardModel import load_board
+from HTMLparser import read_html_by_name, extract_all_component
+from TeboCADProcess import (
+    Nails_asc_output, Parts_asc_output, Nails_shift_threshold, Parts_shift_threshold,
+    CAD_registration, Registration_tolerance, estimate_transform, is_identity_transform,
+    find_Nailsasc_shift, find_Partsasc_changes,
+    save_Nails_summary_notebook, save_Nails_shift_notebook, save_Nails_del_notebook, save_Nails_add_notebook,
+    save_Parts_summary_notebook, save_Parts_shift_notebook, save_Parts_del_notebook, save_Parts_add_notebook,
+    save_Parts_swap_notebook, classify_Parts_change, filter_Parts_shift, filter_Parts_swap,
+)
+
+store_file_name = "CAD_revisions.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS revisions (
+    id      INTEGER PRIMARY KEY,
+    label   TEXT UNIQUE NOT NULL,
+    folder  TEXT,
+    created TEXT
+);
+CREATE TABLE IF NOT EXISTS parts (
+    rev_id INTEGER NOT NULL, part TEXT NOT NULL,
+    x REAL, y REAL, rot REAL, grid TEXT, tb TEXT, device TEXT, outline TEXT
+);
+CREATE TABLE IF NOT EXISTS pins (
+    rev_id INTEGER NOT NULL, part TEXT NOT NULL, pin TEXT, name TEXT,
+    x REAL, y REAL, layer TEXT, net_name TEXT, nails TEXT, tb TEXT
+);
+CREATE TABLE IF NOT EXISTS nets (
+    rev_id INTEGER NOT NULL, net TEXT, type TEXT, net_name TEXT NOT NULL, pin_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS nails (
+    rev_id INTEGER NOT NULL, nail TEXT NOT NULL,
+    x REAL, y REAL, tb TEXT, net_name TEXT
+);
+CREATE TABLE IF NOT EXISTS boms (
+    id INTEGER PRIMARY KEY, label TEXT UNIQUE NOT NULL, source TEXT, created TEXT
+);
+CREATE TABLE IF NOT EXISTS bom_locations (
+    bom_id INTEGER NOT NULL, location TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS coverages (
+    id INTEGER PRIMARY KEY, label TEXT UNIQUE NOT NULL, source TEXT, created TEXT
+);
+CREATE TABLE IF NOT EXISTS coverage_rows (
+    cov_id INTEGER NOT NULL, designator TEXT NOT NULL,
+    pin_count TEXT, unpluggable TEXT, percent TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_parts_rev_part ON parts (rev_id, part);
+CREATE INDEX IF NOT EXISTS idx_parts_part ON parts (part, rev_id);
+CREATE INDEX IF NOT EXISTS idx_pins_rev_part ON pins (rev_id, part);
+CREATE INDEX IF NOT EXISTS idx_pins_rev_net ON pins (rev_id, net_name);
+CREATE INDEX IF NOT EXISTS idx_nets_rev_name ON nets (rev_id, net_name);
+CREATE INDEX IF NOT EXISTS idx_nails_rev_net ON nails (rev_id, net_name);
+CREATE INDEX IF NOT EXISTS idx_nails_nail ON nails (nail, rev_id);
+CREATE INDEX IF NOT EXISTS idx_bom_locations ON bom_locations (bom_id, location);
+CREATE INDEX IF NOT EXISTS idx_coverage_rows ON coverage_rows (cov_id, designator);
+"""
+
+
+def open_store(db_path=store_file_name):
+    """開啟 (或建立) SQLite 版本資料庫，並確保資料表與索引存在。"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_revision_id(conn, label):
+    row = conn.execute("SELECT id FROM revisions WHERE label = ?", (label,)).fetchone()
+    if row is None:
+        raise KeyError(f"資料庫中沒有版本 {label}")
+    return row["id"]
+
+
+def list_revisions(conn):
+    """依匯入順序回傳所有版本名稱"""
+    return [row["label"] for row in conn.execute("SELECT label FROM revisions ORDER BY id")]
+
+
+def delete_revision(conn, label):
+    row = conn.execute("SELECT id FROM revisions WHERE label = ?", (label,)).fetchone()
+    if row is None:
+        return
+    rev_id = row["id"]
+    for table in ("parts", "pins", "nets", "nails"):
+        conn.execute(f"DELETE FROM {table} WHERE rev_id = ?", (rev_id,))
+    conn.execute("DELETE FROM revisions WHERE id = ?", (rev_id,))
+
+
+def ingest_board(conn, board, folder=None):
+    """
+    將 BoardModel.Board 整批寫入資料庫 (同名版本會先刪除再寫入)。
+    回傳該版本的 rev_id。
+    """
+    created = datetime.now().strftime("%Y/%m/%d %H:%M")
+    with conn:
+        delete_revision(conn, board.label)
+        rev_id = conn.execute(
+            "INSERT INTO revisions (label, folder, created) VALUES (?, ?, ?)",
+            (board.label, folder, created)
+        ).lastrowid
+
+        conn.executemany(
+            "INSERT INTO parts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((rev_id, p["Part"], p["X"], p["Y"], p["Rot"], p["Grid"], p["T/B"], p.get("Device", ""), p.get("Outline", ""))
+             for p in board.parts)
+        )
+        conn.executemany(
+            "INSERT INTO pins VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((rev_id, p["Part"], p["Pin"], p["Name"], p["X"], p["Y"], p["Layer"], p["Net Name"],
+              " ".join(p["Nails"]), p["T/B"]) for p in board.pins)
+        )
+        conn.executemany(
+            "INSERT INTO nets VALUES (?, ?, ?, ?, ?)",
+            ((rev_id, n["Net"], n["Type"], n["Net Name"], len(n["Pins"])) for n in board.nets)
+        )
+        conn.executemany(
+            "INSERT INTO nails VALUES (?, ?, ?, ?, ?, ?)",
+            ((rev_id, n["Nail"], n["X"], n["Y"], n["T/B"], n["Net Name"]) for n in board.nails)
+        )
+
+    print(f"版本 {board.label} 已匯入 (parts={len(board.parts)}, pins={len(board.pins)}, "
+          f"nets={len(board.nets)}, nails={len(board.nails)})")
+    return rev_id
+
+
+def ingest_revision(conn, folder, label=None):
+    """解析 CAD 資料夾並匯入資料庫"""
+    board = load_board(folder, label)
+    return ingest_board(conn, board, os.path.abspath(folder))
+
+
+def ingest_bom(conn, label, locations, source=None):
+    """匯入 BOM 位置清單 (extract_location_texts_SFCS / extract_location_texts_PLM 的結果)"""
+    created = datetime.now().strftime("%Y/%m/%d %H:%M")
+    with conn:
+        row = conn.execute("SELECT id FROM boms WHERE label = ?", (label,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM bom_locations WHERE bom_id = ?", (row["id"],))
+            conn.execute("DELETE FROM boms WHERE id = ?", (row["id"],))
+        bom_id = conn.execute(
+            "INSERT INTO boms (label, source, created) VALUES (?, ?, ?)", (label, source, created)
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO bom_locations VALUES (?, ?)", ((bom_id, location) for location in locations)
+        )
+    print(f"BOM {label} 已匯入 ({len(locations)} 個位置)")
+    return bom_id
+
+
+def ingest_coverage(conn, label, Comp_raw_list, source=None):
+    """匯入 VF HTML 元件可測度表 (extract_all_component 的結果)"""
+    created = datetime.now().strftime("%Y/%m/%d %H:%M")
+    rows = [item for item in Comp_raw_list if len(item) > 5]
+    with conn:
+        row = conn.execute("SELECT id FROM coverages WHERE label = ?", (label,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM coverage_rows WHERE cov_id = ?", (row["id"],))
+            conn.execute("DELETE FROM coverages WHERE id = ?", (row["id"],))
+        cov_id = conn.execute(
+            "INSERT INTO coverages (label, source, created) VALUES (?, ?, ?)", (label, source, created)
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO coverage_rows VALUES (?, ?, ?, ?, ?)",
+            ((cov_id, item[0], item[3], item[4], item[5]) for item in rows)
+        )
+    print(f"Coverage {label} 已匯入 ({len(rows)} 筆)")
+    return cov_id
+
+
+def query_part_history(conn, part):
+    """回傳零件在各版本的位置 (依匯入順序)"""
+    return [dict(row) for row in conn.execute(
+        """SELECT r.label, p.x, p.y, p.rot, p.grid, p.tb
+           FROM parts p JOIN revisions r ON r.id = p.rev_id
+           WHERE p.part = ? ORDER BY r.id""",
+        (part,)
+    )]
+
+
+def query_part_moves(conn, part, threshold_mil=Parts_shift_threshold):
+    """
+    回傳零件相對前一個「有此零件的版本」移動、旋轉或換面的版本。
+    每筆包含 label / prev_label / 新舊座標 / Distance_mil。
+    """
+    moves = []
+    previous = None
+    for item in query_part_history(conn, part):
+        if previous is not None:
+            dist_mil = math.hypot(item["x"] - previous["x"], item["y"] - previous["y"]) * 1000.0
+            if (dist_mil >= threshold_mil or abs(item["rot"] - previous["rot"]) > 0.0001
+                    or item["tb"] != previous["tb"]):
+                moves.append({
+                    "label": item["label"],
+                    "prev_label": previous["label"],
+                    "New": item,
+                    "Old": previous,
+                    "Distance_mil": dist_mil
+                })
+        previous = item
+    return moves
+
+
+def query_nail_history(conn, nail):
+    """回傳 nail (例如 "$86") 在各版本的位置與 Net Name"""
+    return [dict(row) for row in conn.execute(
+        """SELECT r.label, n.x, n.y, n.tb, n.net_name
+           FROM nails n JOIN revisions r ON r.id = n.rev_id
+           WHERE n.nail = ? ORDER BY r.id""",
+        (nail,)
+    )]
+
+
+def query_net_history(conn, net_name):
+    """回傳 Net 在各版本的 pin 數與 nail 數"""
+    return [dict(row) for row in conn.execute(
+        """SELECT r.label, n.pin_count,
+                  (SELECT COUNT(*) FROM nails a WHERE a.rev_id = n.rev_id AND a.net_name = n.net_name) AS nail_count
+           FROM nets n JOIN revisions r ON r.id = n.rev_id
+           WHERE n.net_name = ? ORDER BY r.id""",
+        (net_name,)
+    )]
+
+
+def nail_row_to_dict(row):
+    return {"Nail": row["nail"], "X": row["x"], "Y": row["y"], "T/B": row["tb"], "Net Name": row["net_name"]}
+
+
+def part_row_to_dict(row, prefix=""):
+    return {"Part": row["part"], "X": row[prefix + "x"], "Y": row[prefix + "y"], "Rot": row[prefix + "rot"],
+            "Grid": row[prefix + "grid"], "T/B": row[prefix + "tb"],
+            "Device": row[prefix + "device"] or "", "Outline": row[prefix + "outline"] or ""}
+
+
+def load_store_nails(conn, label):
+    rows = conn.execute("SELECT * FROM nails WHERE rev_id = ? ORDER BY rowid", (get_revision_id(conn, label),))
+    return [nail_row_to_dict(row) for row in rows]
+
+
+def load_store_parts(conn, label):
+    rows = conn.execute("SELECT * FROM parts WHERE rev_id = ? ORDER BY rowid", (get_revision_id(conn, label),))
+    return [part_row_to_dict(row) for row in rows]
+
+
+def diff_nails_in_store(conn, label_new, label_old, transform=None, tolerance_mil=Registration_tolerance):
+    """
+    以索引查詢比對兩個已匯入版本的 Nails，以 Net Name 為 key。
+    回傳 (shift_list, del_list, add_list)，格式與 find_Nailsasc_shift / Del / Add 相同。
+    同一 Net 有多支 nail 時以最後一支為準，與 find_Nailsasc_shift 的查詢表一致。
+    transform (estimate_transform) 不是 identity 時，Shift 改以 find_Nailsasc_shift 比較轉換後的座標
+    (SQL 條件只能比較原始座標)；Del / Add 不受 registration 影響。
+    """
+    rev_new = get_revision_id(conn, label_new)
+    rev_old = get_revision_id(conn, label_old)
+
+    if transform is not None and not is_identity_transform(transform, tolerance_mil):
+        shift_list = find_Nailsasc_shift(load_store_nails(conn, label_new), load_store_nails(conn, label_old),
+                                         transform, tolerance_mil)
+    else:
+        shift_list = diff_nails_shift_sql(conn, rev_new, rev_old)
+
+    only_in = """SELECT * FROM nails a WHERE a.rev_id = ?
+                 AND NOT EXISTS (SELECT 1 FROM nails b WHERE b.rev_id = ? AND b.net_name = a.net_name)
+                 ORDER BY a.rowid"""
+    del_list = [nail_row_to_dict(row) for row in conn.execute(only_in, (rev_old, rev_new))]
+    add_list = [nail_row_to_dict(row) for row in conn.execute(only_in, (rev_new, rev_old))]
+
+    return shift_list, del_list, add_list
+
+
+def diff_nails_shift_sql(conn, rev_new, rev_old):
+    """原始座標不同的 nail (新舊交錯的 list)，只走索引查詢"""
+    shift_list = []
+    for row in conn.execute(
+        """WITH n AS (SELECT rowid AS rid, * FROM nails WHERE rowid IN
+                        (SELECT MAX(rowid) FROM nails WHERE rev_id = ? GROUP BY net_name)),
+                o AS (SELECT rowid AS rid, * FROM nails WHERE rowid IN
+                        (SELECT MAX(rowid) FROM nails WHERE rev_id = ? GROUP BY net_name))
+           SELECT n.nail AS n_nail, n.x AS n_x, n.y AS n_y, n.tb AS n_tb,
+                  o.nail AS o_nail, o.x AS o_x, o.y AS o_y, o.tb AS o_tb, n.net_name
+           FROM n JOIN o ON o.net_name = n.net_name
+           WHERE n.x != o.x OR n.y != o.y OR n.tb != o.tb
+           ORDER BY n.rid""",
+        (rev_new, rev_old)
+    ):
+        shift_list.append({"Nail": row["n_nail"], "X": row["n_x"], "Y": row["n_y"], "T/B": row["n_tb"], "Net Name": row["net_name"]})
+        shift_list.append({"Nail": row["o_nail"], "X": row["o_x"], "Y": row["o_y"], "T/B": row["o_tb"], "Net Name": row["net_name"]})
+    return shift_list
+
+
+def diff_parts_in_store(conn, label_new, label_old, threshold_mil=Parts_shift_threshold, transform=None):
+    """
+    以索引查詢比對兩個已匯入版本的 Parts。
+    回傳 (shift_list, del_list, add_list, swap_list)，
+    格式與 find_Partsasc_shift / Del / Add 及 filter_Parts_swap 相同。
+    transform 不是 identity 時，變更改以 find_Partsasc_changes 比較轉換後的座標。
+    """
+    rev_new = get_revision_id(conn, label_new)
+    rev_old = get_revision_id(conn, label_old)
+
+    if transform is not None and not is_identity_transform(transform):
+        change_list = find_Partsasc_changes(load_store_parts(conn, label_new), load_store_parts(conn, label_old),
+                                            threshold_mil, transform)
+    else:
+        change_list = diff_parts_changes_sql(conn, rev_new, rev_old, threshold_mil)
+
+    only_in = """SELECT * FROM parts a WHERE a.rev_id = ?
+                 AND NOT EXISTS (SELECT 1 FROM parts b WHERE b.rev_id = ? AND b.part = a.part)
+                 ORDER BY a.rowid"""
+    del_list = [part_row_to_dict(row) for row in conn.execute(only_in, (rev_old, rev_new))]
+    add_list = [part_row_to_dict(row) for row in conn.execute(only_in, (rev_new, rev_old))]
+
+    return filter_Parts_shift(change_list), del_list, add_list, filter_Parts_swap(change_list)
+
+
+def diff_parts_changes_sql(conn, rev_new, rev_old, threshold_mil):
+    """原始座標下有變更的 Part (find_Partsasc_changes 格式)，只走索引查詢"""
+    threshold_inch = threshold_mil / 1000.0
+    change_list = []
+    for row in conn.execute(
+        """SELECT n.part, n.x AS n_x, n.y AS n_y, n.rot AS n_rot, n.grid AS n_grid, n.tb AS n_tb,
+                  n.device AS n_device, n.outline AS n_outline,
+                  o.x AS o_x, o.y AS o_y, o.rot AS o_rot, o.grid AS o_grid, o.tb AS o_tb,
+                  o.device AS o_device, o.outline AS o_outline
+           FROM parts n JOIN parts o ON o.rev_id = ? AND o.part = n.part
+           WHERE n.rev_id = ?
+             AND ((n.x - o.x) * (n.x - o.x) + (n.y - o.y) * (n.y - o.y) >= ? OR ABS(n.rot - o.rot) > 0.0001
+                  OR n.tb <> o.tb OR n.device IS NOT o.device OR n.outline IS NOT o.outline)
+           ORDER BY n.rowid""",
+        (rev_old, rev_new, threshold_inch * threshold_inch)
+    ):
+        new_item = part_row_to_dict(row, "n_")
+        old_item = part_row_to_dict(row, "o_")
+        dist_inch = math.hypot(new_item["X"] - old_item["X"], new_item["Y"] - old_item["Y"])
+        rot_diff = abs(new_item["Rot"] - old_item["Rot"])
+        change_list.append({
+            "Part": row["part"],
+            "New": new_item,
+            "Old": old_item,
+            "Distance_inch": dist_inch,
+            "Distance_mil": dist_inch * 1000.0,
+            "Rot_diff": rot_diff,
+            "Changes": classify_Parts_change(new_item, old_item, dist_inch * 1000.0, rot_diff, threshold_mil)
+        })
+    return change_list
+
+
+def execute_store_diff(conn, label_new, label_old, nails_output=Nails_asc_output, parts_output=Parts_asc_output,
+                       register=CAD_registration, tolerance_mil=Registration_tolerance,
+                       nails_threshold=Nails_shift_threshold, threshold_mil=Parts_shift_threshold, base_dir=None):
+    """
+    從資料庫比對兩個版本，輸出與 execute_Nails_summary / execute_Parts_summary 相同格式的報告，
+    不需要再讀取原始 .asc 檔。register = True 時以相同的 estimate_transform 做 registration。
+    nails_threshold / threshold_mil 為 Nails / Parts 位移門檻 (mil)，
+    base_dir 為相對輸出路徑的基準目錄，預設為執行檔所在目錄。
+    """
+    executable_dir = base_dir or get_executable_path()
+    print(f"執行檔所在目錄: {executable_dir}")
+
+    nails_output = os.path.join(executable_dir, nails_output)
+    parts_output = os.path.join(executable_dir, parts_output)
+
+    transform = None
+    if register:
+        transform = estimate_transform(load_store_nails(conn, label_new), load_store_nails(conn, label_old), "Net Name")
+    create_or_replace_file(nails_output)
+    save_Nails_summary_notebook(nails_output, label_new, label_old, transform)
+    shift_list, del_list, add_list = diff_nails_in_store(conn, label_new, label_old, transform, tolerance_mil)
+    save_Nails_shift_notebook(shift_list, nails_output, nails_threshold, label_new, label_old)
+    save_Nails_del_notebook(del_list, nails_output, label_new, label_old)
+    save_Nails_add_notebook(add_list, nails_output, label_new, label_old)
+
+    transform = None
+    if register:
+        transform = estimate_transform(load_store_parts(conn, label_new), load_store_parts(conn, label_old), "Part")
+    create_or_replace_file(parts_output)
+    save_Parts_summary_notebook(parts_output, label_new, label_old, transform)
+    shift_list, del_list, add_list, swap_list = diff_parts_in_store(conn, label_new, label_old, threshold_mil,
+                                                                    transform)
+    save_Parts_shift_notebook(shift_list, parts_output, label_new, label_old)
+    save_Parts_del_notebook(del_list, parts_output, label_new, label_old)
+    save_Parts_add_notebook(add_list, parts_output, label_new, label_old)
+    save_Parts_swap_notebook(swap_list, parts_output, label_new, label_old)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CAD 版本資料庫 (SQLite)")
+    parser.add_argument("--db", default=os.path.join(get_executable_path(), store_file_name), help="資料庫路徑")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="匯入 CAD 資料夾")
+    p.add_argument("folders", nargs="+")
+
+    p = sub.add_parser("ingest-bom", help="匯入 SFCS BOM")
+    p.add_argument("bom_file")
+
+    p = sub.add_parser("ingest-html", help="匯入 VF HTML 元件可測度表")
+    p.add_argument("html_file")
+
+    sub.add_parser("list", help="列出已匯入版本")
+
+    p = sub.add_parser("part", help="零件移動歷史")
+    p.add_argument("part")
+
+    p = sub.add_parser("nail", help="nail 歷史")
+    p.add_argument("nail")
+
+    p = sub.add_parser("net", help="Net 歷史")
+    p.add_argument("net_name")
+
+    p = sub.add_parser("diff", help="比對兩個已匯入版本")
+    p.add_argument("label_new")
+    p.add_argument("label_old")
+    p.add_argument("--no-register", action="store_true", help="不做整體平移/旋轉 registration")
+    p.add_argument("--nails-threshold", type=float, default=Nails_shift_threshold, help="Nails 位移門檻 (mil)")
+    p.add_argument("--threshold", type=float, default=Parts_shift_threshold, help="Parts 位移門檻 (mil)")
+    p.add_argument("--base-dir", default=None, help="報告檔相對路徑的基準目錄 (預設為執行檔所在目錄)")
+
+    args = parser.parse_args()
+    conn = open_store(args.db)
+
+    if args.command == "ingest":
+        for folder in args.folders:
+            ingest_revision(conn, folder)
+    elif args.command == "ingest-bom":
+        ingest_bom(conn, os.path.basename(args.bom_file), extract_location_texts_SFCS(args.bom_file), args.bom_file)
+    elif args.command == "ingest-html":
+        soup = read_html_by_name(args.html_file)
+        ingest_coverage(conn, os.path.basename(args.html_file), extract_all_component(soup, start_idx=5, end_idx=10), args.html_file)
+    elif args.command == "list":
+        for label in list_revisions(conn):
+            print(label)
+    elif args.command == "part":
+        for move in query_part_moves(conn, args.part):
+            new, old = move["New"], move["Old"]
+            print(f"{move['prev_label']} -> {move['label']}   "
+                  f"({old['x']:.4f}, {old['y']:.4f}, {old['rot']:.1f}, {old['tb']}) -> "
+                  f"({new['x']:.4f}, {new['y']:.4f}, {new['rot']:.1f}, {new['tb']})   {move['Distance_mil']:.1f} mil")
+    elif args.command == "nail":
+        for item in query_nail_history(conn, args.nail):
+            print(f"{item['label']}   {item['x']:.4f}   {item['y']:.4f}   ({item['tb']})   {item['net_name']}")
+    elif args.command == "net":
+        for item in query_net_history(conn, args.net_name):
+            print(f"{item['label']}   pins = {item['pin_count']}   nails = {item['nail_count']}")
+    elif args.command == "diff":
+        execute_store_diff(conn, args.label_new, args.label_old, register=not args.no_register,
+                           nails_threshold=args.nails_threshold, threshold_mil=args.threshold, base_dir=args.base_dir)
+
+    conn.close()
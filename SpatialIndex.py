@@ -0,0 +1,112 @@
+import math
+
+
+class GridIndex:
+    """
+    均勻格網空間索引。
+    每個項目以 bounding box 登記到所有重疊的格子；點資料的 bounding box 為單點。
+    查詢只檢查矩形涵蓋的格子，平均為 O(1 + 命中數)。
+    """
+
+    def __init__(self, cell_size):
+        if cell_size <= 0:
+            raise ValueError("cell_size 必須大於 0")
+        self.cell_size = float(cell_size)
+        self.cells = {}
+        self.boxes = {}
+
+    def cell_of(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, item_id, xmin, ymin, xmax=None, ymax=None):
+        if xmax is None:
+            xmax = xmin
+        if ymax is None:
+            ymax = ymin
+        self.boxes[item_id] = (xmin, ymin, xmax, ymax)
+        cx0, cy0 = self.cell_of(xmin, ymin)
+        cx1, cy1 = self.cell_of(xmax, ymax)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells.setdefault((cx, cy), []).append(item_id)
+
+    def candidates(self, xmin, ymin, xmax, ymax):
+        """回傳 bounding box 與查詢矩形所在格子重疊的項目 (可能包含不相交者)"""
+        found = set()
+        cx0, cy0 = self.cell_of(xmin, ymin)
+        cx1, cy1 = self.cell_of(xmax, ymax)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                found.update(self.cells.get((cx, cy), ()))
+        return found
+
+    def query_rect(self, xmin, ymin, xmax, ymax):
+        """回傳 bounding box 與查詢矩形相交的項目"""
+        result = []
+        for item_id in self.candidates(xmin, ymin, xmax, ymax):
+            bxmin, bymin, bxmax, bymax = self.boxes[item_id]
+            if bxmin <= xmax and bxmax >= xmin and bymin <= ymax and bymax >= ymin:
+                result.append(item_id)
+        return result
+
+    def query_radius(self, x, y, radius):
+        """回傳 bounding box 與圓 (x, y, radius) 距離 <= radius 的項目，依距離排序"""
+        result = []
+        for item_id in self.candidates(x - radius, y - radius, x + radius, y + radius):
+            distance = box_distance(self.boxes[item_id], x, y)
+            if distance <= radius:
+                result.append((distance, item_id))
+        result.sort(key=lambda item: item[0])
+        return [item_id for _, item_id in result]
+
+
+def box_distance(box, x, y):
+    """點 (x, y) 到矩形 box = (xmin, ymin, xmax, ymax) 的距離，點在矩形內為 0"""
+    xmin, ymin, xmax, ymax = box
+    dx = max(xmin - x, 0.0, x - xmax)
+    dy = max(ymin - y, 0.0, y - ymax)
+    return math.hypot(dx, dy)
+
+
+def find_close_pairs(points, radius):
+    """
+    找出距離 < radius 的所有點對。
+    以 radius 為格子邊長，每個點只需檢查自己與相鄰的格子；
+    只往「右方/上方」四個鄰格比對，避免重複。
+
+    參數:
+        points: list of (x, y)
+    回傳:
+        list of (i, j, distance)，i < j
+    """
+    cell_size = float(radius)
+    cells = {}
+    for i, (x, y) in enumerate(points):
+        cells.setdefault((math.floor(x / cell_size), math.floor(y / cell_size)), []).append(i)
+
+    pairs = []
+    forward = ((1, -1), (1, 0), (1, 1), (0, 1))
+    for (cx, cy), members in cells.items():
+        # 同一格內
+        for a in range(len(members)):
+            i = members[a]
+            xi, yi = points[i]
+            for b in range(a + 1, len(members)):
+                j = members[b]
+                distance = math.hypot(xi - points[j][0], yi - points[j][1])
+                if distance < radius:
+                    pairs.append((min(i, j), max(i, j), distance))
+        # 相鄰格
+        for dx, dy in forward:
+            neighbors = cells.get((cx + dx, cy + dy))
+            if not neighbors:
+                continue
+            for i in members:
+                xi, yi = points[i]
+                for j in neighbors:
+                    distance = math.hypot(xi - points[j][0], yi - points[j][1])
+                    if distance < radius:
+                        pairs.append((min(i, j), max(i, j), distance))
+
+    pairs.sort()
+    return pairs
@@ -0,0 +1,246 @@
+import argparse
+import os
+import random
+
+from openpyxl import Workbook
+
+Synthetic_seed = 2024
+Synthetic_locations = 10000
+Synthetic_output_dir = "Synthetic"
+
+# 位置前綴 → 權重、腳數範圍；比例參考 VF/1.htm 與 SFCS BOM
+Designator_profile = {
+    "R": (40, (2, 2)),
+    "C": (34, (2, 2)),
+    "U": (6, (5, 400)),
+    "L": (3, (2, 2)),
+    "D": (4, (2, 3)),
+    "Q": (4, (3, 8)),
+    "J": (2, (4, 120)),
+    "PR": (3, (2, 2)),
+    "PC": (2, (2, 2)),
+    "H": (1, (1, 1)),
+    "TP": (1, (1, 1)),
+}
+
+# VF HTML 第 5~10 個表格 (extract_all_component 讀取的範圍) 依腳數分類
+VF_component_tables = (
+    ("Parts with 40 or more pins", 40, None),
+    ("Parts with 10-39 pins", 10, 39),
+    ("Parts with 5-9 pins", 5, 9),
+    ("Parts with 3-4 pins", 3, 4),
+    ("2-Pin Parts", 2, 2),
+    ("1-Pin Parts", 1, 1),
+)
+VF_component_header = ("Name", "SMD/DIP", "Top/Bottom", "腳數", "不可植針腳數", "植針率",
+                       "不可植針腳（備註：有'（'標記的腳為獨立腳）")
+VF_cell = "<td align={align}  style='border:solid #339966 1.0pt'><FONT size=1>{text}</FONT></td>"
+
+SFCS_locations_per_line = 13
+Agile_header = ("Level", "Part Number", "Part Classification", "Description", "BOM.Qty", "BOM.Location")
+Xls_max_rows = 65536  # .xls (BIFF8) 每個工作表的列數上限
+
+
+def make_locations(count, rng):
+    """依 Designator_profile 的比例產生 count 個不重複的位置，回傳 list of (位置, 腳數)"""
+    prefixes = list(Designator_profile)
+    weights = [Designator_profile[prefix][0] for prefix in prefixes]
+    counters = dict.fromkeys(prefixes, 0)
+
+    locations = []
+    for prefix in rng.choices(prefixes, weights, k=count):
+        counters[prefix] += 1
+        low, high = Designator_profile[prefix][1]
+        locations.append((f"{prefix}{counters[prefix]}", rng.randint(low, high)))
+    return locations
+
+
+def html_row(cells, align="left"):
+    return "<tr>\n" + "\n".join(VF_cell.format(align=align, text=text) for text in cells) + "\n</tr>"
+
+
+def html_table(rows):
+    return "<Table width=100%>\n" + "\n".join(rows) + "\n</Table>"
+
+
+def unprobed_pin_text(pin_count, unprobed, rng):
+    """不可植針腳清單：每行 6 個，獨立腳以 (SMD n) 標記，與 VF 報告相同"""
+    pins = sorted(rng.sample(range(1, pin_count + 1), unprobed))
+    texts = [f"(SMD {pin})" if rng.random() < 0.3 else str(pin) for pin in pins]
+    lines = [", ".join(texts[i:i + 6]) + ", " for i in range(0, len(texts), 6)]
+    return "\n".join(lines)
+
+
+def write_VF_html(filepath, locations, rng):
+    """
+    產生 VF 可測性分析報告 (Big5)：
+    表格 0~4 為基本資訊、植針統計、nail 清單與元件總數，表格 5~10 為依腳數分類的元件表。
+    """
+    total_pins = sum(pins for _, pins in locations)
+    nail_count = max(1, len(locations) // 2)
+
+    parts = ["<html>\n<head>\n<title>可測性分析報告</title>\n</head>\n<body>",
+             "<P align=right><FONT size=3><b>\nTebo-ICT<BR>\n</FONT></b></P>\n<HR>"]
+
+    parts.append(html_table([html_row(("工作序號", "---"), "right"), html_row(("板名", "SYNTHETIC.cad"), "right"),
+                             html_row(("PCB 層數", "10"), "right")]))
+    parts.append(html_table([html_row(("上模100mil", str(nail_count // 2)), "right"),
+                             html_row(("下模100mil", str(nail_count - nail_count // 2)), "right")]))
+    parts.append(html_table([html_row(("VIA孔植針數", str(nail_count)), "right"),
+                             html_row(("SMD元件腳植針數", "0"), "right")]))
+
+    nail_rows = [html_row(("No.", "Top/Bottom", "座標", "PAD大小", "針大小", "元件腳", "NET", "Pin ref."))]
+    for i in range(1, nail_count + 1):
+        x, y = rng.uniform(0, 6000), rng.uniform(0, 3000)
+        nail_rows.append(html_row((str(i), rng.choice("TB"), f"({x:.2f},{y:.2f})", "30.00,30.00", "1",
+                                   f"TB_TP{i}.1", f"NET_{i}", f"R{i}.1, C{i}.2,")))
+    parts.append(html_table(nail_rows))
+
+    parts.append(html_table([html_row(("元件總數", str(len(locations))), "right"),
+                             html_row(("元件總腳數", str(total_pins)), "right")]))
+
+    for title, low, high in VF_component_tables:
+        rows = [html_row(VF_component_header)]
+        for name, pins in locations:
+            if pins < low or (high is not None and pins > high):
+                continue
+            unprobed = rng.randint(0, max(0, pins // 3)) if rng.random() < 0.3 else 0
+            rate = f"{(pins - unprobed) / pins * 100:.1f}%"
+            text = unprobed_pin_text(pins, unprobed, rng) if unprobed else "---"
+            rows.append(html_row((name, "DIP" if pins == 1 else "SMD", rng.choice("TB"), str(pins),
+                                  f"{unprobed:3d}", rate, text)))
+        parts.append(f"<P align=left><A name=#{title}>\n{title}<BR>\n</A></P>")
+        parts.append(html_table(rows))
+
+    parts.append("</body>\n</html>\n")
+    with open(filepath, "w", encoding="big5") as f:
+        f.write("\n".join(parts))
+
+
+def SFCS_header():
+    return [
+        " Date   :24/10/07",
+        f"{'MULIT-LEVEL PRODUCTION BOMS':>63}{'Page      :':>66}    1 ",
+        "Wiwynn PCBA Company" + " " * 96 + "Company   :  F9C1",
+        "",
+        "-" * 200,
+        "Manufactured Item     :  SYN.00000.000V  SYNTHETIC BOARD                           Unit: PCS ",
+        "-" * 200,
+        "   Level|Position|                                     Item|Description                     |Effect.|Expiry|"
+        "Item Type|Ph|B/|Itm|  Net Quantity|No.o|Scp|Wrh|  Remark  |Green Factor",
+        "        |        ||                                |   Date|  Date|         |tm|F |Grp|              | Un.|[%]|   |"
+        "          |",
+        "--------+--------++--------------------------------+-------+------+---------+--+--+---+--------------+----+"
+        "---+---+----------+" + "-" * 58,
+        "                 |Location  Texts",
+        "_" * 200,
+    ]
+
+
+def write_SFCS_bom(filepath, locations, rng):
+    """
+    產生 SFCS MULIT-LEVEL PRODUCTION BOMS 文字檔：
+    表頭同 VF/BOM.*.txt (單一頁首)；每個料號一行，下方以 "|" 開頭的續行列出位置，每行 SFCS_locations_per_line 個。
+    """
+    names = [name for name, _ in locations]
+    lines = SFCS_header()
+
+    position = 10
+    i = 0
+    while i < len(names):
+        group = names[i:i + rng.choice((1, 1, 2, 3, 4, 6, 10, 20, 40))]
+        i += len(group)
+        item = f"B{rng.randint(10, 99)}.{rng.randint(0, 99999):05d}.{rng.randint(0, 9999):04d}"
+        description = f"CHIP {'RES' if group[0][0] == 'R' else 'PART'} {rng.randint(1, 999)} 0402".ljust(32)[:32]
+        lines.append(f".3      |{position:4d}/  1|{item}|{description}| 240828|      |Purchased| N| Y|  0|"
+                     f"{len(group):14.4f}|   0|  0|  0|          |R2_SA;HF_SA")
+        for k in range(0, len(group), SFCS_locations_per_line):
+            lines.append("                 |" + " ".join(group[k:k + SFCS_locations_per_line]))
+        position += 10
+
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def Agile_rows(locations, rng):
+    """Agile BOM 匯出的資料列：每個料號一列，BOM.Location 為逗號分隔的位置；最後一列為沒有位置的包材"""
+    names = [name for name, _ in locations]
+    i = 0
+    while i < len(names):
+        group = names[i:i + rng.choice((1, 1, 2, 3, 5, 8, 20))]
+        i += len(group)
+        yield [3, f"{rng.randint(10, 99)}.{rng.randint(0, 99999):05d}.{rng.randint(0, 999):03d}",
+               rng.choice(("Resistor", "Capacitor", "IC", "Connector", "Inductor")),
+               "SYNTHETIC PART", len(group), ",".join(group)]
+    # 沒有位置的包材列 (BOM.Location 為空)
+    yield [1, "BP0.00000.0001", "Packing", "CARTON", 1, None]
+
+
+def write_Agile_xlsx(filepath, locations, rng):
+    """產生 Agile BOM 匯出 (xlsx)"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("BOM")
+    ws.append(list(Agile_header))
+    for row in Agile_rows(locations, rng):
+        ws.append(row)
+    wb.save(filepath)
+
+
+def write_Agile_xls(filepath, locations, rng):
+    """
+    產生 Agile BOM 匯出 (舊版 xls，需要 xlwt)，內容與相同亂數的 write_Agile_xlsx 一致。
+    xls 單一工作表最多 Xls_max_rows 列，超過時丟出 ValueError。
+    """
+    import xlwt  # 只有產生 .xls 時才需要
+
+    wb = xlwt.Workbook(encoding="utf-8")
+    ws = wb.add_sheet("BOM")
+    for r, row in enumerate([Agile_header] + list(Agile_rows(locations, rng))):
+        if r >= Xls_max_rows:
+            raise ValueError(f".xls 最多 {Xls_max_rows} 列，{len(locations)} 個位置的 Agile BOM 請改用 xlsx")
+        for c, value in enumerate(row):
+            if value is not None:
+                ws.write(r, c, value)
+    wb.save(filepath)
+
+
+Synthetic_kinds = ("html", "sfcs", "agile", "agile_xls")
+
+
+def generate_all(count=Synthetic_locations, output_dir=Synthetic_output_dir, seed=Synthetic_seed,
+                 kinds=Synthetic_kinds):
+    """
+    以同一組位置產生 kinds 指定的檔案，回傳 (locations, {"html", "sfcs", "agile", "agile_xls"} → 路徑)。
+    相同 count 與 seed 產生的內容完全相同 (各種類的亂數彼此獨立，只產生部分種類不影響其他檔案)；
+    agile 與 agile_xls 使用相同的亂數，兩者只有檔案格式不同。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    locations = make_locations(count, rng)
+
+    paths = {
+        "html": os.path.join(output_dir, f"VF_{count}.htm"),
+        "sfcs": os.path.join(output_dir, f"BOM_SFCS_{count}.txt"),
+        "agile": os.path.join(output_dir, f"BOM_Agile_{count}.xlsx"),
+        "agile_xls": os.path.join(output_dir, f"BOM_Agile_{count}.xls"),
+    }
+    writers = {"html": (write_VF_html, 1), "sfcs": (write_SFCS_bom, 2), "agile": (write_Agile_xlsx, 3),
+               "agile_xls": (write_Agile_xls, 3)}
+    for kind in kinds:
+        writer, offset = writers[kind]
+        writer(paths[kind], locations, random.Random(seed + offset))
+    return locations, {kind: paths[kind] for kind in kinds}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="產生指定位置數的 VF HTML / SFCS BOM / Agile BOM (xlsx、xls) 測試資料")
+    parser.add_argument("--locations", type=int, nargs="+", default=[Synthetic_locations])
+    parser.add_argument("--output", default=Synthetic_output_dir)
+    parser.add_argument("--seed", type=int, default=Synthetic_seed)
+    parser.add_argument("--kinds", nargs="+", choices=Synthetic_kinds, default=list(Synthetic_kinds))
+    args = parser.parse_args()
+
+    for count in args.locations:
+        _, paths = generate_all(count, args.output, args.seed, args.kinds)
+        for kind, path in paths.items():
+            print(f"{kind:<6} {count:>8} 位置 → {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
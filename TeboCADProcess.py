@@ -1,6 +1,9 @@
 import os
 from os.path import join, exists
 import math
+import re
+import sys
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from Instance import get_executable_path
@@ -9,6 +12,9 @@ from Instance import create_or_replace_file
 Nails_shift_threshold = 3  # mil
 Parts_shift_threshold = 3  # mil
 
+CAD_registration = True         # 比對前先估計兩版本間的整體平移/旋轉/鏡像
+Registration_tolerance = 0.05   # mil，registration 後的殘差小於此值視為未移動
+
 Nails_asc_name = "Nails.asc"
 Nails_asc_output = "Diff_Nails_report.txt"
 
@@ -16,14 +22,45 @@ Nails_asc_output = "Diff_Nails_report.txt"
 Parts_asc_name = "Parts.asc"
 Parts_asc_output = "Diff_Parts_report.txt"
 
+Pins_asc_name = "Pins.asc"
+Nets_asc_name = "Nets.asc"
+
 
 def separator(char="-", length=100):
     return char * length
 
 
+def parse_Nails_line(line):
+    """解析 Nails.asc 的一行，非 $ 開頭的資料行或格式不符時回傳 None"""
+    line = line.strip()
+    if not line.startswith("$"):
+        return None
+    parts = line.split()
+    if len(parts) < 8:
+        return None
+    try:
+        x = float(parts[1])
+        y = float(parts[2])
+        tb = parts[5].strip("()")   # 去掉括號，只留 T 或 B
+        net_name = parts[7]         # Net Name 在第 8 欄
+        virtual_pin = parts[10] if len(parts) > 10 else ""  # 例如 "T PIN TB_TP109.1" 的最後一欄
+        return {
+            "Nail": parts[0],
+            "X": x,
+            "Y": y,
+            "T/B": tb,
+            "Net": parts[6],
+            "Net Name": net_name,
+            "Virtual Pin": virtual_pin
+        }
+    except (ValueError, IndexError):
+        return None
+
+
 def parse_Nailsasc(filepath, return_df=False):
     """
-    解析 ASC 檔案，回傳包含 X, Y, T/B, Net Name 的資料。
+    解析 ASC 檔案，回傳包含 Nail, X, Y, T/B, Net, Net Name, Virtual Pin 的資料。
+    Virtual Pin 為行尾的探點目標 (例如 TP47.1、TB_TP109.1)，沒有時為空字串。
     
     參數:
         filepath: str
@@ -39,25 +76,9 @@ def parse_Nailsasc(filepath, return_df=False):
     records = []
     with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
         for line in f:
-            line = line.strip()
-            if not line.startswith("$"):
-                continue
-            parts = line.split()
-            if len(parts) < 8:
-                continue
-            try:
-                x = float(parts[1])
-                y = float(parts[2])
-                tb = parts[5].strip("()")   # 去掉括號，只留 T 或 B
-                net_name = parts[7]         # Net Name 在第 8 欄
-                records.append({
-                    "X": x,
-                    "Y": y,
-                    "T/B": tb,
-                    "Net Name": net_name
-                })
-            except (ValueError, IndexError):
-                continue
+            record = parse_Nails_line(line)
+            if record is not None:
+                records.append(record)
 
     # 根據選項回傳
     if return_df:
@@ -67,16 +88,201 @@ def parse_Nailsasc(filepath, return_df=False):
 
 
 
-def find_Nailsasc_shift(CAD_new, CAD_old):
+def fit_rigid_transform(P, Q, iterations=10, min_scale_mil=0.5):
+    """
+    以加權最小平方 (IRLS，Tukey biweight) 估計 Q ≈ R·P + t 的 2D 剛體轉換，全部以 numpy 向量運算。
+    第一輪為一般最小平方，之後依殘差調整權重，真正移動的項目權重為 0，不影響整體轉換。
+
+    參數:
+        P, Q: ndarray (N, 2)，舊/新座標 (inch)
+    回傳:
+        (rot_deg, dx, dy, residual ndarray, weights ndarray)
+    """
+    w = np.ones(len(P))
+    theta = 0.0
+    t = np.zeros(2)
+    min_scale = min_scale_mil / 1000.0
+
+    for _ in range(iterations):
+        w_sum = w.sum()
+        if w_sum <= 0:
+            break
+        p_mean = (w[:, None] * P).sum(axis=0) / w_sum
+        q_mean = (w[:, None] * Q).sum(axis=0) / w_sum
+        Pc = P - p_mean
+        Qc = Q - q_mean
+        num = (w * (Pc[:, 0] * Qc[:, 1] - Pc[:, 1] * Qc[:, 0])).sum()
+        den = (w * (Pc[:, 0] * Qc[:, 0] + Pc[:, 1] * Qc[:, 1])).sum()
+        theta = math.atan2(num, den)
+        c, s = math.cos(theta), math.sin(theta)
+        R = np.array([[c, -s], [s, c]])
+        t = q_mean - R @ p_mean
+
+        residual = np.hypot(*(Q - (P @ R.T + t)).T)
+        # Tukey biweight，尺度取 1.4826 * median (MAD)
+        scale = max(1.4826 * float(np.median(residual)), min_scale)
+        k = 4.685 * scale
+        w = np.where(residual < k, (1.0 - (residual / k) ** 2) ** 2, 0.0)
+
+    return math.degrees(theta), float(t[0]), float(t[1]), residual, w
+
+
+def estimate_transform(CAD_new, CAD_old, key="Net Name", min_pairs=3):
+    """
+    依 key (Nails 為 Net Name、Parts 為 Part) 配對新舊座標，
+    各面 (T/B) 分別估計 CAD_old → CAD_new 的整體平移/旋轉，並測試 X 鏡像。
+
+    回傳:
+        dict: {"T": tf, "B": tf}，配對數不足的面為 None
+        tf = {"Rot", "Dx", "Dy", "Mirror", "Matched", "Inliers", "RMS_mil"}
+    """
+    dict_new = {item[key]: item for item in CAD_new}
+    dict_old = {item[key]: item for item in CAD_old}
+
+    transform = {}
+    for side in ("T", "B"):
+        names = [
+            name for name in dict_new
+            if name in dict_old
+            and dict_new[name]["T/B"].upper() == side
+            and dict_old[name]["T/B"].upper() == side
+        ]
+        if len(names) < min_pairs:
+            transform[side] = None
+            continue
+
+        P = np.array([(dict_old[name]["X"], dict_old[name]["Y"]) for name in names], dtype=float)
+        Q = np.array([(dict_new[name]["X"], dict_new[name]["Y"]) for name in names], dtype=float)
+
+        best = None
+        for mirror in (False, True):
+            P_fit = P * np.array([-1.0, 1.0]) if mirror else P
+            rot, dx, dy, residual, w = fit_rigid_transform(P_fit, Q)
+            score = float(np.median(residual))
+            if best is None or score < best[0]:
+                inliers = w > 0
+                rms = float(np.sqrt(np.mean(residual[inliers] ** 2))) if inliers.any() else 0.0
+                tf = {
+                    "Rot": rot,
+                    "Dx": dx,
+                    "Dy": dy,
+                    "Mirror": mirror,
+                    "Matched": len(names),
+                    "Inliers": int(inliers.sum()),
+                    "RMS_mil": rms * 1000.0
+                }
+                # 轉換在本面所有配對點上造成的最大位移，用來判斷是否等同未轉換
+                moved = apply_transform_array(P, tf) - P
+                tf["Max_move_mil"] = float(np.hypot(moved[:, 0], moved[:, 1]).max()) * 1000.0
+                best = (score, tf)
+        transform[side] = best[1]
+
+    return transform
+
+
+def is_identity_transform(transform, tolerance_mil=Registration_tolerance):
+    """transform 為 None，或各面都沒有鏡像且轉換造成的最大位移小於 tolerance_mil"""
+    if not transform:
+        return True
+    for tf in transform.values():
+        if tf is None:
+            continue
+        if tf["Mirror"] or tf["Max_move_mil"] > tolerance_mil:
+            return False
+    return True
+
+
+def apply_transform_array(P, tf):
+    """apply_transform_xy 的 numpy 版本，P 為 ndarray (N, 2)"""
+    if tf is None:
+        return P
+    X = -P[:, 0] if tf["Mirror"] else P[:, 0]
+    theta = math.radians(tf["Rot"])
+    c, s = math.cos(theta), math.sin(theta)
+    return np.column_stack((c * X - s * P[:, 1] + tf["Dx"], s * X + c * P[:, 1] + tf["Dy"]))
+
+
+def apply_transform_xy(x, y, tf):
+    """將舊版座標轉換到新版座標系"""
+    if tf is None:
+        return x, y
+    if tf["Mirror"]:
+        x = -x
+    theta = math.radians(tf["Rot"])
+    c, s = math.cos(theta), math.sin(theta)
+    return c * x - s * y + tf["Dx"], s * x + c * y + tf["Dy"]
+
+
+def apply_transform_rot(rot, tf):
+    """將舊版零件角度轉換到新版座標系 (0 ~ 360)"""
+    if tf is None:
+        return rot
+    if tf["Mirror"]:
+        rot = -rot
+    return (rot + tf["Rot"]) % 360.0
+
+
+def format_transform_lines(transform, label_new="CAD_new", label_old="CAD_old"):
+    """summary 區塊中的 registration 說明"""
+    lines = [f"Registration ({label_old} -> {label_new}):"]
+    for side, name in (("T", "TOP Side"), ("B", "Bottom Side")):
+        tf = transform.get(side) if transform else None
+        if tf is None:
+            lines.append(f"{name}  : --None--")
+            continue
+        lines.append(
+            f"{name}  : Rot = {tf['Rot']:.4f} deg, Dx = {tf['Dx']:.4f} inch, Dy = {tf['Dy']:.4f} inch, "
+            f"Mirror = {'Y' if tf['Mirror'] else 'N'}, Inliers = {tf['Inliers']}/{tf['Matched']}, "
+            f"RMS = {tf['RMS_mil']:.2f} mil"
+        )
+    if is_identity_transform(transform):
+        lines.append("No global offset/rotation, shifts are reported in raw coordinates")
+    else:
+        lines.append("Shifts are reported relative to the registration above")
+    return lines
+
+
+def compare_Nails_pair(item_new, item_old, transform=None, tolerance_mil=Registration_tolerance):
+    """
+    比較同一 Net Name 的新舊 nail，位置或面別不同時回傳 (新版 copy, 舊版 copy)，否則回傳 None。
+    transform 需已排除 identity (見 find_Nailsasc_shift)；registration 後殘差小於 tolerance_mil 視為未移動。
+    """
+    if transform is not None:
+        # 以 registration 後的舊座標比較
+        reg_x, reg_y = apply_transform_xy(item_old["X"], item_old["Y"], transform.get(item_old["T/B"].upper()))
+        residual_mil = math.hypot(item_new["X"] - reg_x, item_new["Y"] - reg_y) * 1000.0
+        if residual_mil > tolerance_mil or item_new["T/B"] != item_old["T/B"]:
+            old_copy = item_old.copy()
+            old_copy["Reg X"] = reg_x
+            old_copy["Reg Y"] = reg_y
+            return item_new.copy(), old_copy
+        return None
+
+    # 比較位置 (X, Y, T/B)
+    if (item_new["X"], item_new["Y"], item_new["T/B"]) != (item_old["X"], item_old["Y"], item_old["T/B"]):
+        # 如果位置不同 → shift 類別
+        return item_new.copy(), item_old.copy()
+    return None
+
+
+def find_Nailsasc_shift(CAD_new, CAD_old, transform=None, tolerance_mil=Registration_tolerance):
     """
     比較 CAD_new 和 CAD_old，找出 Net Name 相同但位置不同的項目
     參數:
         CAD_new, CAD_old: list of dict
             每個 dict 包含 {"X":..., "Y":..., "T/B":..., "Net Name":...}
+        transform: dict, 可選
+            estimate_transform 的結果；提供時以轉換後的舊座標比較，
+            舊版項目另外帶 "Reg X" / "Reg Y"
+        tolerance_mil: float
+            registration 後的殘差容許值 (mil)
     回傳:
         shift_list: list of dict
             包含來自 CAD_new 和 CAD_old 的 shift 類別資料
     """
+    if is_identity_transform(transform, tolerance_mil):
+        transform = None
+
     shift_list = []
 
     # 建立以 Net Name 為 key 的查詢表
@@ -87,17 +293,41 @@ def find_Nailsasc_shift(CAD_new, CAD_old):
     common_names = set(dict_new.keys()) & set(dict_old.keys())
 
     for name in common_names:
-        item_new = dict_new[name]
-        item_old = dict_old[name]
-        # 比較位置 (X, Y, T/B)
-        if (item_new["X"], item_new["Y"], item_new["T/B"]) != (item_old["X"], item_old["Y"], item_old["T/B"]):
-            # 如果位置不同 → shift 類別
-            shift_list.append(item_new.copy())
-            shift_list.append(item_old.copy())
+        pair = compare_Nails_pair(dict_new[name], dict_old[name], transform, tolerance_mil)
+        if pair is not None:
+            shift_list.extend(pair)
 
     return shift_list
 
 
+def format_Nails_line(item, label):
+    """Nails 報告中一支 nail 的一行：<label>   X   Y   (T/B)   Net Name"""
+    return f"{label}     {item['X']:.4f}    {item['Y']:.4f}   ({item['T/B']})   {item['Net Name']}"
+
+
+def format_Nails_shift_lines(new_item, old_item, threshold_mil, label_new="CAD_new", label_old="CAD_old"):
+    """一組 Shift Nail 的三行：新、舊、距離 (超過 threshold_mil 加 ***)"""
+    # 將 mil 轉換成 inch
+    threshold_inch = float(threshold_mil) / 1000.0
+
+    # 計算距離 (inch)，有 registration 時以轉換後的舊座標計算
+    dx = new_item['X'] - old_item.get('Reg X', old_item['X'])
+    dy = new_item['Y'] - old_item.get('Reg Y', old_item['Y'])
+    distance_inch = math.sqrt(dx*dx + dy*dy)
+    distance_mil = distance_inch * 1000  # 1 inch = 1000 mil
+
+    # 判斷是否超過閾值
+    mark = " ***" if distance_inch > threshold_inch else ""
+    if 'Reg X' in old_item:
+        mark += "   (registered)"
+
+    return [
+        format_Nails_line(new_item, label_new),
+        format_Nails_line(old_item, label_old),
+        f"Distance = {distance_inch:.4f} inch ({distance_mil:.1f} mil){mark}",
+    ]
+
+
 def save_Nails_shift_notebook(
     shift_list,
     filepath=Nails_asc_output,
@@ -130,30 +360,8 @@ def save_Nails_shift_notebook(
 
     lines.append("Following xy location of test point be shifted between two version")
 
-    # 將 mil 轉換成 inch
-    threshold_inch = float(threshold_mil) / 1000.0
-
     for i in range(0, len(shift_list), 2):
-        new_item = shift_list[i]
-        old_item = shift_list[i+1]
-
-        # 計算距離 (inch)
-        dx = new_item['X'] - old_item['X']
-        dy = new_item['Y'] - old_item['Y']
-        distance_inch = math.sqrt(dx*dx + dy*dy)
-        distance_mil = distance_inch * 1000  # 1 inch = 1000 mil
-
-        # 判斷是否超過閾值
-        mark = " ***" if distance_inch > threshold_inch else ""
-
-        # 寫入文字
-        lines.append(
-            f"{label_new}     {new_item['X']:.4f}    {new_item['Y']:.4f}   ({new_item['T/B']})   {new_item['Net Name']}"
-        )
-        lines.append(
-            f"{label_old}     {old_item['X']:.4f}    {old_item['Y']:.4f}   ({old_item['T/B']})   {old_item['Net Name']}"
-        )
-        lines.append(f"Distance = {distance_inch:.4f} inch ({distance_mil:.1f} mil){mark}")
+        lines.extend(format_Nails_shift_lines(shift_list[i], shift_list[i+1], threshold_mil, label_new, label_old))
         lines.append("")  # 空行分隔
 
     with open(filepath, "a", encoding="utf-8") as f:
@@ -206,9 +414,7 @@ def save_Nails_add_notebook(add_list, filepath=Nails_asc_output, label_new="CAD_
 
 
     for item in add_list:
-        lines.append(
-            f"{label_new}     {item['X']:.4f}    {item['Y']:.4f}   ({item['T/B']})   {item['Net Name']}"
-        )
+        lines.append(format_Nails_line(item, label_new))
 
     lines.append("")  # 空行分隔
 
@@ -261,9 +467,7 @@ def save_Nails_del_notebook(del_list, filepath=Nails_asc_output, label_new="CAD_
     lines.append(f"Following are in {label_old} Version, but not found in {label_new} Version")
 
     for item in del_list:
-        lines.append(
-            f"{label_old}     {item['X']:.4f}    {item['Y']:.4f}   ({item['T/B']})   {item['Net Name']}"
-        )
+        lines.append(format_Nails_line(item, label_old))
 
     lines.append("")  # 空行分隔
 
@@ -273,7 +477,7 @@ def save_Nails_del_notebook(del_list, filepath=Nails_asc_output, label_new="CAD_
 
     print(f"Del 結果已續寫到 {filepath}")
 
-def save_Nails_summary_notebook(filepath=Nails_asc_output, label_new="CAD_new", label_old="CAD_old"):
+def save_Nails_summary_notebook(filepath=Nails_asc_output, label_new="CAD_new", label_old="CAD_old", transform=None):
     """
     在報告檔案 Diff_Nails_report.txt 加入 Summary 區塊
     格式：
@@ -293,6 +497,8 @@ def save_Nails_summary_notebook(filepath=Nails_asc_output, label_new="CAD_new",
     lines.append(f"Summary :(The Comparison base Version is {label_old})")
     lines.append(f"New Version :{label_new}")
     lines.append(f"Old Version :{label_old}")
+    if transform is not None:
+        lines.extend(format_transform_lines(transform, label_new, label_old))
     lines.append(separator())
     lines.append("")  # 空行分隔
 
@@ -302,25 +508,37 @@ def save_Nails_summary_notebook(filepath=Nails_asc_output, label_new="CAD_new",
 
     print(f"Summary 已續寫到 {filepath}")
 
-def execute_Nails_summary(filepath=Nails_asc_output, label_new="CAD_new", label_old="CAD_old"):
+def execute_Nails_summary(filepath=Nails_asc_output, label_new="CAD_new", label_old="CAD_old", CAD_new=None, CAD_old=None,
+                          register=CAD_registration, threshold_mil=Nails_shift_threshold,
+                          tolerance_mil=Registration_tolerance, base_dir=None):
+    """
+    CAD_new / CAD_old 可傳入已解析的 Nails 資料 (例如 Board.nails)，
+    未傳入時才從 <base_dir>/<label>/Nails.asc 解析。
+    register = True 時先估計整體平移/旋轉，Shift 以轉換後的座標判斷。
+    base_dir 為相對路徑 (filepath、label) 的基準目錄，預設為執行檔所在目錄。
+    """
 
-    executable_dir = get_executable_path()
+    executable_dir = base_dir or get_executable_path()
     print(f"執行檔所在目錄: {executable_dir}")
 
-     
-    create_or_replace_file(os.path.join(executable_dir, filepath))
+    filepath = os.path.join(executable_dir, filepath)
+    create_or_replace_file(filepath)
 
-    CAD_new = parse_Nailsasc(os.path.join(executable_dir, label_new, Nails_asc_name))
+    if CAD_new is None:
+        CAD_new = parse_Nailsasc(os.path.join(executable_dir, label_new, Nails_asc_name))
     # print(CAD_new.head())
     # print(CAD_new.tail())
 
-    CAD_old = parse_Nailsasc(os.path.join(executable_dir, label_old, Nails_asc_name))
+    if CAD_old is None:
+        CAD_old = parse_Nailsasc(os.path.join(executable_dir, label_old, Nails_asc_name))
     # print(CAD_old.tail())
 
-    save_Nails_summary_notebook(filepath, label_new, label_old)
+    transform = estimate_transform(CAD_new, CAD_old, "Net Name") if register else None
 
-    CAD_Nailsasc_shift = find_Nailsasc_shift(CAD_new, CAD_old)
-    save_Nails_shift_notebook(CAD_Nailsasc_shift, filepath, Nails_shift_threshold, label_new, label_old)  # 預設存成 Diff_Nails_report.txt
+    save_Nails_summary_notebook(filepath, label_new, label_old, transform)
+
+    CAD_Nailsasc_shift = find_Nailsasc_shift(CAD_new, CAD_old, transform, tolerance_mil)
+    save_Nails_shift_notebook(CAD_Nailsasc_shift, filepath, threshold_mil, label_new, label_old)  # 預設存成 Diff_Nails_report.txt
 
 
     CAD_Nailsasc_del = find_Nailsasc_Del(CAD_new, CAD_old)
@@ -334,39 +552,61 @@ def execute_Nails_summary(filepath=Nails_asc_output, label_new="CAD_new", label_
     return None
 
 
-def parse_Partsasc(filename):
+def parse_Parts_line(line):
+    """
+    解析 Parts.asc 的一行，回傳 {"Part", "X", "Y", "Rot", "Grid", "T/B", "Device", "Outline"}；
+    標題行或格式不符時回傳 None。
+    Device / Outline 取自行尾的 'Device', 'Outline'，以 sys.intern 共用重複字串。
+    """
+    line = line.strip()
+    if not line or line.startswith(("Part", "$")):  # 跳過標題行與 nail 記錄
+        return None
+
+    tokens = line.split()
+    try:
+        x = float(tokens[1])
+        y = float(tokens[2])
+        rot = float(tokens[3])
+        part = tokens[0]
+        grid = tokens[4]
+        tb = tokens[5].strip("()")
+    except (ValueError, IndexError):
+        # 如果不是數字，跳過這行
+        return None
+
+    quoted = re.findall(r"'([^']*)'", line)  # 'Device', 'Outline'
+    device = sys.intern(quoted[0]) if len(quoted) > 0 else ""
+    outline = sys.intern(quoted[1]) if len(quoted) > 1 else ""
+
+    return {
+        "Part": part,
+        "X": x,
+        "Y": y,
+        "Rot": rot,
+        "Grid": grid,
+        "T/B": tb,
+        "Device": device,
+        "Outline": outline
+    }
+
+
+def parse_Partsasc(filename, return_df=False):
+    """
+    解析 Parts.asc，回傳 list of dict (欄位見 parse_Parts_line)；
+    return_df 為 True 時回傳 pandas.DataFrame
+    """
     parts_list = []
     with open(filename, "r", encoding="utf-8") as f:
         for line in f:
-            line = line.strip()
-            if not line or line.startswith("Part"):  # 跳過標題行
-                continue
-
-            tokens = line.split()
-            try:
-                x = float(tokens[1])
-                y = float(tokens[2])
-                rot = float(tokens[3])
-            except ValueError:
-                # 如果不是數字，跳過這行
-                continue
-
-            part = tokens[0]
-            grid = tokens[4]
-            tb = tokens[5].strip("()")
-
-            parts_list.append({
-                "Part": part,
-                "X": x,
-                "Y": y,
-                "Rot": rot,
-                "Grid": grid,
-                "T/B": tb
-            })
+            record = parse_Parts_line(line)
+            if record is not None:
+                parts_list.append(record)
+    if return_df:
+        return pd.DataFrame(parts_list)
     return parts_list
 
 
-def save_Parts_summary_notebook(filepath=Parts_asc_output, label_new="CAD_new", label_old="CAD_old"):
+def save_Parts_summary_notebook(filepath=Parts_asc_output, label_new="CAD_new", label_old="CAD_old", transform=None):
     """
     在報告檔案 Diff_Parts_report.txt 加入 Summary 區塊
     格式：
@@ -389,6 +629,8 @@ def save_Parts_summary_notebook(filepath=Parts_asc_output, label_new="CAD_new",
     lines.append(f"Summary :(The Comparison base Version is {label_old})")
     lines.append(f"New Version :{label_new}")
     lines.append(f"Old Version :{label_old}")
+    if transform is not None:
+        lines.extend(format_transform_lines(transform, label_new, label_old))
     lines.append("-" * 100)
     lines.append("")  # 空行分隔
 
@@ -400,38 +642,139 @@ def save_Parts_summary_notebook(filepath=Parts_asc_output, label_new="CAD_new",
 
 
 
-def find_Partsasc_shift(CAD_new, CAD_old, threshold_mil=3.0):
+def classify_Parts_change(new_item, old_item, dist_mil, rot_diff, threshold_mil=3.0):
+    """回傳同一 Part 新舊資料的變更類別 list：Shift / Rot / Side / Device / Outline"""
+    changes = []
+    if dist_mil >= threshold_mil:
+        changes.append("Shift")
+    if rot_diff > 0.0001:
+        changes.append("Rot")
+    if new_item["T/B"].upper() != old_item["T/B"].upper():
+        changes.append("Side")
+    if new_item.get("Device", "") != old_item.get("Device", ""):
+        changes.append("Device")
+    if new_item.get("Outline", "") != old_item.get("Outline", ""):
+        changes.append("Outline")
+    return changes
+
+
+def compare_Parts_pair(new_item, old_item, threshold_mil=3.0, transform=None):
+    """
+    比較同一 Part 的新舊資料，有變更時回傳 find_Partsasc_changes 的一筆結果，否則回傳 None。
+    transform 需已排除 identity (見 find_Partsasc_changes)。
+    """
+    if transform is not None:
+        tf = transform.get(old_item["T/B"].upper())
+        old_x, old_y = apply_transform_xy(old_item["X"], old_item["Y"], tf)
+        old_rot = apply_transform_rot(old_item["Rot"], tf)
+    else:
+        old_x, old_y, old_rot = old_item["X"], old_item["Y"], old_item["Rot"]
+
+    dx = new_item["X"] - old_x
+    dy = new_item["Y"] - old_y
+    dist_inch = math.sqrt(dx**2 + dy**2)
+    dist_mil = dist_inch * 1000.0
+
+    rot_diff = abs(new_item["Rot"] - old_rot)
+    if transform is not None:
+        rot_diff = min(rot_diff % 360.0, 360.0 - rot_diff % 360.0)
+
+    changes = classify_Parts_change(new_item, old_item, dist_mil, rot_diff, threshold_mil)
+    if not changes:
+        return None
+
+    change = {
+        "Part": new_item["Part"],
+        "New": new_item,
+        "Old": old_item,
+        "Distance_inch": dist_inch,
+        "Distance_mil": dist_mil,
+        "Rot_diff": rot_diff,
+        "Changes": changes
+    }
+    if transform is not None:
+        change["Raw_distance_mil"] = math.hypot(
+            new_item["X"] - old_item["X"], new_item["Y"] - old_item["Y"]
+        ) * 1000.0
+    return change
+
+
+def find_Partsasc_changes(CAD_new, CAD_old, threshold_mil=3.0, transform=None):
+    """
+    新舊版本共有的 Part 一次對齊比較，找出所有變更：
+    - "Shift"  : XY 距離 >= threshold_mil
+    - "Rot"    : 旋轉角度不同
+    - "Side"   : T/B 翻面
+    - "Device" : Device 不同
+    - "Outline": Outline (footprint) 不同
+    提供 transform (estimate_transform) 時，距離與角度以轉換後的舊座標計算，並另外記錄 Raw_distance_mil。
+    回傳 list of dict，包含新舊資料、距離、角度差與 Changes (變更類別 list)
+    """
+    if is_identity_transform(transform):
+        transform = None
+
+    old_map = {item["Part"]: item for item in CAD_old}
+    new_map = {item["Part"]: item for item in CAD_new}
+
+    change_list = []
+    for part, new_item in new_map.items():
+        old_item = old_map.get(part)
+        if old_item is None:
+            continue
+        change = compare_Parts_pair(new_item, old_item, threshold_mil, transform)
+        if change is not None:
+            change_list.append(change)
+
+    return change_list
+
+
+def filter_Parts_shift(change_list):
+    """從 find_Partsasc_changes 的結果取出位移或旋轉的項目 (Shift 類別)"""
+    return [item for item in change_list if "Shift" in item["Changes"] or "Rot" in item["Changes"]]
+
+
+def filter_Parts_swap(change_list):
+    """從 find_Partsasc_changes 的結果取出翻面、換 Device 或換 Outline 的項目"""
+    return [item for item in change_list
+            if "Side" in item["Changes"] or "Device" in item["Changes"] or "Outline" in item["Changes"]]
+
+
+def find_Partsasc_shift(CAD_new, CAD_old, threshold_mil=3.0, transform=None):
     """
     找出同一個 Part 在新舊版本座標或旋轉角度不同的情況 (Shift 類別)
     - 若 XY 距離 >= threshold_mil，列入 Shift
     - 若 Rot 不同，也列入 Shift
+    - 提供 transform (estimate_transform) 時，距離與角度以轉換後的舊座標計算，
+      並另外記錄 Raw_distance_mil
     回傳 list of dict，包含新舊座標、旋轉角度與距離
     """
-    old_map = {item["Part"]: item for item in CAD_old}
-    new_map = {item["Part"]: item for item in CAD_new}
+    return filter_Parts_shift(find_Partsasc_changes(CAD_new, CAD_old, threshold_mil, transform))
+
+def format_Parts_line(item, label):
+    """Parts 報告中一個 Part 的一行：<label>   Part   X   Y   Rot   Grid   (T/B)"""
+    return f"{label}   {item['Part']}   {item['X']:.4f}   {item['Y']:.4f}   {item['Rot']:.1f}   {item['Grid']}   ({item['T/B']})"
+
+
+def format_Parts_shift_lines(item, label_new="CAD_new", label_old="CAD_old"):
+    """一組 Shift Part 的三行：新、舊、距離與角度差"""
+    line = f"Distance = {item['Distance_inch']:.4f} inch ({item['Distance_mil']:.1f} mil), Rot diff = {item['Rot_diff']:.1f} deg ***"
+    if "Raw_distance_mil" in item:
+        line += f"   (registered, raw = {item['Raw_distance_mil']:.1f} mil)"
+    return [format_Parts_line(item["New"], label_new), format_Parts_line(item["Old"], label_old), line]
+
+
+def format_Parts_swap_lines(item, label_new="CAD_new", label_old="CAD_old"):
+    """一組翻面 / 換 Device / 換 Outline 的三行：新、舊、Changes"""
+    new = item["New"]
+    old = item["Old"]
+    return [
+        f"{label_new}   {new['Part']}   {new['X']:.4f}   {new['Y']:.4f}   {new['Rot']:.1f}   ({new['T/B']})"
+        f"   '{new.get('Device', '')}', '{new.get('Outline', '')}'",
+        f"{label_old}   {old['Part']}   {old['X']:.4f}   {old['Y']:.4f}   {old['Rot']:.1f}   ({old['T/B']})"
+        f"   '{old.get('Device', '')}', '{old.get('Outline', '')}'",
+        f"Changes = {', '.join(item['Changes'])} ***",
+    ]
 
-    shift_list = []
-    for part, new_item in new_map.items():
-        if part in old_map:
-            old_item = old_map[part]
-            dx = new_item["X"] - old_item["X"]
-            dy = new_item["Y"] - old_item["Y"]
-            dist_inch = math.sqrt(dx**2 + dy**2)
-            dist_mil = dist_inch * 1000.0
-
-            rot_diff = abs(new_item["Rot"] - old_item["Rot"])
-
-            # 判斷是否列入 Shift
-            if dist_mil >= threshold_mil or rot_diff > 0.0001:
-                shift_list.append({
-                    "Part": part,
-                    "New": new_item,
-                    "Old": old_item,
-                    "Distance_inch": dist_inch,
-                    "Distance_mil": dist_mil,
-                    "Rot_diff": rot_diff
-                })
-    return shift_list
 
 def save_Parts_shift_notebook(shift_list, filepath="Diff_Parts_report.txt", label_new="CAD_new", label_old="CAD_old"):
     """
@@ -459,11 +802,7 @@ def save_Parts_shift_notebook(shift_list, filepath="Diff_Parts_report.txt", labe
     lines.append("Following xy location of parts be shifted between two version")
 
     for item in shift_list:
-        new = item["New"]
-        old = item["Old"]
-        lines.append(f"{label_new}   {new['Part']}   {new['X']:.4f}   {new['Y']:.4f}   {new['Rot']:.1f}   {new['Grid']}   ({new['T/B']})")
-        lines.append(f"{label_old}   {old['Part']}   {old['X']:.4f}   {old['Y']:.4f}   {old['Rot']:.1f}   {old['Grid']}   ({old['T/B']})")
-        lines.append(f"Distance = {item['Distance_inch']:.4f} inch ({item['Distance_mil']:.1f} mil), Rot diff = {item['Rot_diff']:.1f} deg ***")
+        lines.extend(format_Parts_shift_lines(item, label_new, label_old))
         lines.append("")  # 每組之間空行
 
     lines.append("")  # 區塊結尾空行
@@ -511,9 +850,7 @@ def save_Parts_del_notebook(del_list, filepath=Parts_asc_output, label_new="CAD_
     lines.append(f"Following are in {label_old} Version, but not found in {label_new} Version")
 
     for item in del_list:
-        lines.append(
-            f"{label_old}   {item['Part']}   {item['X']:.4f}   {item['Y']:.4f}   {item['Rot']:.1f}   {item['Grid']}   ({item['T/B']})"
-        )
+        lines.append(format_Parts_line(item, label_old))
 
     lines.append("")  # 區塊結尾空行
 
@@ -562,9 +899,7 @@ def save_Parts_add_notebook(add_list, filepath=Parts_asc_output, label_new="CAD_
     lines.append(f"Following are in {label_new} Version, but not found in {label_old} Version")
 
     for item in add_list:
-        lines.append(
-            f"{label_new}   {item['Part']}   {item['X']:.4f}   {item['Y']:.4f}   {item['Rot']:.1f}   {item['Grid']}   ({item['T/B']})"
-        )
+        lines.append(format_Parts_line(item, label_new))
 
     lines.append("")  # 區塊結尾空行
 
@@ -574,23 +909,70 @@ def save_Parts_add_notebook(add_list, filepath=Parts_asc_output, label_new="CAD_
     print(f"Add 結果已續寫到 {filepath}")
 
 
-def execute_Parts_summary(filepath=Parts_asc_output, label_new="CAD_new", label_old="CAD_old"):
+def save_Parts_swap_notebook(swap_list, filepath=Parts_asc_output, label_new="CAD_new", label_old="CAD_old"):
+    """
+    將翻面 / 換 Device / 換 Outline 的 Part 續寫到報告
+    格式：
+    [Part 4] Side / Device / Outline Changed Parts
+    Side = N, Device = M, Outline = K
+
+    <label_new>   Part   X   Y   Rot   (T/B)   'Device', 'Outline'
+    <label_old>   Part   X   Y   Rot   (T/B)   'Device', 'Outline'
+    Changes = Side, Device ***
+    """
+    lines = []
+    lines.append(separator())
+    lines.append("[Part 4] Side / Device / Outline Changed Parts")
+
+    side_count = sum(1 for item in swap_list if "Side" in item["Changes"])
+    device_count = sum(1 for item in swap_list if "Device" in item["Changes"])
+    outline_count = sum(1 for item in swap_list if "Outline" in item["Changes"])
+    lines.append(f"Side = {side_count}, Device = {device_count}, Outline = {outline_count}")
+    lines.append("")
+
+    for item in swap_list:
+        lines.extend(format_Parts_swap_lines(item, label_new, label_old))
+        lines.append("")
+
+    lines.append("")
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"Side / Device / Outline 結果已續寫到 {filepath}")
 
-    executable_dir = get_executable_path()
+
+def execute_Parts_summary(filepath=Parts_asc_output, label_new="CAD_new", label_old="CAD_old", CAD_new=None, CAD_old=None,
+                          register=CAD_registration, threshold_mil=Parts_shift_threshold, base_dir=None):
+    """
+    CAD_new / CAD_old 可傳入已解析的 Parts 資料 (例如 Board.parts)，
+    未傳入時才從 <base_dir>/<label>/Parts.asc 解析。
+    register = True 時先估計整體平移/旋轉，Shift 以轉換後的座標判斷。
+    base_dir 為相對路徑 (filepath、label) 的基準目錄，預設為執行檔所在目錄。
+    """
+
+    executable_dir = base_dir or get_executable_path()
     print(f"執行檔所在目錄: {executable_dir}")
 
-     
-    create_or_replace_file(os.path.join(executable_dir, filepath))
+    filepath = os.path.join(executable_dir, filepath)
+    create_or_replace_file(filepath)
 
-    CAD_new = parse_Partsasc(os.path.join(executable_dir, label_new, Parts_asc_name))
+    if CAD_new is None:
+        CAD_new = parse_Partsasc(os.path.join(executable_dir, label_new, Parts_asc_name))
     print("總筆數 =", len(CAD_new))
 
-    CAD_old = parse_Partsasc(os.path.join(executable_dir, label_old, Parts_asc_name))
+    if CAD_old is None:
+        CAD_old = parse_Partsasc(os.path.join(executable_dir, label_old, Parts_asc_name))
     print("總筆數 =", len(CAD_old))
 
-    save_Parts_summary_notebook(filepath, label_new, label_old)
+    transform = estimate_transform(CAD_new, CAD_old, "Part") if register else None
 
-    CAD_Partsasc_shift = find_Partsasc_shift(CAD_new, CAD_old, Parts_shift_threshold)
+    save_Parts_summary_notebook(filepath, label_new, label_old, transform)
+
+    # 一次對齊比較，Shift 與 Side / Device / Outline 都由同一份結果篩出
+    CAD_Partsasc_changes = find_Partsasc_changes(CAD_new, CAD_old, threshold_mil, transform)
+
+    CAD_Partsasc_shift = filter_Parts_shift(CAD_Partsasc_changes)
     save_Parts_shift_notebook(CAD_Partsasc_shift, filepath, label_new, label_old)
 
     CAD_Partsasc_Del = find_Partsasc_Del(CAD_new, CAD_old)
@@ -599,5 +981,90 @@ def execute_Parts_summary(filepath=Parts_asc_output, label_new="CAD_new", label_
     CAD_Partsasc_Add = find_Partsasc_Add(CAD_new, CAD_old)
     save_Parts_add_notebook(CAD_Partsasc_Add, filepath, label_new, label_old)
 
+    save_Parts_swap_notebook(filter_Parts_swap(CAD_Partsasc_changes), filepath, label_new, label_old)
+
+    return None
+
+
+def parse_Pinsasc(filename):
+    """
+    解析 Pins.asc，回傳 list of dict，每個 pin 一筆：
+        {"Part", "T/B", "Pin", "Name", "X", "Y", "Layer", "Net Name", "Nails"}
 
-    return None
\ No newline at end of file
+    - "Part xxx (T)" 行定義目前的零件與面別
+    - 沒有接 Net 的 pin，Net Name 為空字串
+    - Nails 為該 pin 上的 nail 編號 list (不含 $)
+    """
+    with open(filename, "r", encoding="utf-8", errors="ignore") as f:
+        return parse_Pins_lines(f)
+
+
+def parse_Pins_lines(lines):
+    """解析 Pins.asc 的多行內容 (整個檔案或單一 Part 區塊)，欄位同 parse_Pinsasc"""
+    pins_list = []
+    part = None
+    tb = None
+    for line in lines:
+        tokens = line.split()
+        if not tokens:
+            continue
+
+        if tokens[0] == "Part":
+            # 零件標題行，例如 "Part PR43   (B)"；表頭 "Part        T/B" 會被略過
+            if len(tokens) >= 3 and tokens[2].startswith("("):
+                part = tokens[1]
+                tb = tokens[2].strip("()")
+            continue
+
+        if part is None or len(tokens) < 5:
+            continue
+
+        try:
+            x = float(tokens[2])
+            y = float(tokens[3])
+        except ValueError:
+            continue
+
+        pins_list.append({
+            "Part": part,
+            "T/B": tb,
+            "Pin": tokens[0],
+            "Name": tokens[1],
+            "X": x,
+            "Y": y,
+            "Layer": tokens[4],
+            "Net Name": tokens[5] if len(tokens) > 5 else "",
+            "Nails": tokens[6:]
+        })
+    return pins_list
+
+
+def parse_Netsasc(filename):
+    """
+    解析 Nets.asc，回傳 list of dict，每個 net 一筆：
+        {"Net": "#1", "Type": "S", "Net Name": ..., "Pins": ["U107.1", "R905.2", ...]}
+    """
+    with open(filename, "r", encoding="utf-8", errors="ignore") as f:
+        return parse_Nets_lines(f)
+
+
+def parse_Nets_lines(lines):
+    """解析 Nets.asc 的多行內容 (整個檔案或單一 Net 區塊)，欄位同 parse_Netsasc"""
+    nets_list = []
+    current = None
+    for line in lines:
+        tokens = line.split()
+        if not tokens:
+            continue
+
+        if tokens[0].startswith("#") and len(tokens) >= 3:
+            current = {
+                "Net": tokens[0],
+                "Type": tokens[1].strip("()"),
+                "Net Name": tokens[2],
+                "Pins": []
+            }
+            nets_list.append(current)
+        elif current is not None and len(tokens) == 1 and "." in tokens[0]:
+            current["Pins"].append(tokens[0])
+    return nets_list
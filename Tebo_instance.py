@@ -6,12 +6,58 @@ import pandas as pd
 
 
 from TeboCADProcess import *
+from ReconcileProcess import execute_BOM_CAD_summary, BOM_CAD_output
+from BoardModel import load_board
+from NetAnalysis import find_Nets_rename, find_Nailsasc_rename, save_Nets_rename_notebook
+from NetAnalysis import find_Nets_merge_split, save_Nets_merge_split_notebook
+from FixtureCheck import execute_Nails_clearance, execute_Nails_pin_check
+from HighSpeedCheck import execute_High_speed_check
 
 # 人工確認
 New_CAD_folder = "25W12-SB_1216WYHQ1400_cad-Basic"  # 替換資料夾名稱
 Old_CAD_folder = "25W12-SB_1212YHQ1340_CAD-Basic"
 
 
+def run_Tebo_reports(board_new, board_old, label_new=None, label_old=None,
+                     nails_output=Nails_asc_output, parts_output=Parts_asc_output,
+                     nails_threshold=Nails_shift_threshold, parts_threshold=Parts_shift_threshold,
+                     register=CAD_registration, tolerance_mil=Registration_tolerance, high_speed_file=None):
+    """
+    以已建立的新舊 Board 產生 Nails / Parts 報告 (Tebo_instance、WatchFolder 與 DiffJob 共用)。
+    門檻與輸出路徑都由參數傳入，不修改任何模組層級的設定，可在多個執行緒同時呼叫 (輸出路徑需不同)。
+    """
+    label_new = label_new or board_new.label
+    label_old = label_old or board_old.label
+
+    # execute_*_summary 以執行檔目錄解析相對的輸出路徑，續寫的各段也要寫到同一個檔案
+    nails_output = os.path.join(get_executable_path(), nails_output)
+    parts_output = os.path.join(get_executable_path(), parts_output)
+
+    execute_Nails_summary(nails_output, label_new, label_old, board_new.nails, board_old.nails,
+                          register, nails_threshold, tolerance_mil)
+
+    # Net 改名偵測 (Nets.asc pin-set 特徵)，續寫到 Nails 報告
+    Nets_rename = find_Nets_rename(board_new.nets, board_old.nets)
+    Nails_rename = find_Nailsasc_rename(board_new.nails, board_old.nails, Nets_rename)
+    save_Nets_rename_notebook(Nets_rename, Nails_rename, nails_output, label_new, label_old)
+
+    # Net 合併/分割 (union-find)，續寫到 Nails 報告
+    Nets_merge_split = find_Nets_merge_split(board_new.nets, board_old.nets, board_new.nails, board_old.nails)
+    save_Nets_merge_split_notebook(Nets_merge_split, nails_output, label_new, label_old)
+
+    # 新版探針間距 / 零件撞件檢查 (格網空間索引)，續寫到 Nails 報告
+    execute_Nails_clearance(nails_output, board_new)
+
+    # 新版 nail 與 Virtual Pin 目標 pin 的位置 / Net 檢查，續寫到 Nails 報告
+    execute_Nails_pin_check(nails_output, board_new)
+
+    # VF/High speed net list.xlsx：high speed net 上的 nail 與 net 變動，續寫到 Nails 報告
+    execute_High_speed_check(nails_output, board_new, board_old, high_speed_file)
+
+    execute_Parts_summary(parts_output, label_new, label_old, board_new.parts, board_old.parts,
+                          register, parts_threshold)
+
+
 def Tebo_instance():
 
     print("please key in new cad folder:")
@@ -20,6 +66,9 @@ def Tebo_instance():
     print("please key in old cad folder:")
     old_folder = input().strip()
 
+    print("please key in SFCS BOM file (press Enter to skip):")
+    bom_file = input().strip()
+
 
     # 確認路徑存在
     if not os.path.exists(new_folder):
@@ -29,8 +78,21 @@ def Tebo_instance():
         print(f"Error: old cad folder '{old_folder}' not found.")
         return
 
-    execute_Nails_summary(Nails_asc_output, new_folder, old_folder)
-    execute_Parts_summary(Parts_asc_output, new_folder, old_folder)
+    # 每個版本只解析一次，後續比對共用
+    board_new = load_board(new_folder)
+    board_old = load_board(old_folder)
+
+    run_Tebo_reports(board_new, board_old, new_folder, old_folder)
+
+    # BOM 與 Parts.asc 交叉比對 (可選)
+    if bom_file:
+        # BOM 路徑與 CAD 資料夾同樣以目前工作目錄解析一次，
+        # 傳入絕對路徑後 execute_BOM_CAD_summary 不會再接到執行檔目錄
+        bom_file = os.path.abspath(bom_file)
+        if os.path.exists(bom_file):
+            execute_BOM_CAD_summary(bom_file, new_folder, BOM_CAD_output, board=board_new)
+        else:
+            print(f"Error: BOM file '{bom_file}' not found.")
     
     # execute_Nails_summary(Nails_asc_output, New_CAD_folder, Old_CAD_folder)
     # execute_Parts_summary(Parts_asc_output, New_CAD_folder, Old_CAD_folder)
@@ -0,0 +1,188 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from TeboCADProcess import Nails_asc_name, Parts_asc_name, Pins_asc_name, Nets_asc_name
+from DiffService import DiffServiceState
+from DiffJob import DiffJob
+
+Watch_poll_interval = 2.0    # 秒，掃描共用資料夾的間隔
+Watch_settle_seconds = 5.0   # 秒，資料夾內容在這段時間內沒有變動才視為複製完成
+Watch_workers = 2            # 同時比對的數量
+Watch_warm_revisions = 8     # 保留在記憶體中的最近版本 (Board) 數量
+Watch_report_dir = "Diff_reports"
+
+revision_files = (Parts_asc_name, Pins_asc_name, Nets_asc_name, Nails_asc_name)
+
+
+def project_key(label):
+    """
+    由版本資料夾名稱取出專案名稱，例如
+    25W12-SB_1216WYHQ1400_cad-Basic → 25W12-SB
+    """
+    return label.split("_", 1)[0].upper()
+
+
+def folder_signature(path):
+    """回傳 (資料夾 mtime, 各 .asc 檔的 (mtime, size))；不是 CAD 版本資料夾時回傳 None"""
+    entries = []
+    found = False
+    for name in revision_files:
+        try:
+            st = os.stat(os.path.join(path, name))
+        except OSError:
+            entries.append(None)
+            continue
+        found = True
+        entries.append((st.st_mtime, st.st_size))
+    if not found:
+        return None
+    return (os.path.getmtime(path),) + tuple(entries)
+
+
+class FolderWatcher:
+    """
+    以輪詢共用資料夾的 mtime 偵測新的 CAD 版本資料夾：
+    - 共用資料夾 mtime 沒變時不列舉子資料夾
+    - 新資料夾的 .asc 檔在 Watch_settle_seconds 內沒有變動才開始比對
+    - 沒有 .asc 檔的子資料夾 (VF/、報告目錄等) 不列入追蹤；
+      新出現的子資料夾在 Watch_settle_seconds 內仍沒有 .asc 檔、或已被刪除時放棄追蹤，
+      直到共用資料夾再次變動才重新檢查
+    - 與同專案的前一版比對，工作交給 ThreadPoolExecutor
+    - 解析結果 (Board) 保留在 DiffServiceState 的 LRU 快取，前一版通常不需重新解析
+    """
+
+    def __init__(self, root, report_dir=Watch_report_dir, workers=Watch_workers, warm=Watch_warm_revisions,
+                 settle_seconds=Watch_settle_seconds):
+        self.root = os.path.abspath(root)
+        self.report_dir = os.path.abspath(report_dir)
+        self.settle_seconds = settle_seconds
+        self.state = DiffServiceState(warm)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+
+        self.root_mtime = None
+        self.pending = {}    # path → (signature, 首次看到此 signature 的時間)
+        self.revisions = {}  # 專案 → list of (完成時間, path)，依完成順序
+        self.known = set()
+        self.futures = []
+
+    def list_folders(self):
+        try:
+            return [entry.path for entry in os.scandir(self.root) if entry.is_dir()]
+        except OSError as e:
+            print(f"無法讀取 {self.root}: {e}")
+            return []
+
+    def register(self, path, settled_time):
+        key = project_key(os.path.basename(path))
+        with self.lock:
+            history = self.revisions.setdefault(key, [])
+            previous = history[-1][1] if history else None
+            history.append((settled_time, path))
+            self.known.add(path)
+        return previous
+
+    def baseline(self):
+        """啟動時把已存在的版本依 mtime 登記為歷史版本，不做比對"""
+        folders = []
+        for path in self.list_folders():
+            if folder_signature(path) is None:
+                self.known.add(path)  # 不是 CAD 版本資料夾，之後不再追蹤
+            else:
+                folders.append(path)
+        self.known.add(self.report_dir)  # 報告目錄放在共用資料夾下時也不追蹤
+        folders.sort(key=os.path.getmtime)
+        for path in folders:
+            self.register(path, os.path.getmtime(path))
+        self.root_mtime = os.path.getmtime(self.root)
+        print(f"監看 {self.root}：已有 {len(folders)} 個版本")
+
+        # 預先載入每個專案的最新版，下一版出現時可直接比對
+        for history in self.revisions.values():
+            self.futures.append(self.executor.submit(self.state.get_board, history[-1][1]))
+
+    def scan(self):
+        """掃描一次，回傳本次確認完成的新版本資料夾"""
+        now = time.time()
+        root_mtime = os.path.getmtime(self.root)
+        if root_mtime != self.root_mtime:
+            self.root_mtime = root_mtime
+            for path in self.list_folders():
+                if path not in self.known and path not in self.pending:
+                    self.pending[path] = (None, now)
+
+        settled = []
+        for path, (signature, since) in list(self.pending.items()):
+            current = folder_signature(path)
+            if current is None:
+                # 還沒有 .asc 檔：超過靜止時間或資料夾已刪除就放棄追蹤
+                if now - since >= self.settle_seconds or not os.path.isdir(path):
+                    del self.pending[path]
+                elif signature is not None:
+                    self.pending[path] = (None, now)
+                continue
+            if current != signature:
+                # 仍在複製中，重新計時
+                self.pending[path] = (current, now)
+                continue
+            if now - since >= self.settle_seconds:
+                del self.pending[path]
+                settled.append(path)
+        return settled
+
+    def submit(self, new_path):
+        previous = self.register(new_path, time.time())
+        label = os.path.basename(new_path)
+        if previous is None:
+            print(f"新版本 {label}：找不到同專案 ({project_key(label)}) 的前一版，只載入不比對")
+            self.futures.append(self.executor.submit(self.state.get_board, new_path))
+            return
+        print(f"新版本 {label}：排入與 {os.path.basename(previous)} 的比對")
+        self.futures.append(self.executor.submit(self.diff_revisions, new_path, previous))
+
+    def diff_revisions(self, new_path, old_path):
+        output_dir = os.path.join(self.report_dir, os.path.basename(new_path))
+        result = DiffJob(new_path, old_path, output_dir).run(self.state.get_board)
+
+        print(f"比對完成 {os.path.basename(new_path)} vs {os.path.basename(old_path)}：{output_dir} "
+              f"({result['seconds']:.2f} 秒)")
+        return output_dir
+
+    def run(self, poll_interval=Watch_poll_interval, max_cycles=None):
+        """持續監看；max_cycles 為 None 時直到 Ctrl+C"""
+        self.baseline()
+        cycles = 0
+        try:
+            while max_cycles is None or cycles < max_cycles:
+                for path in self.scan():
+                    self.submit(path)
+                self.futures = [future for future in self.futures if not future.done() or self.report_error(future)]
+                cycles += 1
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.executor.shutdown(wait=True)
+
+    @staticmethod
+    def report_error(future):
+        error = future.exception()
+        if error is not None:
+            print(f"比對失敗: {type(error).__name__}: {error}")
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="監看共用資料夾，新的 CAD 版本出現時自動與前一版比對")
+    parser.add_argument("root", help="放置 CAD 版本資料夾的共用目錄")
+    parser.add_argument("--reports", default=Watch_report_dir, help="報告輸出目錄 (每個新版本一個子資料夾)")
+    parser.add_argument("--workers", type=int, default=Watch_workers)
+    parser.add_argument("--warm", type=int, default=Watch_warm_revisions, help="保留在記憶體中的版本數")
+    parser.add_argument("--interval", type=float, default=Watch_poll_interval, help="輪詢間隔 (秒)")
+    parser.add_argument("--settle", type=float, default=Watch_settle_seconds, help="判定複製完成的靜止時間 (秒)")
+    args = parser.parse_args()
+
+    FolderWatcher(args.root, args.reports, args.workers, args.warm, args.settle).run(args.interval)